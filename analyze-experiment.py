@@ -1,12 +1,40 @@
 #!/usr/bin/env python3
 """
-Script to parse one or more dbg-toolkit report files.
-- Extracts summary counts, file paths, and runtime.
-- Parses ASCII-art tables into structured data.
-- When given multiple files, identifies which log has the greatest Instcount geomean among "got smaller" metrics.
+Script to parse one or more dbg-toolkit experiment results.
+- Reads run records (.jsonl, one JSON object per grid run, as written by
+  cost-model-experiment.py) or combined report logs ('## Run:' headers followed by
+  analyze_comparison_results.py tables).
+- Streams every input once into a table of runs indexed by run name.
+- Ranks the runs by the geomean of any metric/table, and reports the greatest
+  Instcount and Size.text reductions and growths.
+- With --pareto, computes the Pareto front over (size, compile time, exec time,
+  failures), with bootstrap confidence intervals on each geomean when the merged
+  results store of the grid is given (--store).
+- numpy, scipy, tabulate and the results store are only imported by --pareto, so
+  loading and ranking runs starts fast.
 """
 import argparse
 import json
+import math
+import re
+
+# Table titles printed by analyze_comparison_results.py (and their former wording)
+TABLE_KINDS = {
+    "Programs that got increased metrics:": "larger",
+    "Programs that got larger:": "larger",
+    "Programs that got decreased metrics:": "smaller",
+    "Programs that got smaller:": "smaller",
+    "Programs that metrics didn't change:": "unchanged",
+    "Overall metrics:": "overall",
+}
+RUN_HEADER = "## Run: "
+_PARAM_RE = re.compile(r"(\w+)=([-\w.]+)")
+# cost-model-experiment.py cell names, e.g. 'p5-s40-u100'
+_CELL_RE = re.compile(r"^p(?P<params>\d+)-s(?P<size>\d+)-u(?P<users>\d+)$")
+
+# Pareto objectives, all minimized: (store metric, summary label)
+COST_METRICS = [("compile_time", "Compile Time"), ("exec_time", "Exec. Time")]
+SIZE_METRICS = {"size.text": ("size..text", "Size.text"), "instcount": ("instcount", "Instcount")}
 
 
 def parse_table(lines):
@@ -28,79 +56,302 @@ def parse_table(lines):
     return rows
 
 
-def parse_all_reports(filepath):
+def _number(text):
+    try:
+        return float(text.strip().rstrip("%"))
+    except (AttributeError, ValueError):
+        return None
+
+
+def _run_from_header(header):
+    """
+    '## Run: params=5, size=40, users=100' -> {'run': 'params=5, size=40, users=100', 'params': 5, ...}
+    """
+    name = header[len(RUN_HEADER):].strip()
+    run = {"run": name}
+    for key, value in _PARAM_RE.findall(name):
+        num = _number(value)
+        run[key] = int(num) if num is not None and num.is_integer() else (num if num is not None else value)
+    return run
+
+
+def _add_table(run, kind, rows):
+    metrics = run.setdefault("metrics", {})
+    for row in rows:
+        entry = metrics.setdefault(row.get("Metric", ""), {})
+        count = row.get("Count", row.get("Total Programs"))
+        entry[kind] = {
+            "count": int(_number(count)) if _number(count) is not None else None,
+            "pct": _number(row.get("% of total")),
+            "geomean": _number(row.get("Geomean")),
+        }
+        if kind == "overall" and entry[kind]["count"] is not None:
+            run["total"] = entry[kind]["count"]
+
+
+def iter_report_runs(filepath):
+    """
+    Stream a combined report log, yielding one run record per '## Run:' section.
+    Tables are attached to the run header that precedes them.
+    """
+    run = None
+    table_kind, table = None, []
+    with open(filepath, "r", errors="replace") as f:
+        for line in f:
+            if table_kind is not None:
+                if line.strip():
+                    table.append(line)
+                    continue
+                if run is not None:
+                    _add_table(run, table_kind, parse_table(table))
+                table_kind, table = None, []
+            if line.startswith(RUN_HEADER):
+                if run is not None:
+                    yield run
+                run = _run_from_header(line.strip())
+                continue
+            kind = TABLE_KINDS.get(line.strip())
+            if kind is not None:
+                table_kind, table = kind, []
+    if table_kind is not None and run is not None:
+        _add_table(run, table_kind, parse_table(table))
+    if run is not None:
+        yield run
+
+
+def iter_record_runs(filepath):
     """
-    Parse a file with multiple experiment runs, associating each 'smaller' and 'larger' table with the next run header.
+    Stream a JSON-lines file of run records.
     """
     with open(filepath, "r") as f:
-        lines = f.readlines()
-    runs = []
-    i = 0
-    while i < len(lines):
-        line = lines[i].rstrip()
-        if line.startswith("Programs that got smaller:") or line.startswith("Programs that got larger:"):
-            tbl_type = "smaller" if "smaller" in line else "larger"
-            tbl = []
-            i += 1
-            while i < len(lines) and lines[i].strip():
-                tbl.append(lines[i])
-                i += 1
-            # Look ahead for the next run header
-            header = None
-            lookahead = i
-            while lookahead < len(lines):
-                if lines[lookahead].startswith("## Run: "):
-                    header = lines[lookahead].strip()
-                    break
-                lookahead += 1
-            # If this header already exists in runs, update it, else create new
-            found = False
-            for run in runs:
-                if run["header"] == header:
-                    run[tbl_type] = parse_table(tbl)
-                    found = True
-                    break
-            if not found:
-                run = {"header": header, tbl_type: parse_table(tbl)}
-                runs.append(run)
-        else:
-            i += 1
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                # A torn last line from an interrupted run
+                continue
+
+
+def load_runs(filepaths):
+    """
+    One pass over every input; later records of the same run replace earlier ones.
+    Returns {run name: record}, in first-seen order.
+    """
+    runs = {}
+    for filepath in filepaths:
+        reader = iter_record_runs if filepath.endswith(".jsonl") else iter_report_runs
+        for run in reader(filepath):
+            runs[run["run"]] = run
     return runs
 
 
 def extract_metric_geomeans(runs, metric, progtype):
     """
-    From a list of run dicts, yield (header, geomean) for each run with the given metric in the given progtype table.
-    progtype: 'smaller' or 'larger'
-    metric: 'Instcount' or 'Size.text'
-    """
-    for run in runs:
-        for row in run.get(progtype, []):
-            key = next(iter(row.values()))
-            if key.lower() == metric.lower():
-                val = row.get("Count", "").strip()
-                geomean = row.get("Geomean", "").strip().rstrip("%")
-                try:
-                    yield (run["header"], int(val), float(geomean))
-                except ValueError:
-                    continue
+    From the runs table, yield (run, count, geomean) for each run with the given metric in the given table.
+    progtype: 'smaller', 'larger', 'unchanged' or 'overall'
+    metric: e.g. 'Instcount' or 'Size.text' (case-insensitive)
+    """
+    for name, run in runs.items():
+        for label, entry in run.get("metrics", {}).items():
+            if label.lower() != metric.lower():
+                continue
+            table = entry.get(progtype)
+            if table and table.get("geomean") is not None:
+                yield (name, table.get("count"), table["geomean"])
+
+
+def rank_runs(runs, metric, progtype="overall", top=10, descending=False):
+    """
+    The `top` runs ordered by geomean of `metric` in the `progtype` table (lowest first by default).
+    """
+    ranked = sorted(
+        extract_metric_geomeans(runs, metric, progtype),
+        key=lambda x: x[2],
+        reverse=descending,
+    )
+    return ranked[:top] if top else ranked
+
+
+# ------------------------------------------------------------
+# Pareto ranking
+# ------------------------------------------------------------
+def geomean_ci(log_ratios, n_resamples=2000, confidence=0.95, rng=None):
+    """
+    Geomean (as a percent change) of per-program log ratios, with a bootstrap
+    percentile confidence interval. Returns (geomean, low, high, n).
+    """
+    import numpy as np
+    from scipy import stats
+
+    x = log_ratios[np.isfinite(log_ratios)]
+    if x.size == 0:
+        return (np.nan, np.nan, np.nan, 0)
+    gm = np.expm1(x.mean()) * 100
+    if x.size < 2 or np.all(x == x[0]):
+        return (gm, gm, gm, x.size)
+    res = stats.bootstrap(
+        (x,),
+        np.mean,
+        vectorized=True,
+        n_resamples=n_resamples,
+        confidence_level=confidence,
+        method="percentile",
+        random_state=rng,
+    )
+    ci = res.confidence_interval
+    return (gm, np.expm1(ci.low) * 100, np.expm1(ci.high) * 100, x.size)
 
 
-def main():
-    parser = argparse.ArgumentParser(description="Parse dbg-toolkit report files")
-    parser.add_argument("input_files", nargs="+", help="One or more report files")
+def store_costs(store_file, size_metric="size.text", n_resamples=2000, confidence=0.95, seed=0):
+    """
+    Per-config geomeans (with CIs) and failure counts from the merged grid store.
+    The first config of the store (baseline) is the reference.
+    Returns {run name: {"metrics": {label: {...}}, "failures": n}}.
+    """
+    import numpy as np
+
+    import results_store
+
+    table = results_store.read_store(store_file)
+    configs = results_store.configs_of(table)
+    runs = configs[1:]
+    rng = np.random.default_rng(seed)
+    metrics = [SIZE_METRICS[size_metric]] + COST_METRICS
+
+    # programs x configs matrices, one per metric; log ratios against the reference
+    logs = {}
+    for metric, label in metrics:
+        matrix = results_store.metric_matrix(table, metric, configs)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            logs[label] = np.log(matrix[:, 1:] / matrix[:, :1])
+
+    # A failure: the reference has metrics for a program, the run has none
+    has_metrics = np.zeros((len(table), len(configs)), dtype=bool)
+    for metric in results_store.metrics_of(table):
+        has_metrics |= ~np.isnan(results_store.metric_matrix(table, metric, configs))
+    failures = np.sum(has_metrics[:, :1] & ~has_metrics[:, 1:], axis=0)
+
+    costs = {}
+    for n, config in enumerate(runs):
+        entry = {"metrics": {}, "failures": int(failures[n])}
+        for _, label in metrics:
+            gm, low, high, count = geomean_ci(logs[label][:, n], n_resamples, confidence, rng)
+            entry["metrics"][label] = {"geomean": gm, "ci_low": low, "ci_high": high, "n": count}
+        costs[config] = entry
+    return costs
+
+
+def record_costs(runs, size_metric="size.text"):
+    """
+    Same shape as store_costs, from run records' overall geomeans (no CIs).
+    """
+    labels = [SIZE_METRICS[size_metric][1]] + [label for _, label in COST_METRICS]
+    costs = {}
+    for name, run in runs.items():
+        entry = {"metrics": {}, "failures": int(run.get("failures", 0) or 0)}
+        for label in labels:
+            overall = run.get("metrics", {}).get(label, {}).get("overall", {})
+            gm = overall.get("geomean")
+            gm = math.nan if gm is None else gm
+            entry["metrics"][label] = {"geomean": gm, "ci_low": math.nan, "ci_high": math.nan, "n": overall.get("count")}
+        costs[name] = entry
+    return costs
+
+
+def pareto_front(objectives):
+    """
+    Boolean mask of the non-dominated rows of an (runs x objectives) matrix, all minimized.
+    NaN objectives count as worst.
+    """
+    import numpy as np
+
+    obj = np.where(np.isnan(objectives), np.inf, objectives)
+    # dominated[i, j]: row j is no worse than row i everywhere and better somewhere
+    no_worse = np.all(obj[None, :, :] <= obj[:, None, :], axis=2)
+    better = np.any(obj[None, :, :] < obj[:, None, :], axis=2)
+    return ~np.any(no_worse & better, axis=1)
+
+
+def pareto_table(costs, size_metric="size.text"):
+    """
+    Rows for every run, Pareto-optimal runs first, each group ordered by size geomean.
+    """
+    import numpy as np
+
+    labels = [SIZE_METRICS[size_metric][1]] + [label for _, label in COST_METRICS]
+    names = list(costs)
+    objectives = np.array(
+        [[costs[n]["metrics"][l]["geomean"] for l in labels] + [costs[n]["failures"]] for n in names],
+        dtype=float,
+    ).reshape(len(names), len(labels) + 1)
+    front = pareto_front(objectives) if names else np.zeros(0, dtype=bool)
+    order = sorted(range(len(names)), key=lambda i: (not front[i], np.nan_to_num(objectives[i, 0], nan=np.inf)))
+    rows = []
+    for i in order:
+        row = {"Run": names[i], "Pareto": "*" if front[i] else ""}
+        m = _CELL_RE.match(names[i])
+        if m:
+            row.update({k: int(v) for k, v in m.groupdict().items()})
+        for label in labels:
+            gm = costs[names[i]]["metrics"][label]
+            row[label] = _fmt_ci(gm["geomean"], gm["ci_low"], gm["ci_high"])
+        row["Failures"] = costs[names[i]]["failures"]
+        rows.append(row)
+    return rows, [names[i] for i in range(len(names)) if front[i]]
+
+
+def _fmt_ci(gm, low, high):
+    if gm is None or math.isnan(gm):
+        return "n/a"
+    if math.isnan(low) or math.isnan(high):
+        return f"{gm:.2f}%"
+    return f"{gm:.2f}% [{low:.2f}, {high:.2f}]"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Parse and rank dbg-toolkit experiment results")
+    parser.add_argument("input_files", nargs="+", help="Run records (.jsonl) or report logs")
     parser.add_argument("-o", "--output", help="Optional: output JSON file")
-    args = parser.parse_args()
+    parser.add_argument(
+        "--rank-by",
+        action="append",
+        metavar="METRIC[:TABLE]",
+        help="Rank runs by this metric's geomean, e.g. 'Exec. Time' or 'Instcount:smaller' "
+        "(TABLE: overall, smaller, larger, unchanged; default: overall). Repeatable.",
+    )
+    parser.add_argument("--top", type=int, default=10, help="Runs to show per ranking, 0 for all (default: 10)")
+    parser.add_argument("--descending", action="store_true", help="Rank highest geomean first")
+    parser.add_argument(
+        "--pareto",
+        action="store_true",
+        help="Print the Pareto front over (size, compile time, exec time, failures)",
+    )
+    parser.add_argument(
+        "--store",
+        help="Merged grid results store (<log>.results.parquet) for per-program bootstrap CIs",
+    )
+    parser.add_argument(
+        "--size-metric",
+        choices=sorted(SIZE_METRICS),
+        default="size.text",
+        help="Size objective for --pareto (default: size.text)",
+    )
+    parser.add_argument("--resamples", type=int, default=2000, help="Bootstrap resamples (default: 2000)")
+    parser.add_argument("--confidence", type=float, default=0.95, help="CI confidence level (default: 0.95)")
+    parser.add_argument("--pareto-output", help="Optional: write the --pareto table as JSON")
+    args = parser.parse_args(argv)
 
-    runs = parse_all_reports(args.input_files[0])
+    runs = load_runs(args.input_files)
 
-    # Print all runs content pretty
-    # Write all parsed runs to a JSON file named after the input file
+    # Write all parsed runs to a JSON file named after the first input file
     input_base = args.input_files[0].rsplit(".", 1)[0]
     json_filename = f"{input_base}.json"
     with open(json_filename, "w") as jf:
-        json.dump(runs, jf, indent=2)
-    print(f"\nAll parsed runs written to {json_filename}")
+        json.dump(list(runs.values()), jf, indent=2)
+    print(f"\nAll parsed runs written to {json_filename} ({len(runs)} runs)")
 
     for metric in ("Instcount", "Size.text"):
         # Greatest reduction from smaller
@@ -119,10 +370,36 @@ def main():
             print(f"  {worst[0]} => Count: {worst[1]} Geomean: {worst[2]}")
         else:
             print(f"No {metric} geomean found in any 'larger' run.")
+
+    for spec in args.rank_by or ["Instcount", "Size.text"]:
+        metric, _, progtype = spec.partition(":")
+        progtype = progtype or "overall"
+        ranked = rank_runs(runs, metric, progtype, args.top, args.descending)
+        print(f"\nBest runs by {metric} geomean ({progtype}):")
+        if not ranked:
+            print("  (no runs with this metric)")
+        for pos, (name, count, geomean) in enumerate(ranked, 1):
+            print(f"  {pos:>3}. {name} => Geomean: {geomean:.2f}% Count: {count}")
+
+    if args.pareto:
+        from tabulate import tabulate
+
+        if args.store:
+            costs = store_costs(args.store, args.size_metric, args.resamples, args.confidence)
+        else:
+            costs = record_costs(runs, args.size_metric)
+        rows, front = pareto_table(costs, args.size_metric)
+        ci = f", {args.confidence:.0%} bootstrap CI" if args.store else ""
+        print(f"\nPareto front ({len(front)} of {len(rows)} runs; geomeans vs baseline{ci}):")
+        print(tabulate(rows, headers="keys", tablefmt="psql"))
+        if args.pareto_output:
+            with open(args.pareto_output, "w") as out:
+                json.dump({"front": front, "runs": costs}, out, indent=2, default=float)
+
     # Optionally output all parsed runs
     if args.output:
         with open(args.output, "w") as out:
-            json.dump(runs, out, indent=2)
+            json.dump(list(runs.values()), out, indent=2)
 
 
 if __name__ == "__main__":
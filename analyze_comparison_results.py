@@ -1,33 +1,41 @@
 import re
+import json
+import argparse
+from math import comb
+
+import numpy as np
 import pandas as pd
 from tabulate import tabulate
-from typing import Tuple
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import results_store
 
 # ------------------------------------------------------------
 # Schema
 # ------------------------------------------------------------
-COLUMNS = [
-    "Program",
-    "baseline (instcount)",
-    "daedalus (instcount)",
-    "diff (instcount)",
-    "baseline (size.text)",
-    "daedalus (size.text)",
-    "diff (size.text)",
-    "baseline (exec_time)",
-    "daedalus (exec_time)",
-    "diff (exec_time)",
-    "baseline (compile_time)",
-    "daedalus (compile_time)",
-    "diff (compile_time)",
+# Layout = [(metric, [run, ...]), ...], one entry per `compare.py -m` metric.
+# A 'diff' run holds a percent; any other run holds a raw metric value.
+Layout = List[Tuple[str, List[str]]]
+
+DEFAULT_LAYOUT: Layout = [
+    ("instcount", ["baseline", "daedalus", "diff"]),
+    ("size.text", ["baseline", "daedalus", "diff"]),
+    ("exec_time", ["baseline", "daedalus", "diff"]),
+    ("compile_time", ["baseline", "daedalus", "diff"]),
 ]
 
-_GROUPS = [
-    ("baseline (instcount)", "daedalus (instcount)", "diff (instcount)"),
-    ("baseline (size.text)", "daedalus (size.text)", "diff (size.text)"),
-    ("baseline (exec_time)", "daedalus (exec_time)", "diff (exec_time)"),
-    ("baseline (compile_time)", "daedalus (compile_time)", "diff (compile_time)"),
-]
+COLUMNS = ["Program"] + [f"{run} ({metric})" for metric, runs in DEFAULT_LAYOUT for run in runs]
+
+# Row labels used in the summary tables
+METRIC_LABELS = {
+    "instcount": "Instcount",
+    "size.text": "Size.text",
+    "exec_time": "Exec. Time",
+    "compile_time": "Compile Time",
+}
+
+# compare.py's generic names for the two sides of a diff report
+_RUN_ALIASES = {"lhs": "baseline", "rhs": "daedalus"}
 
 # tokens: numeric (incl. 'inf') or percent (incl. 'inf%')
 _TOKEN_RE = re.compile(
@@ -87,61 +95,91 @@ def _split_program(line: str) -> Tuple[str, str]:
     return prog, rest
 
 
+def _normalize_metric(name: str) -> str:
+    # compare.py is invoked with 'size..text' for the '.text' section size
+    return re.sub(r"\.{2,}", ".", name.strip())
+
+
+def layout_columns(layout: Layout) -> List[str]:
+    return ["Program"] + [f"{run} ({metric})" for metric, runs in layout for run in runs]
+
+
+def _layout_groups(layout: Layout) -> List[Tuple[str, ...]]:
+    return [tuple(f"{run} ({metric})" for run in runs) for metric, runs in layout]
+
+
+def detect_layout(lines: Sequence[str], skip_prefixes: Tuple[str, ...] = ()) -> Layout:
+    """
+    Recover the (metric, runs) layout from the two header lines compare.py prints
+    above the first data row: metric names, then run names per metric (e.g.
+    'baseline daedalus diff', or four config names for a --nodiff report).
+    Falls back to DEFAULT_LAYOUT when the header can't be interpreted.
+    """
+    header: List[List[str]] = []
+    for line in lines:
+        if not line.strip():
+            header = []
+            continue
+        m = _PROG_SPLIT_RE.search(line)
+        if m and not m.group(1).strip().startswith(skip_prefixes):
+            break
+        header.append([t for t in line.split() if t != "Program"])
+    else:
+        return DEFAULT_LAYOUT
+
+    if len(header) < 2 or not header[-2] or not header[-1]:
+        return DEFAULT_LAYOUT
+    metrics, runs = header[-2], header[-1]
+    if len(runs) % len(metrics) != 0:
+        return DEFAULT_LAYOUT
+    per_metric = len(runs) // len(metrics)
+    layout = []
+    for i, metric in enumerate(metrics):
+        group = [_RUN_ALIASES.get(r, r) for r in runs[i * per_metric : (i + 1) * per_metric]]
+        layout.append((_normalize_metric(metric), group))
+    return layout
+
+
 # ------------------------------------------------------------
 # Parser (enforces: two numbers before each %; gaps allowed)
 # ------------------------------------------------------------
-def parse_fixed_row(line: str) -> dict:
+def parse_fixed_row(line: str, layout: Optional[Layout] = None) -> dict:
     """
-    Row pattern:
+    Row pattern (default layout):
     Program  baseline daedalus diff | baseline daedalus diff | baseline daedalus diff | baseline daedalus diff
     - Program may contain spaces (everything before first numeric/inf token)
     - Any missing/empty/inf/inf% -> 0.00
     - diff stored as percent number (e.g., 12.6)
+    Other layouts (see detect_layout) follow the same rules, one group per metric.
     """
     program, rest = _split_program(line)
     toks = [m.group(0) for m in _TOKEN_RE.finditer(rest)]
 
     out = {"Program": program}
     ti = 0
-    for base_col, daed_col, diff_col in _GROUPS:
-        base = daed = diff = None
-
-        # baseline: first non-% token
-        while ti < len(toks) and base is None:
-            if toks[ti].endswith("%"):
-                break
-            base = _num_or_zero(toks[ti])
-            ti += 1
-
-        # daedalus: next non-% token
-        while ti < len(toks) and daed is None:
-            if toks[ti].endswith("%"):
-                break
-            daed = _num_or_zero(toks[ti])
-            ti += 1
-
-        # diff: prefer %, but accept numeric percent if malformed
-        if ti < len(toks):
-            if toks[ti].endswith("%"):
-                diff = _pct_to_number_or_zero(toks[ti])
-                ti += 1
-            else:
-                diff = _pct_to_number_or_zero(toks[ti])
+    for group, (_, runs) in zip(_layout_groups(layout or DEFAULT_LAYOUT), layout or DEFAULT_LAYOUT):
+        for col, run in zip(group, runs):
+            val = None
+            if run == "diff":
+                # diff: prefer %, but accept numeric percent if malformed
+                if ti < len(toks):
+                    val = _pct_to_number_or_zero(toks[ti])
+                    ti += 1
+            elif ti < len(toks) and not toks[ti].endswith("%"):
+                # raw value: next non-% token
+                val = _num_or_zero(toks[ti])
                 ti += 1
-
-        out[base_col] = 0.0 if base is None else base
-        out[daed_col] = 0.0 if daed is None else daed
-        out[diff_col] = 0.0 if diff is None else diff
+            out[col] = 0.0 if val is None else val
 
     return out
 
 
-def parse_fixed_rows(lines):
+def parse_fixed_rows(lines, layout: Optional[Layout] = None):
     if isinstance(lines, str):
         lines = [ln for ln in lines.splitlines() if ln.strip()]
     else:
         lines = [ln for ln in lines if ln and ln.strip()]
-    return [parse_fixed_row(ln) for ln in lines]
+    return [parse_fixed_row(ln, layout) for ln in lines]
 
 
 # ------------------------------------------------------------
@@ -155,223 +193,444 @@ def geomean(series: pd.Series, tol: float = 1e-12) -> float:
 
     Any value <= -100% + tol is treated as invalid (factor <= 0) and excluded.
     If no valid entries remain, returns 0.0.
+    Computed as exp(mean(log(factors))), so it can't overflow or underflow.
     """
-    s = pd.to_numeric(series, errors="coerce").dropna()
+    s = pd.to_numeric(series, errors="coerce").dropna().to_numpy(dtype=float)
 
     # Exclude values that would produce non-positive factors (<= -100%)
     s = s[s > (-100.0 + tol)]
-    if s.empty:
+    if s.size == 0:
         return 0.0
 
-    factors = 1.0 + (s / 100.0)
-    return factors.prod() ** (1.0 / len(factors)) - 1.0
+    return float(np.expm1(np.log1p(s / 100.0).mean()))
+
+
+# ------------------------------------------------------------
+# Summary engine (one vectorized pass over every metric)
+# ------------------------------------------------------------
+SUMMARY_KINDS = ("larger", "smaller", "unchanged", "overall")
+
+
+def diff_columns(layout: Layout) -> List[Tuple[str, str, Optional[str], str]]:
+    """
+    (summary row, metric, reference run, run) for every column diff_frame builds;
+    the reference is None for a compare.py 'diff' column.
+    """
+    out = []
+    for metric, runs in layout:
+        label = METRIC_LABELS.get(metric, metric)
+        if "diff" in runs:
+            out.append((label, metric, None, "diff"))
+            continue
+        others = runs[1:]
+        for run in others:
+            out.append((label if len(others) == 1 else f"{label} ({run})", metric, runs[0], run))
+    return out
+
+
+def diff_frame(df: pd.DataFrame, layout: Layout) -> pd.DataFrame:
+    """
+    Percent diffs per program, one column per summary row.
+    Metrics with a 'diff' run use it directly; --nodiff reports are diffed
+    against their first run (e.g. baseline) for every other run.
+    """
+    cols: Dict[str, pd.Series] = {}
+    for name, metric, ref_run, run in diff_columns(layout):
+        if ref_run is None:
+            cols[name] = df[f"diff ({metric})"]
+            continue
+        ref = pd.to_numeric(df[f"{ref_run} ({metric})"], errors="coerce").to_numpy(dtype=float)
+        val = pd.to_numeric(df[f"{run} ({metric})"], errors="coerce").to_numpy(dtype=float)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            pct = np.where(ref != 0, (val / ref - 1.0) * 100.0, 0.0)
+        cols[name] = pd.Series(pct, index=df.index)
+    return pd.DataFrame(cols, index=df.index)
 
 
 # ------------------------------------------------------------
-# IO + Orchestration (keeps explicit geomean recalculation blocks)
+# Significance over repeated runs (results_store.py samples)
 # ------------------------------------------------------------
-def convert_to_tsv(input_file: str, output_file: str):
+DEFAULT_ALPHA = 0.05
+# 1.4826 * MAD estimates the standard deviation of normally distributed samples
+MAD_SCALE = 1.4826
+
+
+def sample_arrays(samples: pd.DataFrame) -> Dict[Tuple[str, str, str], np.ndarray]:
+    """
+    {(config, metric, program): samples}, with metric names normalized as in layouts.
+    """
+    samples = samples.assign(metric=samples["metric"].map(_normalize_metric))
+    return {
+        key: group.to_numpy(dtype=float)
+        for key, group in samples.groupby(["config", "metric", "Program"], sort=False)["value"]
+    }
+
+
+def apply_medians(df: pd.DataFrame, layout: Layout, arrays: Dict[Tuple[str, str, str], np.ndarray]):
+    """
+    Replace every value that has samples by the median of its samples, in place.
+    """
+    programs = df["Program"].tolist()
+    for metric, runs in layout:
+        for run in runs:
+            col = f"{run} ({metric})"
+            medians = [arrays.get((run, metric, prog)) for prog in programs]
+            if not any(m is not None for m in medians):
+                continue
+            current = pd.to_numeric(df[col], errors="coerce").to_numpy(dtype=float)
+            df[col] = [np.median(m) if m is not None else cur for m, cur in zip(medians, current)]
+
+
+def significance_frame(
+    df: pd.DataFrame, layout: Layout, arrays: Dict[Tuple[str, str, str], np.ndarray], alpha: float = DEFAULT_ALPHA
+) -> pd.DataFrame:
+    """
+    Per program and diff_frame column: True when the change is significant.
+    - Fewer than two samples on either side: the single values are all there is, so
+      any change counts (the behavior without repeated runs).
+    - Both sides without spread (instcount, size.text, ...): the metric is
+      deterministic and any change counts.
+    - Otherwise a two-sided Mann-Whitney U test at `alpha`.
+    """
+    # scipy takes most of this module's import time and only repeated runs need it
+    from scipy import stats
+
+    programs = df["Program"].tolist()
+    empty = np.empty(0)
+    cols = {}
+    for name, metric, ref_run, run in diff_columns(layout):
+        sig = np.ones(len(programs), dtype=bool)
+        if ref_run is not None:
+            for i, prog in enumerate(programs):
+                a = arrays.get((ref_run, metric, prog), empty)
+                b = arrays.get((run, metric, prog), empty)
+                if len(a) < 2 or len(b) < 2 or (np.ptp(a) == 0 and np.ptp(b) == 0):
+                    continue
+                sig[i] = stats.mannwhitneyu(a, b, alternative="two-sided").pvalue < alpha
+        cols[name] = sig
+    return pd.DataFrame(cols, index=df.index)
+
+
+def noise_floors(layout: Layout, arrays: Dict[Tuple[str, str, str], np.ndarray]) -> pd.DataFrame:
+    """
+    Run-to-run noise per metric and config: the robust relative standard deviation
+    (1.4826 * MAD / median) of every program with repeated samples, summarized by its
+    median and 90th percentile over programs (fractions).
+    """
+    rows = {}
+    for metric, runs in layout:
+        label = METRIC_LABELS.get(metric, metric)
+        for run in runs:
+            rel = []
+            for (config, m, _), values in arrays.items():
+                if config != run or m != metric or len(values) < 2:
+                    continue
+                med = np.median(values)
+                if med != 0:
+                    rel.append(MAD_SCALE * np.median(np.abs(values - med)) / abs(med))
+            if not rel:
+                continue
+            runs_per_program = [len(v) for (c, m, _), v in arrays.items() if c == run and m == metric]
+            rows[f"{label} ({run})"] = {
+                "programs": len(rel),
+                "runs": int(np.median(runs_per_program)),
+                "median": float(np.median(rel)),
+                "p90": float(np.percentile(rel, 90)),
+            }
+    return pd.DataFrame.from_dict(rows, orient="index", columns=["programs", "runs", "median", "p90"])
+
+
+def min_p_value(n: int, m: int) -> float:
+    """
+    Smallest two-sided Mann-Whitney p-value n vs m distinct samples can reach.
+    """
+    return min(1.0, 2.0 / comb(n + m, n)) if n and m else 1.0
+
+
+def summarize(diffs: pd.DataFrame, tol: float = 1e-12, significant: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+    """
+    Counts, shares and geomeans of increased / decreased / unchanged programs for
+    every column of `diffs` (percent numbers) at once.
+    Returns one row per metric with '<kind> count', '<kind> %' and '<kind> geomean'
+    columns for kind in SUMMARY_KINDS (shares and geomeans as fractions).
+    With `significant` (significance_frame), only significant changes count as larger
+    or smaller; the rest are unchanged, and 'noise count' holds how many of those moved.
+    """
+    d = diffs.apply(pd.to_numeric, errors="coerce").fillna(0.0).to_numpy(dtype=float)
+    total = d.shape[0]
+    # Values <= -100% have no valid factor; they are counted but left out of geomeans
+    valid = d > (-100.0 + tol)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        logs = np.where(valid, np.log1p(d / 100.0), 0.0)
+
+    sig = np.ones_like(valid) if significant is None else significant[diffs.columns].to_numpy(dtype=bool)
+    masks = {
+        "larger": (d > 0) & sig,
+        "smaller": (d < 0) & sig,
+        "unchanged": (d == 0) | ~sig,
+        "overall": np.ones_like(valid),
+    }
+    out = {}
+    for kind, mask in masks.items():
+        count = mask.sum(axis=0)
+        used = mask & valid
+        n = used.sum(axis=0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            gm = np.where(n > 0, np.expm1(np.where(used, logs, 0.0).sum(axis=0) / np.maximum(n, 1)), 0.0)
+        out[f"{kind} count"] = count
+        out[f"{kind} %"] = count / total if total else np.zeros_like(count, dtype=float)
+        out[f"{kind} geomean"] = gm
+    if significant is not None:
+        out["noise count"] = ((d != 0) & ~sig).sum(axis=0)
+    return pd.DataFrame(out, index=diffs.columns)
+
+
+def _pct(x: float) -> str:
+    return f"{x*100:.2f}%"
+
+
+def print_summary(summary: pd.DataFrame, total_rows: int, noise: Optional[pd.DataFrame] = None):
+    tables = []
+    for kind in ("larger", "smaller", "unchanged"):
+        dfx = pd.DataFrame(
+            {
+                "Count": summary[f"{kind} count"],
+                "% of total": summary[f"{kind} %"].apply(_pct),
+                "Geomean": summary[f"{kind} geomean"].apply(_pct),
+            }
+        )
+        if kind == "unchanged" and "noise count" in summary:
+            dfx["Within noise"] = summary["noise count"]
+        tables.append(dfx)
+    larger_df, smaller_df, unchanged_df = tables
+    overall_df = pd.DataFrame(
+        {
+            "Total Programs": [total_rows] * len(summary),
+            "Geomean": summary["overall geomean"].apply(_pct).to_list(),
+        },
+        index=summary.index,
+    )
+
+    print("Programs that got increased metrics:")
+    print(tabulate(larger_df, headers="keys", tablefmt="psql"))
+    print("\nPrograms that got decreased metrics:")
+    print(tabulate(smaller_df, headers="keys", tablefmt="psql"))
+    print("\nPrograms that metrics didn't change:")
+    print(tabulate(unchanged_df, headers="keys", tablefmt="psql"))
+    print("\nOverall metrics:")
+    print(tabulate(overall_df, headers="keys", tablefmt="psql"))
+    if noise is not None and not noise.empty:
+        noise_df = pd.DataFrame(
+            {
+                "Programs": noise["programs"],
+                "Runs": noise["runs"],
+                "Median noise": noise["median"].apply(_pct),
+                "90th pct. noise": noise["p90"].apply(_pct),
+            }
+        )
+        print("\nNoise floors (robust relative std. dev. over repeated runs):")
+        print(tabulate(noise_df, headers="keys", tablefmt="psql"))
+
+
+def summary_record(summary: Optional[pd.DataFrame], noise: Optional[pd.DataFrame] = None) -> dict:
+    """
+    JSON-friendly form of a summary: {"total": N, "metrics": {label: {kind: {...}}}},
+    with shares and geomeans as percent numbers, as printed in the tables.
+    With repeated runs, also {"noise": {"<label> (<config>)": {...}}} and a
+    'within_noise' count per metric.
+    """
+    if summary is None or summary.empty:
+        return {"total": 0, "metrics": {}}
+    metrics = {}
+    for label, row in summary.iterrows():
+        metrics[label] = {
+            kind: {
+                "count": int(row[f"{kind} count"]),
+                "pct": round(float(row[f"{kind} %"]) * 100, 6),
+                "geomean": round(float(row[f"{kind} geomean"]) * 100, 6),
+            }
+            for kind in SUMMARY_KINDS
+        }
+        if "noise count" in row:
+            metrics[label]["within_noise"] = int(row["noise count"])
+    record = {"total": int(summary["overall count"].iloc[0]), "metrics": metrics}
+    if noise is not None and not noise.empty:
+        record["noise"] = {
+            label: {
+                "programs": int(row["programs"]),
+                "runs": int(row["runs"]),
+                "median_pct": round(float(row["median"]) * 100, 6),
+                "p90_pct": round(float(row["p90"]) * 100, 6),
+            }
+            for label, row in noise.iterrows()
+        }
+    return record
+
+
+# ------------------------------------------------------------
+# IO + Orchestration
+# ------------------------------------------------------------
+SKIP_PREFIXES = (
+    "Geomean",
+    "Tests",
+    "count",
+    "mean",
+    "std",
+    "min",
+    "25%",
+    "50%",
+    "75%",
+    "max",
+)
+
+
+def convert_to_tsv(input_file: str, output_file: str, layout: Optional[Layout] = None):
     with open(input_file, "r", encoding="utf-8") as f:
         raw_lines = [line.rstrip("\n") for line in f]
 
-    skip_prefixes = (
-        "Geomean",
-        "Tests",
-        "count",
-        "mean",
-        "std",
-        "min",
-        "25%",
-        "50%",
-        "75%",
-        "max",
-    )
+    if layout is None:
+        layout = detect_layout(raw_lines, SKIP_PREFIXES)
+    columns = layout_columns(layout)
 
     rows = []
     for line in raw_lines:
         if not line.strip():
             continue
-        if not _PROG_SPLIT_RE.search(line):
+        m = _PROG_SPLIT_RE.search(line)
+        if not m:
             continue
-        prog = _PROG_SPLIT_RE.search(line).group(1).strip()
-        if prog.startswith(skip_prefixes):
+        if m.group(1).strip().startswith(SKIP_PREFIXES):
             continue
-        rows.append(parse_fixed_row(line))
+        rows.append(parse_fixed_row(line, layout))
 
-    df = pd.DataFrame(rows, columns=COLUMNS) if rows else pd.DataFrame(columns=COLUMNS)
+    df = pd.DataFrame(rows, columns=columns) if rows else pd.DataFrame(columns=columns)
     df.to_csv(output_file, sep="\t", index=False)
 
     print(f"{df.shape[0]} rows x {df.shape[1]} columns")
     print(df.head(len(df)))
 
     if df.empty:
-        return
+        return None
 
-    # ===== Explicit recalculation blocks (kept) =====
-    total_rows = len(df)
+    summary = summarize(diff_frame(df, layout))
+    print_summary(summary, len(df))
+    return summary
 
-    # --- instcount ---
-    diff_instcount_col = pd.to_numeric(df["diff (instcount)"], errors="coerce").fillna(
-        0.0
-    )
-    positive_count_instcount = (diff_instcount_col > 0).sum()
-    negative_count_instcount = (diff_instcount_col < 0).sum()
-    zero_count_instcount = (diff_instcount_col == 0).sum()
-    positive_percent_instcount = positive_count_instcount / total_rows
-    negative_percent_instcount = negative_count_instcount / total_rows
-    zero_percent_instcount = zero_count_instcount / total_rows
-    geomean_diff_instcount = geomean(diff_instcount_col)
-    positive_geomean_instcount = geomean(diff_instcount_col[diff_instcount_col > 0])
-    negative_geomean_instcount = geomean(diff_instcount_col[diff_instcount_col < 0])
-    zero_geomean_instcount = geomean(diff_instcount_col[diff_instcount_col == 0])
-
-    # --- size.text ---
-    diff_sizetext_col = pd.to_numeric(df["diff (size.text)"], errors="coerce").fillna(
-        0.0
-    )
-    positive_count_sizetext = (diff_sizetext_col > 0).sum()
-    negative_count_sizetext = (diff_sizetext_col < 0).sum()
-    zero_count_sizetext = (diff_sizetext_col == 0).sum()
-    positive_percent_sizetext = positive_count_sizetext / total_rows
-    negative_percent_sizetext = negative_count_sizetext / total_rows
-    zero_percent_sizetext = zero_count_sizetext / total_rows
-    geomean_diff_sizetext = geomean(diff_sizetext_col)
-    positive_geomean_sizetext = geomean(diff_sizetext_col[diff_sizetext_col > 0])
-    negative_geomean_sizetext = geomean(diff_sizetext_col[diff_sizetext_col < 0])
-    zero_geomean_sizetext = geomean(diff_sizetext_col[diff_sizetext_col == 0])
-
-    # --- exec_time ---
-    diff_exectime_col = pd.to_numeric(df["diff (exec_time)"], errors="coerce").fillna(
-        0.0
+
+def analyze_store(
+    store_file: str,
+    output_file: str,
+    metrics: Optional[Sequence[str]] = None,
+    alpha: float = DEFAULT_ALPHA,
+):
+    """
+    Same summary as convert_to_tsv, read from a results_store.py store instead of
+    compare.py text. Raw values are used as-is, so nothing is lost to re-parsing.
+    When the store has samples of repeated runs, values are per-program medians,
+    changes only count when significant (significance_frame) and per-metric noise
+    floors are reported. Returns (summary, noise floors or None).
+    """
+    table = results_store.read_store(store_file)
+    configs = results_store.configs_of(table)
+    available = results_store.metrics_of(table)
+    metrics = [m for m in (metrics or results_store.DEFAULT_METRICS) if m in available]
+
+    # compare.py skips tests that have no metrics (crashed, failed to build or
+    # mismatched); leave them out too, so both paths count the same programs
+    missing = set(results_store.missing_programs(table, metrics))
+    if missing:
+        table = table[~table["Program"].isin(missing)].reset_index(drop=True)
+
+    layout: Layout = [(_normalize_metric(m), configs) for m in metrics]
+    data = {"Program": table["Program"].to_numpy()}
+    for metric, (name, _) in zip(metrics, layout):
+        matrix = results_store.metric_matrix(table, metric, configs)
+        for n, config in enumerate(configs):
+            data[f"{config} ({name})"] = matrix[:, n]
+    df = pd.DataFrame(data, columns=layout_columns(layout))
+
+    samples = results_store.read_samples(store_file)
+    arrays = sample_arrays(samples) if samples is not None and not samples.empty else None
+    if arrays:
+        apply_medians(df, layout, arrays)
+    df.to_csv(output_file, sep="\t", index=False)
+
+    print(f"{df.shape[0]} rows x {df.shape[1]} columns")
+    if missing:
+        print(f"{len(missing)} programs without metrics in some config left out (crashed, failed to build or mismatched)")
+    if df.empty:
+        return None, None
+
+    significant = noise = None
+    if arrays:
+        significant = significance_frame(df, layout, arrays, alpha)
+        noise = noise_floors(layout, arrays)
+        runs = int(noise["runs"].min()) if not noise.empty else 1
+        print(f"Changes count only if significant (two-sided Mann-Whitney U, alpha={alpha})")
+        if runs > 1 and min_p_value(runs, runs) >= alpha:
+            print(
+                f"Warning: with {runs} runs per config no noisy metric can reach p < {alpha}; "
+                f"repeat at least {next(k for k in range(2, 64) if min_p_value(k, k) < alpha)} times"
+            )
+    summary = summarize(diff_frame(df, layout), significant=significant)
+    print_summary(summary, len(df), noise)
+    return summary, noise
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(
+        description="Summarize a compare.py report: counts and geomeans of programs whose metrics grew, shrank or stayed."
     )
-    positive_count_exectime = (diff_exectime_col > 0).sum()
-    negative_count_exectime = (diff_exectime_col < 0).sum()
-    zero_count_exectime = (diff_exectime_col == 0).sum()
-    positive_percent_exectime = positive_count_exectime / total_rows
-    negative_percent_exectime = negative_count_exectime / total_rows
-    zero_percent_exectime = zero_count_exectime / total_rows
-    geomean_diff_exectime = geomean(diff_exectime_col)
-    positive_geomean_exectime = geomean(diff_exectime_col[diff_exectime_col > 0])
-    negative_geomean_exectime = geomean(diff_exectime_col[diff_exectime_col < 0])
-    zero_geomean_exectime = geomean(diff_exectime_col[diff_exectime_col == 0])
-
-    # --- compile_time ---
-    diff_compiletime_col = pd.to_numeric(
-        df["diff (compile_time)"], errors="coerce"
-    ).fillna(0.0)
-    positive_count_compiletime = (diff_compiletime_col > 0).sum()
-    negative_count_compiletime = (diff_compiletime_col < 0).sum()
-    zero_count_compiletime = (diff_compiletime_col == 0).sum()
-    positive_percent_compiletime = positive_count_compiletime / total_rows
-    negative_percent_compiletime = negative_count_compiletime / total_rows
-    zero_percent_compiletime = zero_count_compiletime / total_rows
-    geomean_diff_compiletime = geomean(diff_compiletime_col)
-    positive_geomean_compiletime = geomean(
-        diff_compiletime_col[diff_compiletime_col > 0]
+    p.add_argument(
+        "input_file",
+        nargs="?",
+        help="compare.py output (default: comparison_results.txt); with --store, the TSV to write",
     )
-    negative_geomean_compiletime = geomean(
-        diff_compiletime_col[diff_compiletime_col < 0]
+    p.add_argument(
+        "output_file",
+        nargs="?",
+        help="TSV of the parsed rows (default: comparison_results.tsv)",
     )
-    zero_geomean_compiletime = geomean(diff_compiletime_col[diff_compiletime_col == 0])
-
-    # ===== Summaries (tabulated) =====
-    larger_df = pd.DataFrame(
-        {
-            "Count": [
-                positive_count_instcount,
-                positive_count_sizetext,
-                positive_count_exectime,
-                positive_count_compiletime,
-            ],
-            "% of total": [
-                positive_percent_instcount,
-                positive_percent_sizetext,
-                positive_percent_exectime,
-                positive_percent_compiletime,
-            ],
-            "Geomean": [
-                positive_geomean_instcount,
-                positive_geomean_sizetext,
-                positive_geomean_exectime,
-                positive_geomean_compiletime,
-            ],
-        },
-        index=["Instcount", "Size.text", "Exec. Time", "Compile Time"],
+    p.add_argument(
+        "--store",
+        help="Read results from a results_store.py store instead of compare.py text (input_file is ignored)",
     )
-    smaller_df = pd.DataFrame(
-        {
-            "Count": [
-                negative_count_instcount,
-                negative_count_sizetext,
-                negative_count_exectime,
-                negative_count_compiletime,
-            ],
-            "% of total": [
-                negative_percent_instcount,
-                negative_percent_sizetext,
-                negative_percent_exectime,
-                negative_percent_compiletime,
-            ],
-            "Geomean": [
-                negative_geomean_instcount,
-                negative_geomean_sizetext,
-                negative_geomean_exectime,
-                negative_geomean_compiletime,
-            ],
-        },
-        index=["Instcount", "Size.text", "Exec. Time", "Compile Time"],
+    p.add_argument(
+        "--summary-json",
+        help="Also write the summary tables as JSON here",
     )
-    unchanged_df = pd.DataFrame(
-        {
-            "Count": [
-                zero_count_instcount,
-                zero_count_sizetext,
-                zero_count_exectime,
-                zero_count_compiletime,
-            ],
-            "% of total": [
-                zero_percent_instcount,
-                zero_percent_sizetext,
-                zero_percent_exectime,
-                zero_percent_compiletime,
-            ],
-            "Geomean": [
-                zero_geomean_instcount,
-                zero_geomean_sizetext,
-                zero_geomean_exectime,
-                zero_geomean_compiletime,
-            ],
-        },
-        index=["Instcount", "Size.text", "Exec. Time", "Compile Time"],
+    p.add_argument(
+        "--alpha",
+        type=float,
+        default=DEFAULT_ALPHA,
+        help=f"Significance level for changes over repeated runs, with --store (default: {DEFAULT_ALPHA})",
     )
-    overall_df = pd.DataFrame(
-        {
-            "Total Programs": [total_rows, total_rows, total_rows, total_rows],
-            "Geomean": [
-                geomean_diff_instcount,
-                geomean_diff_sizetext,
-                geomean_diff_exectime,
-                geomean_diff_compiletime,
-            ],
-        },
-        index=["Instcount", "Size.text", "Exec. Time", "Compile Time"],
+    p.add_argument(
+        "-m",
+        "--metric",
+        action="append",
+        help="Metric to summarize from --store, repeatable (default: instcount, size..text, exec_time, compile_time)",
     )
-
-    # format
-    for dfx in (larger_df, smaller_df, unchanged_df):
-        dfx["% of total"] = dfx["% of total"].apply(lambda x: f"{x*100:.2f}%")
-        dfx["Geomean"] = dfx["Geomean"].apply(lambda x: f"{x*100:.2f}%")
-    overall_df["Geomean"] = overall_df["Geomean"].apply(lambda x: f"{x*100:.2f}%")
-
-    print("Programs that got increased metrics:")
-    print(tabulate(larger_df, headers="keys", tablefmt="psql"))
-    print("\nPrograms that got decreased metrics:")
-    print(tabulate(smaller_df, headers="keys", tablefmt="psql"))
-    print("\nPrograms that metrics didn't change:")
-    print(tabulate(unchanged_df, headers="keys", tablefmt="psql"))
-    print("\nOverall metrics:")
-    print(tabulate(overall_df, headers="keys", tablefmt="psql"))
+    args = p.parse_args(argv)
+    if args.store and args.output_file is None:
+        # No text input to read: a lone positional names the TSV
+        args.input_file, args.output_file = None, args.input_file
+    args.input_file = args.input_file or "comparison_results.txt"
+    args.output_file = args.output_file or "comparison_results.tsv"
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    noise = None
+    if args.store:
+        summary, noise = analyze_store(args.store, args.output_file, args.metric, args.alpha)
+    else:
+        summary = convert_to_tsv(args.input_file, args.output_file)
+    if args.summary_json:
+        with open(args.summary_json, "w") as f:
+            json.dump(summary_record(summary, noise), f, indent=2)
 
 
 if __name__ == "__main__":
-    convert_to_tsv("comparison_results.txt", "comparison_results.tsv")
+    main()
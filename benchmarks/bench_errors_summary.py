@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark for errors-summary-grouped.py.
+- Generates a synthetic errors.txt (grep -B10 -A50 output over bc logs) of --size-mb.
+- Times the former line-by-line, 14-regex parser against the single-pass scanner.
+- Optionally times the directory mode over raw bc logs with a process pool.
+"""
+import argparse
+import importlib.util
+import os
+import random
+import re
+import shutil
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+
+REPO = Path(__file__).resolve().parent.parent
+
+
+def load_summary_module():
+    spec = importlib.util.spec_from_file_location(
+        "errors_summary_grouped", REPO / "errors-summary-grouped.py"
+    )
+    module = importlib.util.module_from_spec(spec)
+    # Registered so process-pool workers can unpickle its functions
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+summary = load_summary_module()
+
+NOISE = [
+    "daedalus: visiting function {f}",
+    "ProgramSlice: computing slice for %{n} in {f}",
+    "PHIGateAnalyzer: gate for bb.{n} is %cmp{n}",
+    " #{n} 0x00007f3a{n:08x} llvm::PassManager<llvm::Function>::run(llvm::Function&) (/opt/llvm/lib/libLLVM.so+0x{n:x})",
+    " #{n} 0x000055d2{n:08x} (/opt/llvm/bin/opt+0x{n:x})",
+    "Stack dump:",
+    "0.\tProgram arguments: opt -passes=daedalus -load-pass-plugin=libdaedalus.so -S prog{n}.e.bc",
+]
+ERRORS = [
+    "Instruction does not dominate all uses!",
+    "PHINode should have one entry for each predecessor of its parent basic block!",
+    "opt: ProgramSlice.cpp:{n}: void llvm::ProgramSlice::removeInstructions(): Assertion `I->use_empty() && \"bad\"' failed.",
+    " #{n} 0x00007f3a00001234 llvm::ProgramSlice::populateBBsWithInsts(llvm::Function*) (/x/libdaedalus.so+0x{n:x})",
+    "Basic Block in function 'f{n}' does not have terminator!",
+    "Referring to an argument in another function!",
+]
+
+
+def legacy_collect(file_path):
+    """
+    The pre-rewrite parser: every pattern searched on every line.
+    """
+    patterns = [re.compile(p) for p in summary.RAW_PATTERNS]
+    file_re = re.compile(r"^/.*?/(.*?\.log)")
+    file_errors = defaultdict(set)
+    current_file = None
+    with open(file_path, "r", errors="replace") as f:
+        for line in f:
+            m = file_re.match(line)
+            if m:
+                current_file = m.group(1)
+            if current_file:
+                for pat in patterns:
+                    mo = pat.search(line)
+                    if mo:
+                        file_errors[current_file].add(mo.group(0))
+    return file_errors
+
+
+def crash_block(rng, n):
+    lines = [rng.choice(NOISE).format(n=rng.randrange(1, 1 << 20), f=f"f{n}") for _ in range(10)]
+    lines.append("PLEASE submit a bug report to https://github.com/llvm/llvm-project/issues/")
+    for _ in range(50):
+        if rng.random() < 0.03:
+            lines.append(rng.choice(ERRORS).format(n=rng.randrange(1, 1 << 20)))
+        else:
+            lines.append(rng.choice(NOISE).format(n=rng.randrange(1, 1 << 20), f=f"f{n}"))
+    return lines
+
+
+def generate_errors_txt(path, size_mb, seed=0):
+    rng = random.Random(seed)
+    target = size_mb * 1024 * 1024
+    # Pre-render a pool of blocks and cycle them under fresh file names
+    pool = [crash_block(rng, n) for n in range(256)]
+    written = 0
+    n = 0
+    with open(path, "w") as f:
+        while written < target:
+            log = f"/root/output/bc_logs/prog{n}.e.bc.log"
+            block = pool[n % len(pool)]
+            text = "".join(
+                f"{log}{':' if i == 10 else '-'}{line}\n" for i, line in enumerate(block)
+            ) + "--\n"
+            f.write(text)
+            written += len(text)
+            n += 1
+    return written
+
+
+def generate_bc_logs(directory, size_mb, seed=0):
+    rng = random.Random(seed)
+    target = size_mb * 1024 * 1024
+    pool = ["\n".join(crash_block(rng, n)) + "\n" for n in range(256)]
+    written = 0
+    n = 0
+    while written < target:
+        text = "".join(rng.choice(NOISE).format(n=i, f="g") + "\n" for i in range(2000))
+        text += pool[n % len(pool)]
+        Path(directory, f"prog{n}.e.bc.log").write_text(text)
+        written += len(text)
+        n += 1
+    return written
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    p = argparse.ArgumentParser(description="Benchmark errors-summary-grouped.py parsers")
+    p.add_argument("--size-mb", type=int, default=1024, help="Synthetic log size in MB (default: 1024)")
+    p.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="Processes for the directory mode")
+    p.add_argument("--skip-legacy", action="store_true", help="Do not time the former parser")
+    p.add_argument("--workdir", help="Where to write synthetic logs (default: a temp dir)")
+    args = p.parse_args()
+
+    workdir = Path(args.workdir or tempfile.mkdtemp(prefix="bench-errors-"))
+    workdir.mkdir(parents=True, exist_ok=True)
+    try:
+        errors_txt = workdir / "errors.txt"
+        size = generate_errors_txt(errors_txt, args.size_mb)
+        mb = size / (1024 * 1024)
+        print(f"Synthetic errors.txt: {mb:.1f} MB")
+
+        (new, _), t_new = timed(summary.collect_errors, [str(errors_txt)])
+        print(f"  single-pass scanner : {t_new:8.2f} s  {mb / t_new:8.1f} MB/s")
+        if not args.skip_legacy:
+            old, t_old = timed(legacy_collect, errors_txt)
+            print(f"  legacy parser       : {t_old:8.2f} s  {mb / t_old:8.1f} MB/s")
+            print(f"  speedup             : {t_old / t_new:8.1f}x")
+            if dict(old) != dict(new):
+                raise SystemExit("Mismatch between legacy and single-pass results")
+            print("  results identical   : yes")
+
+        logs = workdir / "bc_logs"
+        logs.mkdir(exist_ok=True)
+        size = generate_bc_logs(logs, args.size_mb)
+        mb = size / (1024 * 1024)
+        print(f"Synthetic bc_logs/: {mb:.1f} MB")
+        for jobs in sorted({1, args.jobs}):
+            _, t = timed(summary.collect_errors, [str(logs)], jobs)
+            print(f"  directory mode -j{jobs:<3}: {t:8.2f} s  {mb / t:8.1f} MB/s")
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,508 @@
+#!/usr/bin/env python3
+"""
+Benchmark and regression suite for the toolkit's own parsers and analysers.
+- Synthetic generators for compare.py reports (comparison_results.txt), errors.txt
+  crash dumps (grep -B10 -A50 over bc logs) and multi-run experiment logs ('## Run:'
+  report logs and .jsonl run records), at 1x, 10x and 100x the production size.
+- Times analyze_comparison_results.py (parse_fixed_row, convert_to_tsv),
+  errors-summary-grouped.py (parse_errors) and analyze-experiment.py (load_runs).
+  Each parser runs in a fresh child process that reports its own peak RSS.
+- Checks every parse against what the generator wrote, plus parse_errors against
+  the legacy parser of bench_errors_summary.py at 1x.
+- Compares throughput and peak memory with benchmarks/baseline.json and exits 1
+  when a parser got slower or bigger than the tolerances allow, or parsed wrong.
+
+No LLVM installation is needed.
+
+    python3 benchmarks/bench_parsers.py                       # 1x and 10x against the baseline
+    python3 benchmarks/bench_parsers.py --scales 1,10,100
+    python3 benchmarks/bench_parsers.py --save-baseline       # after an intended change
+"""
+import argparse
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+REPO = Path(__file__).resolve().parent.parent
+BENCH_DIR = Path(__file__).resolve().parent
+DEFAULT_BASELINE = BENCH_DIR / "baseline.json"
+sys.path.insert(0, str(REPO))
+sys.path.insert(0, str(BENCH_DIR))
+
+# 1x: one SingleSource+MultiSource comparison report, the errors.txt of a bad
+# Daedalus run and the report log of a 5x5x5 cost-model grid
+PRODUCTION = {"comparison_rows": 2000, "errors_mb": 4, "report_runs": 125}
+DEFAULT_SCALES = "1,10"
+# Throughput may drop, and peak memory above the interpreter grow, by this much
+SPEED_TOLERANCE = 0.25
+MEMORY_TOLERANCE = 0.25
+# Noise floors: slowdowns and growth below these are never regressions
+TIME_SLACK_SECONDS = 0.05
+MEMORY_SLACK_MB = 16.0
+# A sample repeats the parse until this much time passed, so 1x inputs are not
+# timed from a single ~0.1 s call
+MIN_SAMPLE_SECONDS = 0.5
+# Warm-up inputs, small enough to parse in milliseconds
+WARMUP = {"comparison_rows": 20, "errors_mb": 0.02, "report_runs": 2}
+
+
+def load_module(name, filename):
+    spec = importlib.util.spec_from_file_location(name, REPO / filename)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+# ------------------------------------------------------------
+# Generators
+# ------------------------------------------------------------
+PATH_PARTS = ["MultiSource", "Benchmarks", "Applications", "SingleSource", "UnitTests", "Prolangs-C++",
+              "MiBench", "consumer-typeset", "automotive-susan", "Vectorizer", "Polybench", "linear-algebra"]
+METRICS = ["instcount", "size..text", "exec_time", "compile_time"]
+
+
+def program_name(rng, n):
+    """
+    Test-suite-like names; every 50th is very long, the case that made the program
+    split regex backtrack.
+    """
+    depth = 12 if n % 50 == 0 else rng.randint(2, 4)
+    parts = [rng.choice(PATH_PARTS) for _ in range(depth)]
+    return "/".join(parts) + f"/prog-{n}_v2.test"
+
+
+def _cell(value, width=10):
+    return f"{value:>{width}}"
+
+
+def generate_comparison(path, rows, seed=0):
+    """
+    compare.py --full --diff report of baseline vs daedalus. Returns the expected
+    [(program, baseline instcount, diff of instcount)] per row.
+    """
+    rng = random.Random(seed)
+    expected = []
+    with open(path, "w") as f:
+        f.write(f"Tests: {rows}\nMetric: {','.join(METRICS)}\n\n")
+        f.write("Program".ljust(80) + "".join(m.rjust(33) for m in METRICS) + "\n")
+        f.write(" " * 80 + "".join(_cell("lhs") + _cell("rhs") + _cell("diff", 13) for _ in METRICS) + "\n")
+        for n in range(rows):
+            name = program_name(rng, n)
+            cells = []
+            first = None
+            for metric in METRICS:
+                if rng.random() < 0.03:
+                    # A test without metrics on one side: blank cells and inf diffs
+                    lhs = rng.randint(10, 100000)
+                    cells.append(_cell(lhs) + " " * 10 + _cell("inf%", 13))
+                    first = first or (lhs, 0.0)
+                    continue
+                lhs = rng.randint(10, 100000) if metric == "instcount" else round(rng.uniform(0.01, 50), 4)
+                rhs = lhs * rng.uniform(0.8, 1.2)
+                rhs = round(rhs) if metric == "instcount" else round(rhs, 4)
+                diff = round((rhs / lhs - 1) * 100, 1)
+                cells.append(_cell(lhs) + _cell(rhs) + _cell(f"{diff}%", 13))
+                first = first or (lhs, diff)
+            f.write(name.ljust(80) + "".join(cells) + "\n")
+            expected.append((name, float(first[0]), float(first[1])))
+        f.write("\n" + "Geomean difference".ljust(80) + _cell("-1.2%", 33) * len(METRICS) + "\n")
+        for stat in ("count", "mean", "std", "min", "25%", "50%", "75%", "max"):
+            f.write(stat.ljust(80) + "".join(_cell(round(rng.uniform(0, 100), 6), 11) * 3 for _ in METRICS) + "\n")
+    return expected
+
+
+def generate_errors(path, size_mb, seed=0):
+    """
+    errors.txt of size_mb, as bench_errors_summary.py generates it.
+    """
+    import bench_errors_summary
+
+    return bench_errors_summary.generate_errors_txt(path, size_mb, seed)
+
+
+def generate_report(path, runs, seed=0):
+    """
+    Combined report log: '## Run:' headers, each followed by the summary tables
+    analyze_comparison_results.py prints. Returns {run name: overall Instcount geomean}.
+    """
+    import pandas as pd
+    from analyze_comparison_results import METRIC_LABELS, print_summary
+
+    rng = random.Random(seed)
+    labels = list(METRIC_LABELS.values())
+    templates = []
+    # print_summary is slow; render a few distinct bodies and cycle them
+    for _ in range(min(runs, 32)):
+        data = {}
+        for kind in ("larger", "smaller", "unchanged"):
+            data[f"{kind} count"] = [rng.randint(0, 2000) for _ in labels]
+            data[f"{kind} %"] = [rng.random() for _ in labels]
+            data[f"{kind} geomean"] = [rng.uniform(-0.2, 0.2) for _ in labels]
+        data["overall geomean"] = [round(rng.uniform(-0.1, 0.1), 6) for _ in labels]
+        summary = pd.DataFrame(data, index=labels)
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            print_summary(summary, 2000)
+        # As printed (and therefore parsed back): percent with two decimals
+        templates.append((out.getvalue(), float(f"{data['overall geomean'][0] * 100:.2f}")))
+    expected = {}
+    with open(path, "w") as f:
+        for n in range(runs):
+            name = f"params={n % 5 + 1}, size={(n // 5) % 5 * 10 + 20}, users={n // 25 * 10 + 10}, rep={n // 125}"
+            body, instcount_geomean = templates[n % len(templates)]
+            f.write(f"## Run: {name}\n\n{body}\n")
+            expected[name] = instcount_geomean
+    return expected
+
+
+def generate_records(path, report):
+    """
+    The .jsonl run records of the same runs (cost-model-experiment.py format).
+    """
+    am = load_module("analyze_experiment", "analyze-experiment.py")
+    with open(path, "w") as f:
+        for run in am.iter_report_runs(report):
+            f.write(json.dumps(run) + "\n")
+
+
+def generate_warmup(wdir, kinds):
+    """
+    Tiny inputs of every kind in `kinds`, parsed once by each child before timing.
+    """
+    wdir.mkdir(parents=True, exist_ok=True)
+    inputs = {}
+    if "comparison" in kinds:
+        inputs["comparison"] = wdir / "comparison_results.txt"
+        generate_comparison(inputs["comparison"], WARMUP["comparison_rows"], seed=1)
+    if "errors" in kinds:
+        inputs["errors"] = wdir / "errors.txt"
+        generate_errors(inputs["errors"], WARMUP["errors_mb"], seed=1)
+    if kinds & {"report", "records"}:
+        inputs["report"] = wdir / "experiment-report.log"
+        generate_report(inputs["report"], WARMUP["report_runs"], seed=1)
+        inputs["records"] = wdir / "experiment-runs.jsonl"
+        generate_records(inputs["records"], inputs["report"])
+    return inputs
+
+
+# ------------------------------------------------------------
+# Parsers under test (run in a child process)
+# ------------------------------------------------------------
+def run_parse_fixed_row(path, _scratch):
+    import analyze_comparison_results as acr
+
+    with open(path, "r") as f:
+        lines = [line.rstrip("\n") for line in f]
+    layout = acr.detect_layout(lines, acr.SKIP_PREFIXES)
+    rows = []
+    for line in lines:
+        m = acr._PROG_SPLIT_RE.search(line) if line.strip() else None
+        if m and not m.group(1).strip().startswith(acr.SKIP_PREFIXES):
+            rows.append(acr.parse_fixed_row(line, layout))
+    return rows
+
+
+def run_convert_to_tsv(path, scratch):
+    import analyze_comparison_results as acr
+
+    out = os.path.join(scratch, "comparison_results.tsv")
+    with contextlib.redirect_stdout(io.StringIO()):
+        acr.convert_to_tsv(path, out)
+    with open(out, "r") as f:
+        return [line.split("\t") for line in f.read().splitlines()[1:]]
+
+
+def run_parse_errors(path, scratch):
+    summary = load_module("errors_summary_grouped", "errors-summary-grouped.py")
+    with contextlib.redirect_stdout(io.StringIO()):
+        summary.parse_errors([path], output_folder=os.path.join(scratch, "errors_summary"))
+    with open(os.path.join(scratch, "errors_summary", "errors_summary_grouped.csv"), "r") as f:
+        # One row per file, then a blank row and the total
+        return [line for line in f.read().splitlines()[1:-2]]
+
+
+def run_load_runs(path, _scratch):
+    am = load_module("analyze_experiment", "analyze-experiment.py")
+    return am.load_runs([path])
+
+
+# parser -> (input kind, function)
+PARSERS = {
+    "parse_fixed_row": ("comparison", run_parse_fixed_row),
+    "convert_to_tsv": ("comparison", run_convert_to_tsv),
+    "parse_errors": ("errors", run_parse_errors),
+    "load_runs (report)": ("report", run_load_runs),
+    "load_runs (jsonl)": ("records", run_load_runs),
+}
+
+
+def peak_rss_kb():
+    """
+    High-water RSS of this process image. ru_maxrss would also count the parent
+    this child was forked from, since Linux carries it across exec.
+    """
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    import resource
+
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def child(parser, path, warmup, result_path):
+    """
+    Import and warm the parser up on a tiny input, then time it on `path` (repeated
+    until MIN_SAMPLE_SECONDS passed) and record the peak RSS before and after.
+    """
+    fn = PARSERS[parser][1]
+    with tempfile.TemporaryDirectory(prefix="bench-parsers-") as scratch:
+        # Imports, including the ones pandas/numpy do on first use, are not part of
+        # the measurement
+        load_module("analyze_experiment", "analyze-experiment.py")
+        load_module("errors_summary_grouped", "errors-summary-grouped.py")
+        import analyze_comparison_results  # noqa: F401
+        fn(warmup, scratch)
+        rss_before = peak_rss_kb()
+        runs = 0
+        start = time.perf_counter()
+        while True:
+            result = fn(path, scratch)
+            runs += 1
+            seconds = time.perf_counter() - start
+            if seconds >= MIN_SAMPLE_SECONDS:
+                break
+        seconds /= runs
+        rss_after = peak_rss_kb()
+    with open(result_path, "w") as f:
+        json.dump({"seconds": seconds, "items": len(result), "rss_before_kb": rss_before,
+                   "rss_peak_kb": rss_after, "result": _checkable(parser, result)}, f)
+
+
+def _checkable(parser, result):
+    """
+    What the parent verifies: program/value triples, file count or run geomeans.
+    """
+    if parser == "parse_fixed_row":
+        return [(r["Program"], r["baseline (instcount)"], r["diff (instcount)"]) for r in result]
+    if parser == "convert_to_tsv":
+        return [(r[0], float(r[1]), float(r[3])) for r in result]
+    if parser.startswith("load_runs"):
+        return {name: run["metrics"]["Instcount"]["overall"]["geomean"] for name, run in result.items()}
+    return len(result)
+
+
+def measure(parser, path, warmup, repeat):
+    """
+    Best of `repeat` child runs: (seconds, items, peak RSS MB, RSS growth MB, result).
+    """
+    best = None
+    for _ in range(repeat):
+        with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as tmp:
+            result_path = tmp.name
+        try:
+            proc = subprocess.run([sys.executable, __file__, "--child", parser, str(path), str(warmup), result_path])
+            if proc.returncode != 0:
+                raise RuntimeError(f"{parser} failed on {path}")
+            with open(result_path, "r") as f:
+                out = json.load(f)
+        finally:
+            os.remove(result_path)
+        peak = out["rss_peak_kb"] / 1024
+        sample = (out["seconds"], out["items"], peak, peak - out["rss_before_kb"] / 1024, out["result"])
+        if best is None or sample[0] < best[0]:
+            best = sample
+    return best
+
+
+# ------------------------------------------------------------
+# Checks
+# ------------------------------------------------------------
+def check(parser, result, truth):
+    """
+    None if the parse matches what the generator wrote, else a description.
+    """
+    kind = PARSERS[parser][0]
+    if kind == "comparison":
+        got = [tuple(r) for r in result]
+        want = [tuple(t) for t in truth]
+        if len(got) != len(want):
+            return f"{len(got)} rows parsed, {len(want)} written"
+        for g, w in zip(got, want):
+            if g[0] != w[0] or abs(g[1] - w[1]) > 1e-6 or abs(g[2] - w[2]) > 1e-6:
+                return f"row {w[0]!r}: parsed {g}, written {w}"
+    elif kind in ("report", "records"):
+        if set(result) != set(truth):
+            return f"{len(result)} runs parsed, {len(truth)} written"
+        for name, geomean in truth.items():
+            if result[name] is None or abs(result[name] - geomean) > 1e-6:
+                return f"run {name!r}: parsed geomean {result[name]}, written {geomean}"
+    elif kind == "errors":
+        if result != truth:
+            return f"{result} files with errors, legacy parser found {truth}"
+    return None
+
+
+def errors_truth(path):
+    """
+    Files with errors according to the legacy parser (1x only; it is slow).
+    """
+    import bench_errors_summary
+
+    return len(bench_errors_summary.legacy_collect(path))
+
+
+# ------------------------------------------------------------
+# Baseline
+# ------------------------------------------------------------
+def host_info():
+    cpu = ""
+    try:
+        with open("/proc/cpuinfo", "r") as f:
+            cpu = next((line.split(":", 1)[1].strip() for line in f if line.startswith("model name")), "")
+    except OSError:
+        pass
+    return {"cpu": cpu or platform.processor(), "cores": os.cpu_count(), "python": platform.python_version()}
+
+
+def load_baseline(path):
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def regression(entry, base, speed_tol, mem_tol, check_speed=True):
+    """
+    Why `entry` regressed against `base`, or None. Without `check_speed`, only
+    peak memory is compared.
+    """
+    reasons = []
+    slower = entry["seconds"] - base["seconds"] > TIME_SLACK_SECONDS
+    if check_speed and slower and entry["mb_per_s"] < base["mb_per_s"] * (1 - speed_tol):
+        reasons.append(f"throughput {entry['mb_per_s']:.1f} < {base['mb_per_s']:.1f} MB/s")
+    limit = max(base["rss_growth_mb"] * (1 + mem_tol), base["rss_growth_mb"] + MEMORY_SLACK_MB)
+    if entry["rss_growth_mb"] > limit:
+        reasons.append(f"memory {entry['rss_growth_mb']:.0f} > {limit:.0f} MB")
+    return "; ".join(reasons) or None
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Benchmark and regression-test the toolkit's parsers")
+    p.add_argument("--scales", default=DEFAULT_SCALES, help=f"Multiples of the production size (default: {DEFAULT_SCALES})")
+    p.add_argument("--parsers", help=f"Comma-separated subset of: {', '.join(PARSERS)}")
+    p.add_argument("--repeat", type=int, default=3, help="Child runs per measurement; the fastest counts (default: 3)")
+    p.add_argument("--baseline", default=str(DEFAULT_BASELINE), help=f"Stored baseline (default: {DEFAULT_BASELINE})")
+    p.add_argument("--save-baseline", action="store_true", help="Store these results as the new baseline")
+    p.add_argument("--speed-tolerance", type=float, default=SPEED_TOLERANCE, help="Allowed relative throughput drop")
+    p.add_argument("--memory-tolerance", type=float, default=MEMORY_TOLERANCE, help="Allowed relative memory growth")
+    p.add_argument("--workdir", help="Where to write synthetic inputs (default: a temp dir)")
+    p.add_argument("--child", nargs=4, help=argparse.SUPPRESS)
+    args = p.parse_args(argv)
+
+    if args.child:
+        child(*args.child)
+        return 0
+
+    from tabulate import tabulate
+
+    scales = [int(s) for s in args.scales.split(",")]
+    parsers = args.parsers.split(",") if args.parsers else list(PARSERS)
+    unknown = set(parsers) - set(PARSERS)
+    if unknown:
+        p.error(f"unknown parsers: {', '.join(sorted(unknown))}")
+    baseline = None if args.save_baseline else load_baseline(args.baseline)
+    check_speed = True
+    if baseline and baseline.get("host", {}).get("cpu") != host_info()["cpu"]:
+        # Throughput is not comparable across hosts; parse results and memory are
+        print(f"Warning: baseline recorded on '{baseline['host'].get('cpu')}'; skipping the throughput check "
+              f"(re-record with --save-baseline on this host to enable it)")
+        check_speed = False
+
+    workdir = Path(args.workdir or tempfile.mkdtemp(prefix="bench-parsers-"))
+    failures, rows, entries = [], [], {}
+    try:
+        warmup = generate_warmup(workdir / "warmup", {PARSERS[name][0] for name in parsers})
+        for scale in scales:
+            sdir = workdir / f"{scale}x"
+            sdir.mkdir(parents=True, exist_ok=True)
+            inputs, truth = {}, {}
+            kinds = {PARSERS[name][0] for name in parsers}
+            if "comparison" in kinds:
+                inputs["comparison"] = sdir / "comparison_results.txt"
+                truth["comparison"] = generate_comparison(inputs["comparison"], PRODUCTION["comparison_rows"] * scale)
+            if "errors" in kinds:
+                inputs["errors"] = sdir / "errors.txt"
+                generate_errors(inputs["errors"], PRODUCTION["errors_mb"] * scale)
+                truth["errors"] = errors_truth(inputs["errors"]) if scale == 1 else None
+            if kinds & {"report", "records"}:
+                inputs["report"] = sdir / "experiment-report.log"
+                truth["report"] = generate_report(inputs["report"], PRODUCTION["report_runs"] * scale)
+                inputs["records"] = sdir / "experiment-runs.jsonl"
+                generate_records(inputs["records"], inputs["report"])
+                truth["records"] = truth["report"]
+
+            for name in parsers:
+                kind = PARSERS[name][0]
+                path = inputs[kind]
+                mb = path.stat().st_size / 2**20
+                seconds, items, peak, growth, result = measure(name, path, warmup[kind], args.repeat)
+                key = f"{name}@{scale}x"
+                entry = {"input_mb": round(mb, 2), "items": items, "seconds": round(seconds, 4),
+                         "mb_per_s": round(mb / seconds, 2), "peak_rss_mb": round(peak, 1),
+                         "rss_growth_mb": round(growth, 1)}
+                entries[key] = entry
+                status = "ok"
+                wrong = check(name, result, truth[kind]) if truth.get(kind) is not None else None
+                if wrong:
+                    status = f"WRONG: {wrong}"
+                    failures.append(f"{key}: {wrong}")
+                base = (baseline or {}).get("results", {}).get(key)
+                if base and not wrong:
+                    why = regression(entry, base, args.speed_tolerance, args.memory_tolerance, check_speed)
+                    if why:
+                        status = f"REGRESSED: {why}"
+                        failures.append(f"{key}: {why}")
+                rows.append([name, f"{scale}x", entry["input_mb"], items, entry["seconds"], entry["mb_per_s"],
+                             entry["peak_rss_mb"], entry["rss_growth_mb"],
+                             base["mb_per_s"] if base else "", base["rss_growth_mb"] if base else "", status])
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    print(tabulate(rows, headers=["Parser", "Scale", "Input MB", "Items", "Seconds", "MB/s", "Peak RSS MB",
+                                  "RSS growth MB", "Baseline MB/s", "Baseline growth MB", "Status"], tablefmt="psql"))
+    if args.save_baseline:
+        stored = load_baseline(args.baseline) or {}
+        results = stored.get("results", {})
+        results.update(entries)
+        with open(args.baseline, "w") as f:
+            json.dump({"host": host_info(), "production": PRODUCTION, "results": dict(sorted(results.items()))},
+                      f, indent=1)
+            f.write("\n")
+        print(f"Baseline written to {args.baseline}")
+    if failures:
+        print("\nFailures:")
+        for failure in failures:
+            print(f"  {failure}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,10 +1,31 @@
 #!/usr/bin/env python3
+"""
+Run the Daedalus pass over a grid of slice parameters with gen_daedalus.sh.
+- libdaedalus.so is built once per grid; every cell only rebuilds the test suite.
+- Cells run concurrently (--jobs), each in its own test-suite build tree, lit-results
+  and output directories, with the machine's cores split between them.
+- A JSONL ledger records status, timings and result paths per cell, so re-running
+  skips completed cells and resumes at the first unfinished one.
+- Every finished cell also appends a run record (parameters plus per-metric counts
+  and geomeans) to <log stem>.runs.jsonl, which analyze-experiment.py ranks.
+- At the end, every cell's daedalus.json is merged with baseline.json into one
+  results_store.py table.
+"""
 import argparse
+import json
+import os
+import shutil
 import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 
+SCRIPT_DIR = Path(__file__).resolve().parent
+DEFAULT_LIT_RESULTS = os.path.join(os.path.expanduser("~"), "lit-results")
 
-def parse_args():
+
+def parse_args(argv=None):
     p = argparse.ArgumentParser(
         description="Run LLVM opt with daedalus pass over a grid of slice parameters."
     )
@@ -12,7 +33,7 @@ def parse_args():
         "--log-file",
         "-l",
         default="transform.log",
-        help="File to append stdout/stderr to",
+        help="Combined log of every grid cell, rebuilt after each cell",
     )
     p.add_argument(
         "--params",
@@ -31,55 +52,291 @@ def parse_args():
         default=[100],
         help="Values for -max-slice-users",
     )
-    return p.parse_args()
+    p.add_argument(
+        "--ledger",
+        help="Run ledger (default: <log-file stem>.ledger.jsonl next to the log)",
+    )
+    p.add_argument(
+        "--lit-results",
+        default=DEFAULT_LIT_RESULTS,
+        help=f"LIT results directory gen_daedalus.sh writes daedalus.json to (default: {DEFAULT_LIT_RESULTS})",
+    )
+    p.add_argument(
+        "--branch", "-b", default="bugfixes", help="Daedalus branch (default: bugfixes)"
+    )
+    p.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=1,
+        help="Grid cells to run concurrently (default: 1)",
+    )
+    p.add_argument(
+        "--cores",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Cores to split between concurrent cells (default: all)",
+    )
+    p.add_argument(
+        "--keep-builds",
+        action="store_true",
+        help="Keep each cell's test-suite build tree after it finishes",
+    )
+    p.add_argument(
+        "--restart",
+        action="store_true",
+        help="Ignore the ledger and run every cell again",
+    )
+    return p.parse_args(argv)
+
+
+def cell_id(mp, ms, mu):
+    return f"p{mp}-s{ms}-u{mu}"
+
+
+def cell_header(mp, ms, mu):
+    return f"\n\n## Run: params={mp}, size={ms}, users={mu}\n"
+
+
+# ------------------------------------------------------------
+# Ledger: append-only JSONL, the last record of a cell wins
+# ------------------------------------------------------------
+def load_ledger(path):
+    records = {}
+    if not Path(path).exists():
+        return records
+    with open(path, "r") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                # A torn last line from an interrupted run
+                continue
+            records[rec["cell"]] = rec
+    return records
+
+
+_append_lock = threading.Lock()
+
+
+def append_record(path, record):
+    with _append_lock, open(path, "a") as f:
+        f.write(json.dumps(record) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def is_done(record):
+    return (
+        record is not None
+        and record.get("status") == "done"
+        and Path(record.get("log", "")).exists()
+        and Path(record.get("result_json", "")).exists()
+    )
+
+
+def rebuild_log(log, cells, runs_dir):
+    """
+    Concatenate per-cell logs in grid order into the combined log analyze-experiment.py reads.
+    """
+    tmp = f"{log}.tmp{threading.get_ident()}"
+    with open(tmp, "w") as out:
+        for mp, ms, mu in cells:
+            cell_log = runs_dir / cell_id(mp, ms, mu) / "run.log"
+            if not cell_log.exists():
+                continue
+            out.write(cell_header(mp, ms, mu))
+            with open(cell_log, "r", errors="replace") as f:
+                shutil.copyfileobj(f, out)
+    os.replace(tmp, log)
+
+
+def build_daedalus(args, runs_dir):
+    cmd = [
+        "bash", str(SCRIPT_DIR / "gen_daedalus.sh"),
+        "-c",
+        "-b", args.branch,
+        "--lit-results", args.lit_results,
+        "--only-daedalus-build",
+    ]
+    print("Building libdaedalus.so once for the whole grid...")
+    with open(runs_dir / "daedalus-build.log", "w") as lf:
+        return subprocess.run(cmd, stdout=lf, stderr=subprocess.STDOUT).returncode
+
+
+def run_cell(args, mp, ms, mu, cell_dir, workers):
+    """
+    Run one cell in its own build tree, lit-results and work directory.
+    """
+    build_dir = cell_dir / "build"
+    lit_dir = cell_dir / "lit-results"
+    work_dir = cell_dir / "work"
+    for d in (build_dir, lit_dir, work_dir):
+        d.mkdir(parents=True, exist_ok=True)
+    # list-errors.sh compares against baseline.json in the same results folder
+    baseline = Path(args.lit_results, "baseline.json")
+    if baseline.exists():
+        shutil.copyfile(baseline, lit_dir / "baseline.json")
+
+    cmd = [
+        "bash", str(SCRIPT_DIR / "gen_daedalus.sh"),
+        "-c",
+        "-b", args.branch,
+        "-w", str(workers),
+        "--lit-results", str(lit_dir),
+        "--build-dir", str(build_dir),
+        "--work-dir", str(work_dir),
+        "--skip-daedalus-build",
+        "--max-slice-params", str(mp),
+        "--max-slice-size", str(ms),
+        "--max-slice-users", str(mu),
+    ]
+    log = cell_dir / "run.log"
+    with open(log, "w") as lf:
+        # run and capture both stdout and stderr
+        process = subprocess.run(cmd, stdout=lf, stderr=subprocess.STDOUT)
+
+    result_json = lit_dir / "daedalus.json"
+    if process.returncode == 0 and not args.keep_builds:
+        shutil.rmtree(build_dir, ignore_errors=True)
+    return process.returncode, log, result_json
 
 
-def main():
-    args = parse_args()
+def cell_summary(cell_dir):
+    """
+    Comparison summary list-errors.sh wrote for this cell, plus the number of
+    programs without metrics (failures), or None.
+    """
+    script_logs = cell_dir / "work" / "output" / "script_logs"
+    try:
+        with open(script_logs / "comparison_summary.json", "r") as f:
+            summary = json.load(f)
+    except (OSError, ValueError):
+        return None
+    # pandas is only needed once a cell has finished
+    import results_store
 
-    log = args.log_file
+    try:
+        store = results_store.read_store(str(script_logs / "results.parquet"))
+        summary["failures"] = len(results_store.missing_programs(store))
+    except (OSError, ValueError, KeyError):
+        pass
+    return summary
 
-    # remove old log file if it exists
-    if Path(log).exists():
-        Path(log).unlink()
 
+def merge_results(args, records, cells, path):
+    """
+    Join baseline.json and every finished cell's daedalus.json into one results store,
+    one config per cell (e.g. 'p5-s40-u100').
+    """
+    jsons, configs = [], []
+    baseline = Path(args.lit_results, "baseline.json")
+    if baseline.exists():
+        jsons.append(str(baseline))
+        configs.append("baseline")
+    for cell in (cell_id(*c) for c in cells):
+        rec = records.get(cell)
+        if is_done(rec):
+            jsons.append(rec["result_json"])
+            configs.append(cell)
+    if not jsons:
+        return None
+    import results_store
+
+    return results_store.write_store(results_store.build_store(jsons, configs), str(path))
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    log = Path(args.log_file)
     # ensure log directory exists
-    Path(log).parent.mkdir(parents=True, exist_ok=True)
-
-    for mp in args.params:
-        for ms in args.sizes:
-            for mu in args.users:
-                cmd = [
-                    "bash",
-                    "gen_daedalus.sh",
-                    "-c",
-                    "-b", "bugfixes",
-                    "--max-slice-params", str(mp),
-                    "--max-slice-size", str(ms),
-                    "--max-slice-users", str(mu),
-                ]
-
-                header = f"\n\n## Run: params={mp}, size={ms}, users={mu}\n"
-                with open(log, "a") as lf:
-                    lf.write(header)
-                    print(header)
-                    # run and append both stdout and stderr
-                    process = subprocess.run(cmd, stdout=lf, stderr=lf)
-                    if process.returncode != 0:
-                        print(f"[!] opt failed for params={mp},size={ms},users={mu}")
+    log.parent.mkdir(parents=True, exist_ok=True)
+    ledger = Path(args.ledger or log.with_suffix(".ledger.jsonl"))
+    runs_jsonl = log.with_suffix(".runs.jsonl")
+    runs_dir = log.parent / f"{log.stem}.runs"
+    runs_dir.mkdir(parents=True, exist_ok=True)
+
+    if args.restart and ledger.exists():
+        ledger.unlink()
+    records = load_ledger(ledger)
+
+    cells = [(mp, ms, mu) for mp in args.params for ms in args.sizes for mu in args.users]
+    pending = [c for c in cells if not is_done(records.get(cell_id(*c)))]
+    jobs = max(1, min(args.jobs, len(pending) or 1))
+    workers = max(1, args.cores // jobs)
+    print(
+        f"Grid: {len(cells)} cells, {len(cells) - len(pending)} already done, "
+        f"{jobs} concurrent x {workers} cores, ledger: {ledger}"
+    )
+
+    if pending:
+        if build_daedalus(args, runs_dir) != 0:
+            print(f"[!] Daedalus build failed, see {runs_dir / 'daedalus-build.log'}")
+            return 1
+
+    log_lock = threading.Lock()
 
+    def run(cell_params):
+        mp, ms, mu = cell_params
+        cell = cell_id(mp, ms, mu)
+        print(cell_header(mp, ms, mu).strip(), flush=True)
+        started = time.time()
+        append_record(ledger, {
+            "cell": cell, "params": mp, "size": ms, "users": mu,
+            "status": "running", "started": started, "workers": workers,
+        })
+        returncode, cell_log, result_json = run_cell(args, mp, ms, mu, runs_dir / cell, workers)
+        finished = time.time()
+        status = "done" if returncode == 0 and result_json.exists() else "failed"
+        record = {
+            "cell": cell, "params": mp, "size": ms, "users": mu,
+            "status": status, "returncode": returncode,
+            "started": started, "finished": finished, "duration": finished - started,
+            "workers": workers,
+            "log": str(cell_log.resolve()), "result_json": str(result_json.resolve()),
+        }
+        append_record(ledger, record)
+        summary = cell_summary(runs_dir / cell)
+        if status == "done" and summary is not None:
+            append_record(runs_jsonl, {
+                "run": cell, "params": mp, "size": ms, "users": mu,
+                "duration": record["duration"], **summary,
+            })
+        if status != "done":
+            print(f"[!] gen_daedalus.sh failed for params={mp},size={ms},users={mu} (see {cell_log})")
+        with log_lock:
+            rebuild_log(log, cells, runs_dir)
+        return record
+
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        for future in as_completed([pool.submit(run, c) for c in pending]):
+            record = future.result()
+            records[record["cell"]] = record
+
+    rebuild_log(log, cells, runs_dir)
     print("All runs complete. See", log)
 
-    # Analyze the log file with analyze-experiment.py
-    print("\nAnalyzing log file with analyze-experiment.py...")
-    result = subprocess.run([
-        "python3", "analyze-experiment.py", log
-    ], capture_output=True, text=True)
+    merged = merge_results(args, records, cells, log.with_suffix(".results.parquet"))
+    if merged:
+        print("Merged LIT results of every cell:", merged)
+
+    # Rank the runs with analyze-experiment.py
+    print("\nAnalyzing runs with analyze-experiment.py...")
+    report = runs_jsonl if runs_jsonl.exists() else log
+    cmd = ["python3", str(SCRIPT_DIR / "analyze-experiment.py"), str(report)]
+    if merged:
+        cmd += ["--pareto", "--store", merged]
+    result = subprocess.run(cmd, capture_output=True, text=True)
     print(result.stdout)
     if result.returncode != 0:
         print("[!] analyze-experiment.py failed:")
         print(result.stderr)
+    return 0
 
 
 if __name__ == "__main__":
-    main()
+    raise SystemExit(main())
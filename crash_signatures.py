@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+Crash deduplication: bucket bc_logs by normalized stack signature.
+- Parses the LLVM stack dump of every bc log into frames, with addresses, offsets,
+  source locations and module paths stripped, and mangled names demangled
+  (one llvm-cxxfilt / c++filt call per run).
+- Drops the signal-handling frames (PrintStackTrace, SignalHandler, abort, ...)
+  shared by every crash, then hashes the top-N frames plus the assertion or error
+  message into a bucket ID.
+- Writes an index {bucket: message, frames, representative, members}; the
+  representative is the member with the smallest source module, so it reduces fastest.
+- reduce_scheduler.py and extract_functions.py read the index to process one
+  exemplar per bucket instead of every failing test.
+
+Usage:
+    python3 crash_signatures.py bucket output/bc_logs -o output/script_logs/crash_buckets.json
+    python3 crash_signatures.py representatives output/script_logs/crash_buckets.json
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+DEFAULT_TOP_FRAMES = 5
+MESSAGE_LOOKBACK = 200
+INDEX_VERSION = 1
+
+CRASH_MARKER = "PLEASE submit a bug report to"
+# ' #12 0x000055d0c1a2b3c4 <rest>'
+FRAME_RE = re.compile(r"^\s*#(\d+)\s+0x[0-9a-fA-F]+\s*(.*)$")
+# 'symbol (/path/module.so+0x1234)' -> 'symbol'
+MODULE_SUFFIX_RE = re.compile(r"\s*\([^()]*\+0x[0-9a-fA-F]+\)\s*$")
+# glibc backtrace style: '/path/module.so(symbol+0x1c)'
+GLIBC_FRAME_RE = re.compile(r"^[^\s()]*/[^\s()]*\(([^()+]*)(?:\+0x[0-9a-fA-F]+)?\)$")
+# 'symbol /src/File.cpp:123:4' -> 'symbol'
+LOCATION_SUFFIX_RE = re.compile(r"\s+\S+:\d+(?::\d+)?$")
+OFFSET_RE = re.compile(r"\+0x[0-9a-fA-F]+$")
+CLONE_RE = re.compile(r"\s*\[clone [^\]]*\]")
+MANGLED_RE = re.compile(r"^_Z\S+$")
+
+# Frames of the crash machinery rather than the crash site
+NOISE_FRAME_RE = re.compile(
+    r"^(llvm::sys::|SignalHandler|__pthread_kill|pthread_kill|raise|gsignal|abort|"
+    r"__assert_fail|__GI_|__libc_|_start$|main$|__restore_rt|\?\?$|$)"
+)
+
+ASSERTION_RE = re.compile(r"Assertion `.+' failed\.")
+LLVM_ERROR_RE = re.compile(r"LLVM ERROR: .+")
+# Verifier messages are unindented lines ending in '!'; quoted names vary per module
+VERIFIER_RE = re.compile(r"^[A-Z][^\n]*!$")
+QUOTED_RE = re.compile(r"'[^']*'")
+
+
+# ------------------------------------------------------------
+# Parsing
+# ------------------------------------------------------------
+def frame_symbol(rest):
+    """
+    Symbol of one stack frame, without address, offset, source location or module path.
+    """
+    rest = rest.strip()
+    m = GLIBC_FRAME_RE.match(rest)
+    if m:
+        rest = m.group(1)
+    rest = MODULE_SUFFIX_RE.sub("", rest)
+    rest = LOCATION_SUFFIX_RE.sub("", rest)
+    rest = OFFSET_RE.sub("", rest)
+    return CLONE_RE.sub("", rest).strip()
+
+
+def crash_message(lines):
+    """
+    Assertion text, else the first verifier message, else the 'LLVM ERROR:' line.
+    """
+    verifier = llvm_error = None
+    for line in lines:
+        m = ASSERTION_RE.search(line)
+        if m:
+            return m.group(0)
+        if verifier is None and VERIFIER_RE.match(line):
+            verifier = QUOTED_RE.sub("'*'", line)
+        if llvm_error is None:
+            m = LLVM_ERROR_RE.search(line)
+            if m:
+                llvm_error = m.group(0)
+    return verifier or llvm_error or ""
+
+
+def parse_log(path):
+    """
+    (message, [raw frame symbols]) of the first crash in a bc log, or None without a crash.
+    """
+    with open(path, "r", errors="replace") as f:
+        text = f.read()
+    marker = text.find(CRASH_MARKER)
+    if marker < 0:
+        return None
+    # The message precedes the marker; opt's debug output further up is noise
+    lines = text[:marker].splitlines()[-MESSAGE_LOOKBACK:]
+    frames = []
+    for line in text[marker:].splitlines():
+        m = FRAME_RE.match(line)
+        if m:
+            frames.append(frame_symbol(m.group(2)))
+        elif frames and line.strip() and not line.startswith((" ", "\t")):
+            # End of the first stack dump
+            break
+    return crash_message(lines), frames
+
+
+def _parse_job(path):
+    return path, parse_log(path)
+
+
+def demangle(symbols):
+    """
+    {mangled: demangled} through one llvm-cxxfilt (or c++filt) call; identity if neither exists.
+    """
+    symbols = sorted(set(symbols))
+    tool = shutil.which("llvm-cxxfilt") or shutil.which("c++filt")
+    if not symbols or not tool:
+        return {s: s for s in symbols}
+    proc = subprocess.run([tool], input="\n".join(symbols) + "\n", capture_output=True, text=True)
+    out = proc.stdout.splitlines()
+    if proc.returncode != 0 or len(out) != len(symbols):
+        return {s: s for s in symbols}
+    return dict(zip(symbols, out))
+
+
+def normalize_frames(frames, demangled, top=DEFAULT_TOP_FRAMES):
+    names = [demangled.get(f, f) for f in frames]
+    names = [CLONE_RE.sub("", n).strip() for n in names]
+    return [n for n in names if not NOISE_FRAME_RE.match(n)][:top]
+
+
+def bucket_id(message, frames):
+    h = hashlib.sha256()
+    h.update(message.encode() + b"\0")
+    for frame in frames:
+        h.update(frame.encode() + b"\0")
+    return h.hexdigest()[:12]
+
+
+def module_name(log_path):
+    """
+    'X' for bc_logs/X.e.bc.log, the name of output/sources/X.ll.
+    """
+    name = os.path.basename(log_path)
+    for suffix in (".e.bc.log", ".log"):
+        if name.endswith(suffix):
+            return name[: -len(suffix)]
+    return name
+
+
+def source_for(log_path):
+    """
+    Same mapping as errors-summary-grouped.py: <out>/bc_logs/X.e.bc.log -> <out>/sources/X.ll
+    """
+    out_dir = os.path.dirname(os.path.dirname(os.path.abspath(log_path)))
+    return os.path.join(out_dir, "sources", f"{module_name(log_path)}.ll")
+
+
+def expand_inputs(paths):
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(
+                os.path.join(path, name) for name in sorted(os.listdir(path)) if name.endswith(".log")
+            )
+        else:
+            files.append(path)
+    return files
+
+
+# ------------------------------------------------------------
+# Bucketing
+# ------------------------------------------------------------
+def bucket_logs(paths, top=DEFAULT_TOP_FRAMES, jobs=1):
+    """
+    Bucket every crashing bc log. Returns {bucket: {...}}, largest bucket first.
+    """
+    files = expand_inputs(paths)
+    if jobs > 1 and len(files) > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            parsed = list(pool.map(_parse_job, files, chunksize=max(1, len(files) // (jobs * 4))))
+    else:
+        parsed = [_parse_job(f) for f in files]
+    parsed = [(path, crash) for path, crash in parsed if crash is not None]
+
+    demangled = demangle(f for _, (_, frames) in parsed for f in frames if MANGLED_RE.match(f))
+    buckets = {}
+    for path, (message, frames) in parsed:
+        frames = normalize_frames(frames, demangled, top)
+        bid = bucket_id(message, frames)
+        bucket = buckets.setdefault(bid, {"message": message, "frames": frames, "members": []})
+        source = source_for(path)
+        size = os.path.getsize(source) if os.path.isfile(source) else float("inf")
+        bucket["members"].append((size, module_name(path), path, source))
+
+    index = OrderedDict()
+    for bid, bucket in sorted(buckets.items(), key=lambda kv: (-len(kv[1]["members"]), kv[0])):
+        members = sorted(bucket["members"])
+        _, name, log, source = members[0]
+        index[bid] = {
+            "message": bucket["message"],
+            "frames": bucket["frames"],
+            "count": len(members),
+            "representative": {"module": name, "log": log, "source": source},
+            "members": sorted(m[1] for m in members),
+        }
+    return index
+
+
+def write_index(index, path, top=DEFAULT_TOP_FRAMES):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump({"version": INDEX_VERSION, "top_frames": top, "buckets": index}, f, indent=2)
+    os.replace(tmp, path)
+
+
+def load_index(path):
+    with open(path, "r") as f:
+        return json.load(f)["buckets"]
+
+
+def representatives(index_path):
+    """
+    Module names (X of sources/X.ll) chosen as the exemplar of each bucket.
+    """
+    return {b["representative"]["module"] for b in load_index(index_path).values()}
+
+
+def print_buckets(index):
+    total = sum(b["count"] for b in index.values())
+    print(f"{total} crashing tests in {len(index)} buckets\n")
+    for bid, bucket in index.items():
+        print(f"[{bid}] {bucket['count']:>5}  {bucket['message'] or '(no message)'}")
+        for frame in bucket["frames"]:
+            print(f"           {frame}")
+        print(f"           -> {bucket['representative']['source']}")
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Bucket bc_logs crashes by normalized stack signature.")
+    sub = p.add_subparsers(dest="command", required=True)
+
+    b = sub.add_parser("bucket", help="Bucket bc logs and write the index")
+    b.add_argument("paths", nargs="+", help="bc .log files or bc_logs/ directories")
+    b.add_argument("-o", "--output", default="crash_buckets.json", help="Index to write (default: crash_buckets.json)")
+    b.add_argument("-n", "--top", type=int, default=DEFAULT_TOP_FRAMES, help="Frames hashed per signature")
+    b.add_argument("-j", "--jobs", type=int, default=1, help="Parse logs across this many processes")
+    b.add_argument("-q", "--quiet", action="store_true", help="Don't print the buckets")
+
+    r = sub.add_parser("representatives", help="Print the representative source of every bucket")
+    r.add_argument("index", help="Index written by 'bucket'")
+
+    args = p.parse_args(argv)
+    if args.command == "bucket":
+        index = bucket_logs(args.paths, args.top, args.jobs)
+        write_index(index, args.output, args.top)
+        if not args.quiet:
+            print_buckets(index)
+        print(f"--> Crash buckets written to: {args.output}")
+    else:
+        for bucket in load_index(args.index).values():
+            print(bucket["representative"]["source"])
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Single entry point for the toolkit's post-processing scripts.
+- `dbgtk.py <command> [args]` runs a script's main() with the same arguments the
+  script takes on its own; only the script behind the command is imported, so
+  pandas/scipy are only loaded by the commands that use them.
+- `batch` redoes list-errors.sh's crash summary, crash buckets and comparison
+  analysis for many work directories in one interpreter (e.g. every grid cell).
+- `import-times` measures the cold start of every command with `python3 -X importtime`.
+
+Usage:
+    python3 dbgtk.py analyze-comparison --store results.parquet comparison_results.tsv
+    python3 dbgtk.py summarize-errors output/bc_logs -j 8
+    python3 dbgtk.py batch transform.runs/*/work [-j 8]
+    python3 dbgtk.py import-times [--repeat 5] [--top 5]
+"""
+import argparse
+import contextlib
+import importlib.util
+import os
+import re
+import sys
+import time
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+# Scripts import their siblings (results_store, opt_cache) by name
+if SCRIPT_DIR not in sys.path:
+    sys.path.insert(0, SCRIPT_DIR)
+
+# command -> (script, description)
+COMMANDS = {
+    "analyze-comparison": ("analyze_comparison_results.py", "Summarize a compare.py report or results store"),
+    "summarize-errors": ("errors-summary-grouped.py", "Group crash errors of bc logs or errors.txt per file"),
+    "analyze-experiment": ("analyze-experiment.py", "Rank the runs of experiment reports or run records"),
+    "grid": ("cost-model-experiment.py", "Run the Daedalus pass over a grid of slice parameters"),
+    "store": ("results_store.py", "Build and query results stores of LIT JSON results"),
+    "crash-signatures": ("crash_signatures.py", "Bucket bc log crashes by stack signature"),
+    "filter-lit-log": ("lit_log_filter.py", "Filter lit-output.log in one streaming pass"),
+    "repro-corpus": ("repro_corpus.py", "Collect, run and bless the reduced-reproducer corpus"),
+}
+BUILTINS = {
+    "batch": "Crash summary and comparison analysis of many list-errors.sh work directories",
+    "import-times": "Cold-start time and heaviest imports of every command",
+}
+# Cold starts above this are reported as slow by import-times
+FAST_START_MS = 100
+
+
+def load_command(command):
+    """
+    Import the script behind `command` as a module (the file names are not all
+    valid module names).
+    """
+    script = COMMANDS[command][0]
+    name = os.path.splitext(script)[0].replace("-", "_")
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.spec_from_file_location(name, os.path.join(SCRIPT_DIR, script))
+    module = importlib.util.module_from_spec(spec)
+    # Registered so process-pool workers can unpickle its functions
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def run_command(command, argv):
+    return load_command(command).main(argv) or 0
+
+
+# ------------------------------------------------------------
+# batch
+# ------------------------------------------------------------
+def find_store(script_logs):
+    for name in ("results.parquet", "results.npz"):
+        path = os.path.join(script_logs, name)
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def batch_one(work_dir, jobs, errors=True, analysis=True):
+    """
+    list-errors.sh Step 6 and its analysis for one work directory, with the same
+    outputs. Returns the steps that ran.
+    """
+    output = os.path.join(work_dir, "output")
+    bc_logs = os.path.join(output, "bc_logs")
+    script_logs = os.path.join(output, "script_logs")
+    done = []
+    if errors and os.path.isdir(bc_logs):
+        run_command("summarize-errors", [
+            bc_logs, "--jobs", str(jobs),
+            "--output-dir", os.path.join(work_dir, "errors_summary"),
+            "--faulty-functions", os.path.join(script_logs, "faulty_functions.txt"),
+        ])
+        run_command("crash-signatures", [
+            "bucket", bc_logs, "--jobs", str(jobs), "--quiet",
+            "--output", os.path.join(script_logs, "crash_buckets.json"),
+        ])
+        done.append("errors")
+    store = find_store(script_logs)
+    if analysis and store:
+        analysis_txt = os.path.join(script_logs, "comparison_analysis.txt")
+        with open(analysis_txt, "w") as f, contextlib.redirect_stdout(f):
+            run_command("analyze-comparison", [
+                "--store", store,
+                "--summary-json", os.path.join(script_logs, "comparison_summary.json"),
+                os.path.join(work_dir, "comparison_results.tsv"),
+            ])
+        print(f"--> Comparison analysis written to: {analysis_txt}")
+        done.append("analysis")
+    return done
+
+
+def batch(argv):
+    p = argparse.ArgumentParser(
+        prog="dbgtk.py batch",
+        description="Crash summary, crash buckets and comparison analysis of many list-errors.sh work directories, "
+        "in one interpreter.",
+    )
+    p.add_argument("work_dirs", nargs="+", help="list-errors.sh --work-dir directories (e.g. <log stem>.runs/*/work)")
+    p.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1, help="Processes per crash scan (default: all cores)")
+    p.add_argument("--no-errors", action="store_true", help="Skip the crash summary and buckets")
+    p.add_argument("--no-analysis", action="store_true", help="Skip the comparison analysis")
+    args = p.parse_args(argv)
+
+    failed = []
+    start = time.perf_counter()
+    for n, work_dir in enumerate(args.work_dirs, 1):
+        print(f"\n[{n}/{len(args.work_dirs)}] {work_dir}", flush=True)
+        try:
+            done = batch_one(work_dir, args.jobs, not args.no_errors, not args.no_analysis)
+        except Exception as e:  # one broken directory must not stop the batch
+            print(f"[!] {work_dir}: {e}")
+            failed.append(work_dir)
+            continue
+        if not done:
+            print(f"[!] {work_dir}: no output/bc_logs or results store")
+            failed.append(work_dir)
+    print(f"\nProcessed {len(args.work_dirs) - len(failed)} of {len(args.work_dirs)} directories "
+          f"in {time.perf_counter() - start:.1f}s")
+    for work_dir in failed:
+        print(f"  failed: {work_dir}")
+    return 1 if failed else 0
+
+
+# ------------------------------------------------------------
+# import-times
+# ------------------------------------------------------------
+_IMPORTTIME_RE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+
+def parse_importtime(stderr):
+    """
+    Top-level imports of `python3 -X importtime` output: [(module, cumulative us)].
+    """
+    imports = []
+    for line in stderr.splitlines():
+        m = _IMPORTTIME_RE.match(line)
+        # One space of indent is a top-level import; nested ones are indented further
+        if m and len(m.group(3)) == 1:
+            imports.append((m.group(4), int(m.group(2))))
+    return imports
+
+
+def time_command(command, repeat):
+    """
+    Wall time (ms) of starting the interpreter and loading `command`, best and
+    median of `repeat` runs, plus the top-level imports of the last run.
+    """
+    import statistics
+    import subprocess
+
+    walls = []
+    imports = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", os.path.abspath(__file__), "--load-only", command],
+            capture_output=True, text=True,
+        )
+        walls.append((time.perf_counter() - start) * 1000)
+        if proc.returncode != 0:
+            raise RuntimeError(f"{command}: {proc.stderr.strip().splitlines()[-1:]}")
+        imports = parse_importtime(proc.stderr)
+    return min(walls), statistics.median(walls), imports
+
+
+def import_times(argv):
+    p = argparse.ArgumentParser(prog="dbgtk.py import-times", description="Cold-start time of every command.")
+    p.add_argument("commands", nargs="*", help=f"Commands to time (default: all of {', '.join(COMMANDS)})")
+    p.add_argument("--repeat", type=int, default=5, help="Cold starts per command (default: 5)")
+    p.add_argument("--top", type=int, default=3, help="Heaviest imports listed per command (default: 3)")
+    args = p.parse_args(argv)
+
+    import subprocess
+
+    commands = args.commands or list(COMMANDS)
+    unknown = [c for c in commands if c not in COMMANDS]
+    if unknown:
+        p.error(f"unknown commands: {', '.join(unknown)}")
+    # The bare interpreter, for reference
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "pass"], check=True)
+    print(f"python3 startup: {(time.perf_counter() - start) * 1000:.0f} ms")
+    print(f"{'Command':<20} {'Best ms':>8} {'Median ms':>10}  Heaviest imports (cumulative ms)")
+    slow = 0
+    for command in commands:
+        best, median, imports = time_command(command, args.repeat)
+        heaviest = sorted(imports, key=lambda item: -item[1])[: args.top]
+        mark = "" if best < FAST_START_MS else " !"
+        slow += bool(mark)
+        print(f"{command:<20} {best:>8.0f} {median:>10.0f}  "
+              + ", ".join(f"{name} {us / 1000:.0f}" for name, us in heaviest) + mark)
+    print(f"\n! : cold start above {FAST_START_MS} ms ({slow} of {len(commands)} commands)")
+    return 0
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ["--load-only"] and len(argv) == 2:
+        # import-times probe: load the command's script and exit
+        load_command(argv[1])
+        return 0
+    if argv and (argv[0] in COMMANDS or argv[0] in BUILTINS):
+        command, rest = argv[0], argv[1:]
+        if command == "batch":
+            return batch(rest)
+        if command == "import-times":
+            return import_times(rest)
+        return run_command(command, rest)
+
+    lines = [f"  {name:<20} {desc}  ({script})" for name, (script, desc) in COMMANDS.items()]
+    lines += [f"  {name:<20} {desc}" for name, desc in BUILTINS.items()]
+    p = argparse.ArgumentParser(
+        prog="dbgtk.py",
+        description="Daedalus debug toolkit. `dbgtk.py <command> -h` shows a command's options.",
+        epilog="commands:\n" + "\n".join(lines),
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    p.add_argument("command", metavar="command", choices=[*COMMANDS, *BUILTINS], help="One of the commands below")
+    p.parse_args(argv[:1])
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
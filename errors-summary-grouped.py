@@ -1,49 +1,242 @@
 import re
 import csv
+import mmap
 import argparse
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 import os
 
+# 1) Error patterns we bucket crashes by
+RAW_PATTERNS = [
+    r"llvm::ProgramSlice::populateBBsWithInsts\(llvm::Function\*\)",
+    r"get_data_dependences_for",
+    r"appendBlockGatesToPhiParent",
+    r"removeInstructions",
+    r"Instruction does not dominate all uses!",
+    r"PHINode should have one entry for each predecessor of its parent basic block!",
+    r"PHI node has multiple entries for the same basic block with different incoming values!",
+    r"Entry block to function must not have predecessors!",
+    r"Basic Block in function '(.+)' does not have terminator!",
+    r"Only PHI nodes may reference their own value!",
+    r"Assertion\s`(.+)\sfailed\.",
+    r"Referring to an argument in another function!",
+    r"Referring to a basic block in another function!",
+    r"ProgramSlice::handleNoTerminatorSwitch"
+]
+PATTERNS = [re.compile(p.encode()) for p in RAW_PATTERNS]
 
-def parse_errors(file_path):
-    # 1) Define your patterns (all as compiled regexes)
-    raw_patterns = [
-        r"llvm::ProgramSlice::populateBBsWithInsts\(llvm::Function\*\)",
-        r"get_data_dependences_for",
-        r"appendBlockGatesToPhiParent",
-        r"removeInstructions",
-        r"Instruction does not dominate all uses!",
-        r"PHINode should have one entry for each predecessor of its parent basic block!",
-        r"PHI node has multiple entries for the same basic block with different incoming values!",
-        r"Entry block to function must not have predecessors!",
-        r"Basic Block in function '(.+)' does not have terminator!",
-        r"Only PHI nodes may reference their own value!",
-        r"Assertion\s`(.+)\sfailed\.",
-        r"Referring to an argument in another function!",
-        r"Referring to a basic block in another function!",
-        r"ProgramSlice::handleNoTerminatorSwitch"
-    ]
-    patterns = [re.compile(p) for p in raw_patterns]
-
-    # 2) File‐path regex to pick up the current .log file name
-    file_re = re.compile(r"^/.*?/(.*?\.log)")
-
-    # Maps filename -> set of matched error‐strings
+# Literal prefilter: every pattern above contains one of these strings, and
+# bytes.find() skims for them far faster than any regex can. Only lines holding a
+# literal are confirmed against the full patterns, so overlapping matches on the
+# same line are reported exactly as with per-pattern searches.
+LITERALS = [
+    b"populateBBsWithInsts",
+    b"get_data_dependences_for",
+    b"appendBlockGatesToPhiParent",
+    b"removeInstructions",
+    b"does not dominate all uses!",
+    b"PHINode should have one entry",
+    b"PHI node has multiple entries",
+    b"Entry block to function must not",
+    b"does not have terminator!",
+    b"Only PHI nodes may reference",
+    b"Assertion",
+    b"Referring to a",
+    b"handleNoTerminatorSwitch",
+]
+
+# 2) File-path regex to pick up the current .log file name
+FILE_RE = re.compile(rb"^/.*?/(.*?\.log)")
+# Same, for pattern.match(buf, pos) at a line start ('^' only matches at pos 0 there)
+FILE_AT_LINE_RE = re.compile(rb"/.*?/(.*?\.log)")
+
+# grep context list-errors.sh used to collate crashes out of bc_logs
+CRASH_MARKER = b"PLEASE submit a bug report to"
+CONTEXT_BEFORE = 10
+CONTEXT_AFTER = 50
+FAULTY_FUNCTION_PREFIX = b"Original function name"
+
+
+def _line_bounds(buf, pos, start, end):
+    line_start = buf.rfind(b"\n", start, pos) + 1
+    if line_start < start:
+        line_start = start
+    line_end = buf.find(b"\n", pos, end)
+    if line_end < 0:
+        line_end = end
+    return line_start, line_end
+
+
+def _candidates(buf, start, end):
+    """
+    Sorted offsets in buf[start:end] where any prefilter literal occurs.
+    """
+    hits = []
+    for lit in LITERALS:
+        pos = buf.find(lit, start, end)
+        while pos >= 0:
+            hits.append(pos)
+            pos = buf.find(lit, pos + len(lit), end)
+    hits.sort()
+    return hits
+
+
+def _confirm(line, errors):
+    for pat in PATTERNS:
+        mo = pat.search(line)
+        if mo:
+            # use the exact text matched as the "error type"
+            errors.add(mo.group(0).decode("utf-8", errors="replace"))
+
+
+def _scan_grep_output(buf):
+    """
+    Scan `grep -B10 -A50 ... bc_logs/*.log` output, where every line is prefixed
+    with the .log file it came from. Returns {file: set(errors)}.
+    """
+    file_errors = defaultdict(set)
+    # Last resolved line start and its owning file, so resolving is linear overall
+    resolved_at, resolved_file = -1, None
+    end = len(buf)
+    line_end = -1
+    for hit in _candidates(buf, 0, end):
+        if hit <= line_end:
+            # Line already confirmed
+            continue
+        line_start, line_end = _line_bounds(buf, hit, 0, end)
+
+        # Find the closest file header at or before this line
+        current_file = resolved_file
+        cursor = line_start
+        while cursor > resolved_at:
+            hm = FILE_AT_LINE_RE.match(buf, cursor)
+            if hm:
+                current_file = hm.group(1).decode("utf-8", errors="replace")
+                break
+            if cursor == 0:
+                break
+            cursor = buf.rfind(b"\n", 0, cursor - 1) + 1
+        resolved_at, resolved_file = line_start, current_file
+
+        if current_file:
+            errors = set()
+            _confirm(buf[line_start:line_end], errors)
+            if errors:
+                file_errors[current_file] |= errors
+    return file_errors
+
+
+def _crash_windows(buf):
+    """
+    Return merged [start, end] byte ranges covering CONTEXT_BEFORE lines before and
+    CONTEXT_AFTER lines after every crash marker, like `grep -B10 -A50`.
+    """
+    windows = []
+    pos = buf.find(CRASH_MARKER)
+    while pos >= 0:
+        start = buf.rfind(b"\n", 0, pos) + 1
+        for _ in range(CONTEXT_BEFORE):
+            if start == 0:
+                break
+            start = buf.rfind(b"\n", 0, start - 1) + 1
+        end = buf.find(b"\n", pos)
+        for _ in range(CONTEXT_AFTER):
+            if end < 0:
+                break
+            end = buf.find(b"\n", end + 1)
+        end = len(buf) if end < 0 else end
+        if windows and start <= windows[-1][1] + 1:
+            windows[-1][1] = max(windows[-1][1], end)
+        else:
+            windows.append([start, end])
+        pos = buf.find(CRASH_MARKER, end)
+    return windows
+
+
+def _scan_raw_log(buf):
+    """
+    Scan a single bc log directly. Returns (set(errors), [faulty function lines]).
+    """
+    errors = set()
+    functions = []
+    for start, end in _crash_windows(buf):
+        line_end = -1
+        for hit in _candidates(buf, start, end):
+            if hit <= line_end:
+                continue
+            line_start, line_end = _line_bounds(buf, hit, start, end)
+            _confirm(buf[line_start:line_end], errors)
+        # Windows are at most ~60 lines, so splitting them is cheap
+        for line in buf[start:end].split(b"\n"):
+            if line.startswith(FAULTY_FUNCTION_PREFIX):
+                functions.append(line.decode("utf-8", errors="replace"))
+    return errors, functions
+
+
+def _faulty_function_entry(log_path, line):
+    """
+    Map '<out>/bc_logs/X.e.bc.log' + 'Original function name: f' to '<out>/sources/X.ll f',
+    the format extract-faulty-functions.sh reads.
+    """
+    text = f"{log_path}-{line}"
+    text = re.sub(r"(.*).e.bc.log-Original function name", r"\1", text, count=1)
+    return re.sub(r"(.*)/bc_logs/(.*):", r"\1/sources/\2.ll", text, count=1)
+
+
+def scan_file(path):
+    """
+    Scan one input. Files ending in .log are treated as raw bc logs; anything else
+    (e.g. errors.txt) as concatenated grep output.
+    Returns ({file: set(errors)}, [faulty function entries]).
+    """
+    path = os.path.abspath(path)
+    if os.path.getsize(path) == 0:
+        return {}, []
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+        if not path.endswith(".log"):
+            return dict(_scan_grep_output(buf)), []
+        errors, functions = _scan_raw_log(buf)
+    hm = FILE_RE.match(path.encode())
+    key = hm.group(1).decode() if hm else os.path.basename(path)
+    return ({key: errors} if errors else {}), [_faulty_function_entry(path, line) for line in functions]
+
+
+def expand_inputs(paths):
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(
+                os.path.join(path, name) for name in sorted(os.listdir(path)) if name.endswith(".log")
+            )
+        else:
+            files.append(path)
+    return files
+
+
+def collect_errors(paths, jobs=1):
+    """
+    Scan every input (files or directories of bc logs), optionally across a process pool.
+    Returns ({file: set(errors)}, [faulty function entries]).
+    """
+    files = expand_inputs(paths)
     file_errors = defaultdict(set)
-    current_file = None
-
-    # Read through the log lines
-    with open(file_path, "r") as f:
-        for line in f:
-            m = file_re.match(line)
-            if m:
-                current_file = m.group(1)
-            if current_file:
-                for pat in patterns:
-                    mo = pat.search(line)
-                    if mo:
-                        # use the exact text matched as the "error type"
-                        file_errors[current_file].add(mo.group(0))
+    functions = []
+    if jobs > 1 and len(files) > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            results = list(pool.map(scan_file, files, chunksize=max(1, len(files) // (jobs * 4))))
+    else:
+        results = map(scan_file, files)
+    for errors, funcs in results:
+        for fname, errs in errors.items():
+            file_errors[fname] |= errs
+        functions.extend(funcs)
+    return file_errors, functions
+
+
+def parse_errors(paths, jobs=1, faulty_functions=None, output_folder=None):
+    if isinstance(paths, str):
+        paths = [paths]
+    file_errors, functions = collect_errors(paths, jobs)
 
     # 3) Compute how many files each error shows up in
     error_file_counts = defaultdict(int)
@@ -53,7 +246,7 @@ def parse_errors(file_path):
 
     total_files = len(file_errors)
 
-    output_folder = os.path.join(
+    output_folder = output_folder or os.path.join(
         os.path.dirname(os.path.abspath(__file__)), "errors_summary"
     )
     if not os.path.exists(output_folder):
@@ -80,15 +273,46 @@ def parse_errors(file_path):
         ):
             writer.writerow([err, cnt])
 
+    # 6) Optionally write the faulty functions list for extract-faulty-functions.sh
+    if faulty_functions:
+        with open(faulty_functions, "w") as f:
+            for entry in functions:
+                f.write(entry + "\n")
+        print(f"--> Faulty functions written to: {faulty_functions}")
+
     print(f"--> Summary written to: {summary_csv}")
     print(f"--> Error counts written to: {counts_csv}")
     print(f"--> Total files with at least one error: {total_files}")
 
 
-if __name__ == "__main__":
+def main(argv=None):
     parser = argparse.ArgumentParser(
         description="Parse error logs, summarize per-file errors, count files per error, and tally total files."
     )
-    parser.add_argument("filepath", help="Path to the errors.txt (or .log) file")
-    args = parser.parse_args()
-    parse_errors(args.filepath)
+    parser.add_argument(
+        "filepaths",
+        nargs="+",
+        help="errors.txt, one or more bc .log files, or directories of bc logs",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="Scan input files across this many processes (default: 1)",
+    )
+    parser.add_argument(
+        "--faulty-functions",
+        help="Optional: write '<source.ll> <function>' lines for crashing functions here",
+    )
+    parser.add_argument(
+        "-o",
+        "--output-dir",
+        help="Where to write the CSVs (default: errors_summary/ next to this script)",
+    )
+    args = parser.parse_args(argv)
+    parse_errors(args.filepaths, args.jobs, args.faulty_functions, args.output_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,11 @@
 #!/bin/bash
 
+SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
 SOURCES_="./output/faulty_sources"
 OUTPUT_DIR="./output/extended_bc_logs"
 LIBDAEDALUS_DIR="$HOME/src/github/Daedalus/build/lib/libdaedalus.so"
 CLEAN_OUTPUT=0
+CACHE_ARGS=()
 
 # Parse options
 while getopts "f:c-:" opt; do
@@ -19,14 +21,17 @@ while getopts "f:c-:" opt; do
         clean)
           CLEAN_OUTPUT=1
           ;;
+        no-cache)
+          CACHE_ARGS=(--no-cache)
+          ;;
         *)
-          echo "Usage: $0 [-f <file.ll>/<folder>] [-c|--clean]"
+          echo "Usage: $0 [-f <file.ll>/<folder>] [-c|--clean] [--no-cache]"
           exit 1
           ;;
       esac
       ;;
     *)
-      echo "Usage: $0 [-f <file.ll>/<folder>] [-c|--clean]"
+      echo "Usage: $0 [-f <file.ll>/<folder>] [-c|--clean] [--no-cache]"
       exit 1
       ;;
   esac
@@ -50,19 +55,16 @@ process_ll_file() {
   filename=$(basename "$filename" .e)
   local output_file="$output_dir/${filename}_errors.log"
   echo "Processing $ll_file..."
-  opt -stats \
+  # opt runs in a scratch directory; the *.parent_module.ll files it creates
+  # there are moved to the output directory. Unchanged inputs hit the cache.
+  python3 "$SCRIPT_DIR/opt_cache.py" "${CACHE_ARGS[@]}" \
+      -i "$ll_file" --artifacts-dir "$output_dir" -- \
+      opt -stats \
       -debug-only=daedalus,ProgramSlice,PHIGateAnalyzer \
       -passes=daedalus \
       -load-pass-plugin "$libdaedalus_dir" \
       -disable-output "$ll_file" \
       &> "$output_file"
-
-  # Move any *.parent_module.ll files to the output directory
-  shopt -s nullglob
-  for pm_file in *.parent_module.ll; do
-    mv "$pm_file" "$output_dir/"
-  done
-  shopt -u nullglob
 }
 
 # If SOURCES_ is a file, process it as a single file
@@ -2,37 +2,42 @@
 #
 # Script: extract-faulty-functions.sh
 #
-# Brief: Reads file paths from output/script_logs/faulty_functions.txt and calls extract-func.sh for each entry.
-#        Each line in faulty_functions.txt is passed as an argument to extract-func.sh.
+# Brief: Reads '<llvm-ir-file> <function-name>' lines from output/script_logs/faulty_functions.txt
+#        and extracts every function with extract_functions.py: one llvm-extract parse per
+#        module, modules in parallel. Output names match extract-func.sh.
+#        When output/script_logs/crash_buckets.json exists, only the representative module
+#        of each crash bucket is extracted (-a extracts everything).
 #
 set -euo pipefail
 IFS=$'\n\t'
 
 SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
 FAULTY_FUNCTIONS_FILE="$SCRIPT_DIR/output/script_logs/faulty_functions.txt"
-EXTRACT_FUNC_SCRIPT="$SCRIPT_DIR/extract-func.sh"
+CRASH_BUCKETS="$SCRIPT_DIR/output/script_logs/crash_buckets.json"
+EXTRACT_FUNCTIONS="$SCRIPT_DIR/extract_functions.py"
 
 if [[ ! -f "$FAULTY_FUNCTIONS_FILE" ]]; then
   echo "ERROR: $FAULTY_FUNCTIONS_FILE not found." >&2
   exit 1
 fi
 
-if [[ ! -x "$EXTRACT_FUNC_SCRIPT" ]]; then
-  echo "ERROR: $EXTRACT_FUNC_SCRIPT not found or not executable." >&2
-  exit 1
-fi
-
 OUTPUT_DIR=""
+JOBS="$(nproc 2>/dev/null || echo 1)"
+CACHE_ARGS=()
+ALL=false
 
 # Parse arguments for this script
 usage() {
-  echo "Usage: $0 [-o <output-folder>]" >&2
+  echo "Usage: $0 [-o <output-folder>] [-j <jobs>] [-n] [-a]" >&2
   exit 1
 }
 
-while getopts "o:h" opt; do
+while getopts "o:j:nah" opt; do
   case $opt in
     o) OUTPUT_DIR="$OPTARG" ;;
+    j) JOBS="$OPTARG" ;;
+    n) CACHE_ARGS=(--no-cache) ;;
+    a) ALL=true ;;
     h) usage ;;
     *) usage ;;
   esac
@@ -44,13 +49,14 @@ if [[ -z "$OUTPUT_DIR" ]]; then
 fi
 mkdir -p "$OUTPUT_DIR"
 
-while IFS= read -r line; do
-  if [[ -n "$line" ]]; then
-    # Expecting $line to be: <llvm-ir-file> <function-name>
-    llfile="$(echo $line | awk '{print $1}')"
-    funcname="$(echo $line | awk '{print $2}')"
-    # escape funcname for use in a bash command
-    funcname=$(printf '%q' "$funcname")
-    eval "bash $EXTRACT_FUNC_SCRIPT -i \"$llfile\" -f \"$funcname\" -o \"$OUTPUT_DIR\""
-  fi
-done < "$FAULTY_FUNCTIONS_FILE"
+BUCKET_ARGS=()
+if [[ "$ALL" == "false" && -f "$CRASH_BUCKETS" ]]; then
+  BUCKET_ARGS=(--buckets "$CRASH_BUCKETS")
+fi
+
+python3 "$EXTRACT_FUNCTIONS" \
+  -i "$FAULTY_FUNCTIONS_FILE" \
+  -o "$OUTPUT_DIR" \
+  -j "$JOBS" \
+  ${CACHE_ARGS[@]+"${CACHE_ARGS[@]}"} \
+  ${BUCKET_ARGS[@]+"${BUCKET_ARGS[@]}"}
@@ -1,25 +1,32 @@
 #!/bin/bash
 # Script to extract a function from an LLVM IR module
 #
-# Usage: ./extract-func.sh -i <llvm-ir-file> -f <function-name> [-o <output-folder>]
+# Usage: ./extract-func.sh -i <llvm-ir-file> -f <function-name> [-o <output-folder>] [-n]
+#
+# Results are served from the opt_cache.py result cache when the module is
+# unchanged; pass -n (or set DBGTK_NO_CACHE=1) to always rerun llvm-extract.
 #
 
 set -e
 
+SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
+
 usage() {
-    echo "Usage: $0 -i <llvm-ir-file> -f <function-name> [-o <output-folder>]"
+    echo "Usage: $0 -i <llvm-ir-file> -f <function-name> [-o <output-folder>] [-n]"
     exit 1
 }
 
 # Default values
 OUTPUT_DIR="."
+CACHE_ARGS=()
 
 # Parse arguments
-while getopts "i:f:o:h" opt; do
+while getopts "i:f:o:nh" opt; do
   case $opt in
     i) LL_FILE="$OPTARG" ;;
     f) FUNCTION_NAME="$OPTARG" ;;
     o) OUTPUT_DIR="$OPTARG" ;;
+    n) CACHE_ARGS=(--no-cache) ;;
     h) usage ;;
     *) usage ;;
   esac
@@ -50,7 +57,8 @@ fi
 OUTPUT_FILE="$OUTPUT_DIR/${BASENAME}.${FUNCTION_SHORT_NAME}.ll"
 printf "\nExtracting function: %s from %s\n\tTo %s\n" "$FUNCTION_NAME" "$LL_FILE" "$OUTPUT_FILE"
 
-if ! llvm-extract -S "-func=$FUNCTION_NAME" "$LL_FILE" -o "$OUTPUT_FILE"; then
+if ! python3 "$SCRIPT_DIR/opt_cache.py" "${CACHE_ARGS[@]}" -i "$LL_FILE" -o "$OUTPUT_FILE" -- \
+    llvm-extract -S "-func=$FUNCTION_NAME" "$LL_FILE" -o "$OUTPUT_FILE"; then
     echo "Error extracting function $FUNCTION_NAME from $LL_FILE"
     exit 1
 fi
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Batch extraction of faulty functions, one module parse per module.
+- Groups '<module.ll> <function>' requests (faulty_functions.txt) by module.
+- Runs a single llvm-extract with every requested -func= per module, then splits
+  that small combined module into one file per function.
+- Processes modules in parallel across a process pool.
+- Keeps extract-func.sh's naming: <out>/<base>.<function truncated to 64 chars>.ll
+
+With --buckets (a crash_signatures.py index), only the representative module of
+each crash bucket is extracted.
+
+Falls back to one llvm-extract per function when the combined run fails (e.g. a
+function name missing from the module), so one bad request doesn't sink the rest.
+"""
+import argparse
+import hashlib
+import os
+import re
+import shutil
+import sys
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+import crash_signatures
+from opt_cache import DEFAULT_CACHE_DIR, ResultCache
+
+FUNC_NAME_MAX = 64
+_MODULE_ID_RE = re.compile(r"^; ModuleID = '.*'$", re.MULTILINE)
+
+
+def read_requests(path):
+    """
+    {module.ll: [function, ...]} in file order, without duplicates.
+    """
+    requests = OrderedDict()
+    with open(path, "r") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) < 2:
+                continue
+            funcs = requests.setdefault(parts[0], [])
+            if parts[1] not in funcs:
+                funcs.append(parts[1])
+    return requests
+
+
+def output_path(output_dir, ll_file, func):
+    base = os.path.basename(ll_file)
+    if base.endswith(".ll"):
+        base = base[: -len(".ll")]
+    return os.path.join(output_dir, f"{base}.{func[:FUNC_NAME_MAX]}.ll")
+
+
+def _extract(cache, ll_file, funcs, out):
+    argv = ["llvm-extract", "-S"] + [f"-func={f}" for f in funcs] + [ll_file, "-o", out]
+    return cache.run(argv, inputs=[ll_file], outputs=[out])
+
+
+def _restore_module_id(path, ll_file):
+    """
+    Split outputs were read from the combined module; make their ModuleID name the
+    original module, as a direct llvm-extract would.
+    """
+    with open(path, "r") as f:
+        text = f.read()
+    text = _MODULE_ID_RE.sub(lambda _: f"; ModuleID = '{ll_file}'", text, count=1)
+    with open(path, "w") as f:
+        f.write(text)
+
+
+def extract_module(ll_file, funcs, output_dir, cache_dir=DEFAULT_CACHE_DIR, use_cache=True):
+    """
+    Extract every function in `funcs` from `ll_file`. Returns [(func, out, ok, message)].
+    """
+    cache = ResultCache(cache_dir, enabled=use_cache)
+    if not os.path.isfile(ll_file):
+        return [(f, output_path(output_dir, ll_file, f), False, f"File not found: {ll_file}") for f in funcs]
+
+    results = []
+    if len(funcs) > 1:
+        # Stable per-module scratch path, so the split runs hit the result cache too
+        tag = hashlib.sha256(os.path.abspath(ll_file).encode()).hexdigest()[:12]
+        scratch = os.path.join(output_dir, ".extract-batch", tag)
+        os.makedirs(scratch, exist_ok=True)
+        try:
+            combined = os.path.join(scratch, os.path.basename(ll_file))
+            batch = _extract(cache, ll_file, funcs, combined)
+            if batch.returncode == 0:
+                for func in funcs:
+                    out = output_path(output_dir, ll_file, func)
+                    res = _extract(cache, combined, [func], out)
+                    if res.returncode == 0:
+                        _restore_module_id(out, ll_file)
+                    results.append((func, out, res.returncode == 0, res.stderr.decode(errors="replace")))
+                return results
+        finally:
+            shutil.rmtree(scratch, ignore_errors=True)
+            try:
+                os.rmdir(os.path.dirname(scratch))
+            except OSError:
+                # Another module's scratch is still in use
+                pass
+
+    # Single function, or the combined run failed: one llvm-extract per function
+    for func in funcs:
+        out = output_path(output_dir, ll_file, func)
+        res = _extract(cache, ll_file, [func], out)
+        results.append((func, out, res.returncode == 0, res.stderr.decode(errors="replace")))
+    return results
+
+
+def _extract_module_job(job):
+    return job[0], extract_module(*job)
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Extract faulty functions, one llvm-extract parse per module.")
+    p.add_argument(
+        "-i",
+        "--input",
+        default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "output", "script_logs", "faulty_functions.txt"),
+        help="'<module.ll> <function>' lines (default: output/script_logs/faulty_functions.txt)",
+    )
+    p.add_argument("-o", "--output-dir", default="extracted_faulty_functions", help="Output folder")
+    p.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1, help="Modules processed in parallel")
+    p.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="Result cache location")
+    p.add_argument("--no-cache", action="store_true", help="Always rerun llvm-extract")
+    p.add_argument("--buckets", help="crash_signatures.py index; extract one module per crash bucket")
+    args = p.parse_args(argv)
+
+    if not os.path.isfile(args.input):
+        print(f"ERROR: {args.input} not found.", file=sys.stderr)
+        return 1
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    requests = read_requests(args.input)
+    if args.buckets:
+        exemplars = crash_signatures.representatives(args.buckets)
+        total = len(requests)
+        requests = OrderedDict(
+            (ll, funcs) for ll, funcs in requests.items()
+            if os.path.basename(ll)[: -len(".ll")] in exemplars
+        )
+        print(f"Crash buckets ({args.buckets}): extracting from {len(requests)} representatives of {total} modules")
+    jobs = [(ll, funcs, args.output_dir, args.cache_dir, not args.no_cache) for ll, funcs in requests.items()]
+    failed = 0
+    with ProcessPoolExecutor(max_workers=max(1, args.jobs)) as pool:
+        for ll_file, results in pool.map(_extract_module_job, jobs):
+            for func, out, ok, message in results:
+                print(f"\nExtracting function: {func} from {ll_file}\n\tTo {out}")
+                if ok:
+                    print(f"Function {func} extracted to {out}")
+                else:
+                    failed += 1
+                    if message.strip():
+                        print(message.rstrip(), file=sys.stderr)
+                    print(f"Error extracting function {func} from {ll_file}")
+
+    total = sum(len(funcs) for funcs in requests.values())
+    print(f"\nExtracted {total - failed} of {total} functions from {len(requests)} modules into {args.output_dir}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
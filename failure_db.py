@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+"""
+Persistent cross-run failure database (SQLite), filled after every gen_daedalus.sh run.
+- One row per run: Daedalus branch and commit (from print-repo-info.sh), slice
+  parameters and the time it was recorded.
+- One row per test and run: status (pass / build / comp / fail), LIT result code
+  and crash bucket (crash_signatures.py index).
+- Every numeric metric of the LIT JSON, per test and run.
+- Indexed by (program, run) and (metric, program, run), so diffing runs and
+  tracking a metric across runs don't need the archived comparison_results.txt.
+
+    python3 failure_db.py record --lit-json ~/lit-results/daedalus.json --repo ~/src/github/Daedalus \\
+        --output-dir output
+    python3 failure_db.py new-failures --since <commit>
+    python3 failure_db.py regressed -m instcount --threshold 5 --last 10
+"""
+import argparse
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import time
+
+import pandas as pd
+from tabulate import tabulate
+
+import results_store
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_DB = os.path.join(SCRIPT_DIR, "failures.sqlite")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    recorded REAL NOT NULL,
+    label TEXT,
+    branch TEXT,
+    commit_hash TEXT,
+    max_slice_params INTEGER,
+    max_slice_size INTEGER,
+    max_slice_users INTEGER,
+    lit_json TEXT
+);
+CREATE TABLE IF NOT EXISTS tests (
+    run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    program TEXT NOT NULL,
+    status TEXT NOT NULL,
+    code TEXT,
+    bucket TEXT,
+    PRIMARY KEY (run_id, program)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS metrics (
+    run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    program TEXT NOT NULL,
+    metric TEXT NOT NULL,
+    value REAL,
+    PRIMARY KEY (run_id, program, metric)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS buckets (
+    bucket TEXT PRIMARY KEY,
+    message TEXT,
+    frames TEXT
+);
+CREATE INDEX IF NOT EXISTS tests_program ON tests (program, run_id);
+CREATE INDEX IF NOT EXISTS tests_status ON tests (status, run_id);
+CREATE INDEX IF NOT EXISTS tests_bucket ON tests (bucket, run_id);
+CREATE INDEX IF NOT EXISTS metrics_metric ON metrics (metric, program, run_id);
+CREATE INDEX IF NOT EXISTS runs_commit ON runs (commit_hash, id);
+"""
+
+FAILED = ("build", "comp", "fail")
+
+
+def connect(path):
+    # Concurrent cost-model-experiment.py cells record into the same database
+    db = sqlite3.connect(path, timeout=60)
+    db.execute("PRAGMA foreign_keys = ON")
+    db.execute("PRAGMA journal_mode = WAL")
+    db.executescript(SCHEMA)
+    return db
+
+
+# ------------------------------------------------------------
+# Recording
+# ------------------------------------------------------------
+def repo_info(repo):
+    """
+    (branch, commit) parsed from print-repo-info.sh output, or (None, None).
+    """
+    proc = subprocess.run(
+        ["bash", os.path.join(SCRIPT_DIR, "print-repo-info.sh"), repo], capture_output=True, text=True
+    )
+    info = {}
+    for line in proc.stdout.splitlines():
+        key, sep, value = line.partition(": ")
+        if sep:
+            info[key.strip()] = value.strip()
+    return info.get("Branch"), info.get("Commit")
+
+
+def module_name(program):
+    """
+    'MultiSource/.../foo.test' -> 'foo', the name of sources/foo.ll and bc_logs/foo.e.bc.log
+    """
+    name = os.path.basename(program)
+    return name[: -len(".test")] if name.endswith(".test") else name
+
+
+def opt_statuses(bc_logs):
+    """
+    {module: 'build' | 'comp' | 'missing'} from opt_pool.py's <base>.result.json records.
+    """
+    statuses = {}
+    if not bc_logs or not os.path.isdir(bc_logs):
+        return statuses
+    for name in os.listdir(bc_logs):
+        if not name.endswith(".result.json"):
+            continue
+        try:
+            with open(os.path.join(bc_logs, name), "r") as f:
+                record = json.load(f)
+        except (OSError, ValueError):
+            continue
+        base = os.path.basename(record.get("file", name[: -len(".result.json")]))
+        statuses[base[: -len(".e.bc")] if base.endswith(".e.bc") else base] = record.get("status")
+    return statuses
+
+
+def crash_buckets(index_path):
+    """
+    ({module: bucket}, {bucket: (message, frames)}) from a crash_signatures.py index.
+    """
+    if not index_path or not os.path.isfile(index_path):
+        return {}, {}
+    with open(index_path, "r") as f:
+        index = json.load(f)["buckets"]
+    members = {m: bid for bid, b in index.items() for m in b["members"]}
+    return members, {bid: (b["message"], json.dumps(b["frames"])) for bid, b in index.items()}
+
+
+def record_run(db, lit_json, branch=None, commit=None, params=None, size=None, users=None,
+               label=None, bc_logs=None, buckets_index=None):
+    """
+    Insert one run with all of its tests and metrics in a single transaction. Returns the run id.
+    """
+    df = results_store.load_lit_json(lit_json)
+    metric_cols = [c for c in df.columns if c != "code"]
+    statuses = opt_statuses(bc_logs)
+    members, buckets = crash_buckets(buckets_index)
+
+    with db:
+        cur = db.execute(
+            "INSERT INTO runs (recorded, label, branch, commit_hash, max_slice_params, max_slice_size,"
+            " max_slice_users, lit_json) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (time.time(), label, branch, commit, params, size, users, os.path.abspath(lit_json)),
+        )
+        run_id = cur.lastrowid
+        db.executemany("INSERT OR IGNORE INTO buckets VALUES (?, ?, ?)", [(b, *v) for b, v in buckets.items()])
+
+        tests = []
+        has_metrics = df[metric_cols].notna().any(axis=1) if metric_cols else pd.Series(False, index=df.index)
+        for program, code, ok in zip(df.index, df["code"], has_metrics):
+            module = module_name(program)
+            if code == "PASS" and ok:
+                status = "pass"
+            else:
+                status = statuses.get(module) if statuses.get(module) in FAILED else "fail"
+            tests.append((run_id, program, status, code, members.get(module)))
+        db.executemany("INSERT INTO tests VALUES (?, ?, ?, ?, ?)", tests)
+
+        long = df[metric_cols].stack().reset_index()
+        long.columns = ["program", "metric", "value"]
+        db.executemany(
+            "INSERT INTO metrics VALUES (?, ?, ?, ?)",
+            ((run_id, p, m, float(v)) for p, m, v in long.itertuples(index=False)),
+        )
+    return run_id
+
+
+# ------------------------------------------------------------
+# Queries
+# ------------------------------------------------------------
+def latest_run(db):
+    row = db.execute("SELECT max(id) FROM runs").fetchone()
+    return row[0]
+
+
+def run_for_commit(db, commit):
+    """
+    Latest run whose commit starts with `commit` (short hashes work).
+    """
+    row = db.execute(
+        "SELECT max(id) FROM runs WHERE commit_hash GLOB ?", (commit + "*",)
+    ).fetchone()
+    return row[0]
+
+
+def failure_diff(db, old_run, new_run):
+    """
+    (new failures, fixed tests) of new_run relative to old_run, as [(program, status, bucket)].
+    """
+    placeholders = ",".join("?" * len(FAILED))
+    new = db.execute(
+        f"SELECT n.program, n.status, n.bucket FROM tests n"
+        f" LEFT JOIN tests o ON o.run_id = ? AND o.program = n.program"
+        f" WHERE n.run_id = ? AND n.status IN ({placeholders})"
+        f" AND (o.status IS NULL OR o.status NOT IN ({placeholders}))"
+        f" ORDER BY n.program",
+        (old_run, new_run, *FAILED, *FAILED),
+    ).fetchall()
+    fixed = db.execute(
+        f"SELECT o.program, o.status, o.bucket FROM tests o"
+        f" JOIN tests n ON n.run_id = ? AND n.program = o.program"
+        f" WHERE o.run_id = ? AND o.status IN ({placeholders}) AND n.status = 'pass'"
+        f" ORDER BY o.program",
+        (new_run, old_run, *FAILED),
+    ).fetchall()
+    return new, fixed
+
+
+def new_buckets(db, old_run, new_run):
+    """
+    Crash buckets seen in new_run but in no run up to and including old_run.
+    """
+    return db.execute(
+        "SELECT t.bucket, count(*), b.message FROM tests t LEFT JOIN buckets b USING (bucket)"
+        " WHERE t.run_id = ? AND t.bucket IS NOT NULL"
+        " AND NOT EXISTS (SELECT 1 FROM tests o WHERE o.bucket = t.bucket AND o.run_id <= ?)"
+        " GROUP BY t.bucket ORDER BY count(*) DESC",
+        (new_run, old_run),
+    ).fetchall()
+
+
+def regressed(db, metric, threshold, last):
+    """
+    Tests whose metric in the latest run exceeds its first value among the last `last`
+    runs by more than `threshold` percent: [(program, first, latest, change %)].
+    """
+    return db.execute(
+        "WITH recent AS (SELECT id FROM runs ORDER BY id DESC LIMIT ?),"
+        " vals AS (SELECT m.program, m.run_id, m.value FROM metrics m"
+        "          WHERE m.metric = ? AND m.run_id IN (SELECT id FROM recent)),"
+        " ends AS (SELECT program, min(run_id) AS first_run, max(run_id) AS last_run FROM vals GROUP BY program)"
+        " SELECT e.program, f.value, l.value, 100.0 * (l.value - f.value) / f.value AS pct"
+        " FROM ends e"
+        " JOIN vals f ON f.program = e.program AND f.run_id = e.first_run"
+        " JOIN vals l ON l.program = e.program AND l.run_id = e.last_run"
+        " WHERE e.last_run = (SELECT max(id) FROM recent) AND e.first_run < e.last_run"
+        " AND f.value > 0 AND l.value > f.value * (1 + ? / 100.0)"
+        " ORDER BY pct DESC",
+        (last, metric, threshold),
+    ).fetchall()
+
+
+def _describe_run(db, run_id):
+    row = db.execute(
+        "SELECT id, branch, substr(commit_hash, 1, 12), max_slice_params, max_slice_size, max_slice_users"
+        " FROM runs WHERE id = ?",
+        (run_id,),
+    ).fetchone()
+    return f"run {row[0]} ({row[1]} {row[2]}, params={row[3]}, size={row[4]}, users={row[5]})"
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Record runs in, and query, the cross-run failure database.")
+    p.add_argument("--db", default=DEFAULT_DB, help=f"SQLite database (default: {DEFAULT_DB})")
+    sub = p.add_subparsers(dest="command", required=True)
+
+    r = sub.add_parser("record", help="Record one run")
+    r.add_argument("--lit-json", required=True, help="LIT results JSON of the run (daedalus.json)")
+    r.add_argument("--repo", help="Daedalus repository; branch and commit come from print-repo-info.sh")
+    r.add_argument("--branch", help="Branch, overriding --repo")
+    r.add_argument("--commit", help="Commit, overriding --repo")
+    r.add_argument("--params", type=int, help="-max-slice-params of the run")
+    r.add_argument("--size", type=int, help="-max-slice-size of the run")
+    r.add_argument("--users", type=int, help="-max-slice-users of the run")
+    r.add_argument("--label", help="Free-form run label")
+    r.add_argument(
+        "--output-dir",
+        help="list-errors.sh output directory; bc_logs/ and script_logs/crash_buckets.json are read from it",
+    )
+
+    sub.add_parser("runs", help="List recorded runs")
+
+    n = sub.add_parser("new-failures", help="Failures (and fixes) of a run relative to an older one")
+    n.add_argument("--since", help="Commit (prefix) to diff against; its latest run is used")
+    n.add_argument("--since-run", type=int, help="Run id to diff against (default: the previous run)")
+    n.add_argument("--run", type=int, help="Run to inspect (default: latest)")
+
+    g = sub.add_parser("regressed", help="Tests whose metric grew across the last runs")
+    g.add_argument("-m", "--metric", default="instcount", help="LIT metric (default: instcount)")
+    g.add_argument("--threshold", type=float, default=5.0, help="Minimum increase in percent (default: 5)")
+    g.add_argument("--last", type=int, default=10, help="Number of most recent runs to look at (default: 10)")
+    args = p.parse_args(argv)
+
+    db = connect(args.db)
+    if args.command == "record":
+        branch = commit = None
+        if args.repo:
+            branch, commit = repo_info(args.repo)
+        bc_logs = os.path.join(args.output_dir, "bc_logs") if args.output_dir else None
+        index = os.path.join(args.output_dir, "script_logs", "crash_buckets.json") if args.output_dir else None
+        run_id = record_run(
+            db, args.lit_json, args.branch or branch, args.commit or commit,
+            args.params, args.size, args.users, args.label, bc_logs, index,
+        )
+        print(f"Recorded {_describe_run(db, run_id)} in {args.db}")
+
+    elif args.command == "runs":
+        rows = db.execute(
+            "SELECT r.id, datetime(r.recorded, 'unixepoch', 'localtime'), r.label, r.branch,"
+            " substr(r.commit_hash, 1, 12), r.max_slice_params, r.max_slice_size, r.max_slice_users,"
+            " sum(t.status != 'pass'), count(t.program)"
+            " FROM runs r LEFT JOIN tests t ON t.run_id = r.id GROUP BY r.id ORDER BY r.id"
+        ).fetchall()
+        headers = ["Run", "Recorded", "Label", "Branch", "Commit", "Params", "Size", "Users", "Failing", "Tests"]
+        print(tabulate(rows, headers=headers, tablefmt="github"))
+
+    elif args.command == "new-failures":
+        run = args.run or latest_run(db)
+        if run is None:
+            sys.exit("ERROR: no runs recorded")
+        if args.since:
+            old = run_for_commit(db, args.since)
+            if old is None:
+                sys.exit(f"ERROR: no run recorded for commit {args.since}")
+        else:
+            old = args.since_run or db.execute("SELECT max(id) FROM runs WHERE id < ?", (run,)).fetchone()[0]
+            if old is None:
+                sys.exit("ERROR: no earlier run to diff against")
+        new, fixed = failure_diff(db, old, run)
+        print(f"{_describe_run(db, run)} vs {_describe_run(db, old)}\n")
+        print(f"New failures: {len(new)}")
+        if new:
+            print(tabulate(new, headers=["Program", "Status", "Bucket"], tablefmt="github"))
+        print(f"\nFixed: {len(fixed)}")
+        if fixed:
+            print(tabulate(fixed, headers=["Program", "Was", "Bucket"], tablefmt="github"))
+        buckets = new_buckets(db, old, run)
+        print(f"\nNew crash buckets: {len(buckets)}")
+        if buckets:
+            print(tabulate(buckets, headers=["Bucket", "Tests", "Message"], tablefmt="github"))
+
+    elif args.command == "regressed":
+        rows = regressed(db, args.metric, args.threshold, args.last)
+        print(f"{len(rows)} tests with {args.metric} up > {args.threshold:g}% over the last {args.last} runs")
+        if rows:
+            print(tabulate(rows, headers=["Program", "First", "Latest", "Change %"], tablefmt="github", floatfmt=".2f"))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,10 +1,21 @@
 #!/bin/bash
 # Generates baseline.json for llvm-test-suite by building and running tests with specific configurations.
+# The result is stored in a baseline cache keyed on a fingerprint of everything the
+# baseline depends on (clang/lld versions, test-suite commit, Os.cmake, hardware, LIT
+# settings and this script); on a hit, the build and LIT runs are skipped.
+
+SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
 
 LLVM_TEST_SUITE="$HOME/src/github/llvm-test-suite"
 LIT_RESULTS="$HOME/lit-results"
 TIMEOUT=120
 WORKERS=10
+REPEAT=1
+REPEAT_MIN_TIME=0
+BASELINE_CACHE="${DBGTK_BASELINE_CACHE:-$HOME/.cache/daedalus-dbg-toolkit/baselines}"
+USE_CACHE=true
+TIMELINE=""
+BUILD_DIR=""
 
 usage() {
     cat <<EOF
@@ -17,11 +28,17 @@ Options:
   -t, --timeout <n>        Timeout to set for LIT (default $TIMEOUT)
   --llvm-test-suite <path> Path to LLVM test suite (default: $LLVM_TEST_SUITE)
   --lit-results <path>     Directory for LIT results JSON (default: $LIT_RESULTS)
+  --build-dir <path>       Test suite build tree (default: <llvm-test-suite>/build)
+  --repeat <n>             Run LIT n times; baseline.json holds the per-test medians (default: $REPEAT)
+  --repeat-min-time <s>    Only repeat tests whose exec_time reached s seconds in the first run (default: all)
+  --baseline-cache <path>  Baseline cache directory (default: $BASELINE_CACHE)
+  --no-cache               Always build and run the baseline (the result is still stored)
+  --timeline <file>        Record a CPU/memory/disk timeline of the phases (see phase_timeline.py)
 EOF
 }
 
 # Parse arguments
-if ! PARSED=$(getopt -o hcw:t: --long help,clean,workers:,timeout:,llvm-test-suite:,lit-results: -n "$(basename "$0")" -- "$@"); then
+if ! PARSED=$(getopt -o hcw:t: --long help,clean,workers:,timeout:,llvm-test-suite:,lit-results:,build-dir:,repeat:,repeat-min-time:,baseline-cache:,no-cache,timeline: -n "$(basename "$0")" -- "$@"); then
     usage; exit 1
 fi
 eval set -- "$PARSED"
@@ -34,20 +51,82 @@ while true; do
         -t|--timeout) TIMEOUT="$2"; shift 2;;
         --llvm-test-suite) LLVM_TEST_SUITE="$2"; shift 2;;
         --lit-results) LIT_RESULTS="$2"; shift 2;;
+        --build-dir) BUILD_DIR="$2"; shift 2;;
+        --repeat) REPEAT="$2"; shift 2;;
+        --repeat-min-time) REPEAT_MIN_TIME="$2"; shift 2;;
+        --baseline-cache) BASELINE_CACHE="$2"; shift 2;;
+        --no-cache) USE_CACHE=false; shift;;
+        --timeline) TIMELINE="$2"; shift 2;;
         --) shift; break;;
         *) echo "Unknown option: $1"; usage; exit 1;;
     esac
 done
+BUILD_DIR="${BUILD_DIR:-$LLVM_TEST_SUITE/build}"
+
+# Phase markers for phase_timeline.py; no-ops unless $DBGTK_TIMELINE is being recorded.
+# A timeline started by run-experiment.sh is inherited through the environment.
+phase() {
+    [[ -n "${DBGTK_TIMELINE:-}" ]] || return 0
+    python3 "$SCRIPT_DIR/phase_timeline.py" mark "$@" || true
+}
+if [[ -n "$TIMELINE" && -z "${DBGTK_TIMELINE:-}" ]]; then
+    python3 "$SCRIPT_DIR/phase_timeline.py" start "$TIMELINE" \
+        --meta script=gen_baseline.sh --meta workers="$WORKERS" --meta timeout="$TIMEOUT" --meta repeat="$REPEAT"
+    export DBGTK_TIMELINE="$TIMELINE"
+    trap 'python3 "$SCRIPT_DIR/phase_timeline.py" stop "$DBGTK_TIMELINE" || true' EXIT
+fi
+
+# Everything the baseline results depend on
+fingerprint_inputs() {
+    echo "clang: $(clang --version 2>/dev/null | head -n1)"
+    echo "lld: $(ld.lld --version 2>/dev/null | head -n1)"
+    echo "test-suite: $(git -C "$LLVM_TEST_SUITE" rev-parse HEAD 2>/dev/null)"
+    echo "test-suite changes: $(git -C "$LLVM_TEST_SUITE" diff HEAD 2>/dev/null | sha256sum | cut -d' ' -f1)"
+    echo "Os.cmake: $(sha256sum "$LLVM_TEST_SUITE/cmake/caches/Os.cmake" 2>/dev/null | cut -d' ' -f1)"
+    echo "cpu: $(grep -m1 'model name' /proc/cpuinfo 2>/dev/null | cut -d: -f2- | xargs)"
+    echo "cores: $(nproc)"
+    echo "memory: $(grep -m1 MemTotal /proc/meminfo 2>/dev/null | awk '{print $2}') kB"
+    echo "workers: $WORKERS"
+    echo "timeout: $TIMEOUT"
+    [[ "$REPEAT_MIN_TIME" != 0 ]] && echo "repeat min time: $REPEAT_MIN_TIME"
+    echo "script: $(sha256sum "${BASH_SOURCE[0]}" | cut -d' ' -f1)"
+}
+
+FINGERPRINT=$(fingerprint_inputs | sha256sum | cut -c1-16)
+CACHE_ENTRY="$BASELINE_CACHE/$FINGERPRINT"
+mkdir -p "$LIT_RESULTS"
+
+# A hit needs an entry recorded with at least --repeat runs requested; with
+# --repeat-min-time it may hold fewer run files (no test was slow enough to repeat)
+cached_repeat() {
+    cat "$CACHE_ENTRY/repeat" 2>/dev/null || echo 0
+}
+cached_runs() {
+    find "$CACHE_ENTRY" -maxdepth 1 -name 'baseline.run*.json' 2>/dev/null | wc -l
+}
+# Samples of an earlier baseline must not end up next to this one
+rm -f "$LIT_RESULTS"/baseline.run*.json
+if [[ "$USE_CACHE" == true && -f "$CACHE_ENTRY/baseline.json" && $(cached_repeat) -ge $REPEAT ]]; then
+    cp "$CACHE_ENTRY/baseline.json" "$LIT_RESULTS/baseline.json"
+    # The individual runs are the samples results_store.py keeps for significance tests
+    [[ $REPEAT -gt 1 ]] && cp "$CACHE_ENTRY"/baseline.run*.json "$LIT_RESULTS/"
+    echo "Baseline cache hit ($FINGERPRINT, $(cached_runs) runs): reused $CACHE_ENTRY/baseline.json"
+    exit 0
+fi
+echo "Baseline cache miss ($FINGERPRINT): building and running the baseline"
+# A baseline.json of an earlier toolchain must not be stored under this fingerprint
+rm -f "$LIT_RESULTS/baseline.json"
 
 # Clean step
 if [[ "$CLEAN" == true ]]; then
-    if [[ -d "$LLVM_TEST_SUITE/build" ]]; then
-        rm -rf "$LLVM_TEST_SUITE/build/"*
+    if [[ -d "$BUILD_DIR" ]]; then
+        rm -rf "$BUILD_DIR/"*
     else
-        mkdir -p "$LLVM_TEST_SUITE/build"
+        mkdir -p "$BUILD_DIR"
     fi
 fi
 
+phase begin "baseline: cmake configure"
 cmake -G "Ninja" \
       -DCMAKE_C_COMPILER=clang \
       -DCMAKE_CXX_COMPILER=clang++ \
@@ -60,7 +139,7 @@ cmake -G "Ninja" \
       "-DTEST_SUITE_SUBDIRS=SingleSource;MultiSource" \
       -C "$LLVM_TEST_SUITE/cmake/caches/Os.cmake" \
       -S "$LLVM_TEST_SUITE" \
-      -B "$LLVM_TEST_SUITE/build"
+      -B "$BUILD_DIR"
 
 # SPEC2017 configuration
 # cmake -G "Ninja" \
@@ -78,13 +157,60 @@ cmake -G "Ninja" \
 #       -C "$LLVM_TEST_SUITE/cmake/caches/Os.cmake" \
 #       -S "$LLVM_TEST_SUITE" \
 #       -B "$LLVM_TEST_SUITE/build"
+phase end "baseline: cmake configure"
+
+phase begin "baseline: ninja build"
+cmake --build "$BUILD_DIR" -- -k 0 -j $WORKERS
+phase end "baseline: ninja build"
+
+RUNS=()
+LIT_TESTS=("$BUILD_DIR")
+for ((run = 1; run <= REPEAT; run++)); do
+    RUN_JSON="$LIT_RESULTS/baseline.run$run.json"
+    # Nothing to repeat when LIT wrote no results
+    [[ $run -gt 1 && ${#RUNS[@]} -eq 0 ]] && break
+    if [[ $run -eq 2 && "$REPEAT_MIN_TIME" != 0 ]]; then
+        # Only long-running tests are noisy enough to be worth repeating
+        mapfile -t LIT_TESTS < <(python3 "$SCRIPT_DIR/results_store.py" slow "${RUNS[0]}" \
+            --min-time "$REPEAT_MIN_TIME" --build-dir "$BUILD_DIR")
+        echo "Repeating ${#LIT_TESTS[@]} tests with exec_time >= ${REPEAT_MIN_TIME}s"
+        [[ ${#LIT_TESTS[@]} -eq 0 ]] && break
+    fi
+    [[ $REPEAT -gt 1 ]] && echo "LIT run $run of $REPEAT..."
+    phase begin "baseline: llvm-lit run $run"
+    python3 $(which llvm-lit) \
+    --timeout $TIMEOUT \
+    --time-tests \
+    -j $WORKERS \
+    -s \
+    -o "$RUN_JSON" \
+    "${LIT_TESTS[@]}"
+    phase end "baseline: llvm-lit run $run"
+    if [[ -f "$RUN_JSON" ]]; then
+        RUNS+=("$RUN_JSON")
+    fi
+done
 
-cmake --build "$LLVM_TEST_SUITE/build" -- -k 0 -j $WORKERS
+if [[ ${#RUNS[@]} -eq 0 ]]; then
+    echo "ERROR: LIT wrote no results; nothing to store" >&2
+    exit 1
+elif [[ ${#RUNS[@]} -gt 1 ]]; then
+    python3 "$SCRIPT_DIR/results_store.py" average --median -o "$LIT_RESULTS/baseline.json" "${RUNS[@]}"
+else
+    cp "${RUNS[0]}" "$LIT_RESULTS/baseline.json"
+fi
 
-python3 $(which llvm-lit) \
---timeout $TIMEOUT \
---time-tests \
--j $WORKERS \
--s \
--o "$LIT_RESULTS/baseline.json" \
-"$LLVM_TEST_SUITE/build"
\ No newline at end of file
+# Store the results, the individual runs and the build logs under the fingerprint
+if [[ -f "$LIT_RESULTS/baseline.json" ]]; then
+    TMP_ENTRY="$CACHE_ENTRY.tmp.$$"
+    mkdir -p "$TMP_ENTRY"
+    fingerprint_inputs > "$TMP_ENTRY/fingerprint.txt"
+    echo "$REPEAT" > "$TMP_ENTRY/repeat"
+    cp "$LIT_RESULTS/baseline.json" "${RUNS[@]}" "$TMP_ENTRY/"
+    for artifact in CMakeCache.txt .ninja_log; do
+        [[ -f "$BUILD_DIR/$artifact" ]] && cp "$BUILD_DIR/$artifact" "$TMP_ENTRY/"
+    done
+    rm -rf "$CACHE_ENTRY"
+    mv "$TMP_ENTRY" "$CACHE_ENTRY"
+    echo "Baseline stored in $CACHE_ENTRY"
+fi
\ No newline at end of file
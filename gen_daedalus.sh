@@ -10,6 +10,9 @@
 #  # Clean, build, then run LIT
 #  ./gen_daedalus.sh --clean
 #
+#  # Rebuild Daedalus, then relink only what depends on the new libdaedalus.so
+#  ./gen_daedalus.sh --incremental
+#
 #  # Update Daedalus to 'dev' branch and use 16 workers
 #  ./gen_daedalus.sh --upgrade --branch dev --workers 16
 #
@@ -32,6 +35,16 @@ WORKERS=10
 TIMEOUT=120
 CLEAN=false
 UPGRADE=false
+DAEDALUS_BUILD=true
+ONLY_DAEDALUS=false
+INCREMENTAL=false
+SELECTIVE=false
+REPEAT=1
+REPEAT_MIN_TIME=0
+BUILD_DIR=""
+WORK_DIR=""
+FAILURE_DB=""
+TIMELINE=""
 
 usage() {
   cat <<EOF
@@ -49,9 +62,19 @@ Options:
   --daedalus <path>        Path to Daedalus project (default: $DAEDALUS)
   --errors-dbg <path>      Directory for LIT log output (default: $ERRORS_DBG)
   --lit-results <path>     Directory for LIT results JSON (default: $LIT_RESULTS)
+  --build-dir <path>       Test suite build tree (default: <llvm-test-suite>/build)
+  --work-dir <path>        Directory for LIT logs and list-errors.sh reports (default: <errors-dbg>)
   --max-slice-params <n>   Set -max-slice-params for Daedalus pass (default: 5)
   --max-slice-size <n>     Set -max-slice-size for Daedalus pass (default: 40)
   --max-slice-users <n>    Set -max-slice-users for Daedalus pass (default: 100)
+  --skip-daedalus-build    Reuse the existing libdaedalus.so (--clean keeps its build dir)
+  --only-daedalus-build    Build libdaedalus.so and exit
+  --incremental            Keep the test-suite build; only steps using the plugin or pass args rerun
+  --selective              Rerun only previously transformed/failing tests and tests whose bitcode changed
+  --failure-db <path>      Record the run in this failure database (default: <errors-dbg>/failures.sqlite)
+  --repeat <n>             Run LIT n times; daedalus.json holds the per-test medians (default: $REPEAT)
+  --repeat-min-time <s>    Only repeat tests whose exec_time reached s seconds in the first run (default: all)
+  --timeline <file>        Record a CPU/memory/disk timeline of the phases (see phase_timeline.py)
 EOF
 }
 
@@ -61,7 +84,7 @@ MAX_SLICE_SIZE=0
 MAX_SLICE_USERS=0
 
 # Parse arguments
-if ! PARSED=$(getopt -o hcub:w:t: --long help,clean,upgrade,branch:,workers:,timeout:,llvm-project:,llvm-test-suite:,daedalus:,errors-dbg:,lit-results:,max-slice-params:,max-slice-size:,max-slice-users: -n "$(basename "$0")" -- "$@"); then
+if ! PARSED=$(getopt -o hcub:w:t: --long help,clean,upgrade,branch:,workers:,timeout:,llvm-project:,llvm-test-suite:,daedalus:,errors-dbg:,lit-results:,build-dir:,work-dir:,max-slice-params:,max-slice-size:,max-slice-users:,skip-daedalus-build,only-daedalus-build,incremental,selective,failure-db:,repeat:,repeat-min-time:,timeline: -n "$(basename "$0")" -- "$@"); then
   usage; exit 1
 fi
 eval set -- "$PARSED"
@@ -78,14 +101,28 @@ while true; do
     --daedalus) DAEDALUS="$2"; shift 2;;
     --errors-dbg) ERRORS_DBG="$2"; shift 2;;
     --lit-results) LIT_RESULTS="$2"; shift 2;;
+    --build-dir) BUILD_DIR="$2"; shift 2;;
+    --work-dir) WORK_DIR="$2"; shift 2;;
     --max-slice-params) MAX_SLICE_PARAMS="$2"; shift 2;;
     --max-slice-size) MAX_SLICE_SIZE="$2"; shift 2;;
     --max-slice-users) MAX_SLICE_USERS="$2"; shift 2;;
+    --skip-daedalus-build) DAEDALUS_BUILD=false; shift;;
+    --only-daedalus-build) ONLY_DAEDALUS=true; shift;;
+    --incremental) INCREMENTAL=true; shift;;
+    --selective) SELECTIVE=true; shift;;
+    --failure-db) FAILURE_DB="$2"; shift 2;;
+    --repeat) REPEAT="$2"; shift 2;;
+    --repeat-min-time) REPEAT_MIN_TIME="$2"; shift 2;;
+    --timeline) TIMELINE="$2"; shift 2;;
     --) shift; break;;
     *) echo "Unknown option: $1"; usage; exit 1;;
   esac
 done
 
+BUILD_DIR="${BUILD_DIR:-$LLVM_TEST_SUITE/build}"
+WORK_DIR="${WORK_DIR:-$ERRORS_DBG}"
+FAILURE_DB="${FAILURE_DB:-$ERRORS_DBG/failures.sqlite}"
+
 # Validate directories
 for dir in "$LLVM_PROJECT" "$LLVM_TEST_SUITE" "$DAEDALUS" "$ERRORS_DBG" "$LIT_RESULTS"; do
   if [[ ! -d "$dir" ]]; then
@@ -93,12 +130,30 @@ for dir in "$LLVM_PROJECT" "$LLVM_TEST_SUITE" "$DAEDALUS" "$ERRORS_DBG" "$LIT_RE
     exit 1
   fi
 done
+mkdir -p "$BUILD_DIR" "$WORK_DIR"
+
+# Phase markers for phase_timeline.py; no-ops unless $DBGTK_TIMELINE is being recorded.
+# A timeline started by run-experiment.sh is inherited through the environment.
+phase() {
+  [[ -n "${DBGTK_TIMELINE:-}" ]] || return 0
+  python3 "$ERRORS_DBG/phase_timeline.py" mark "$@" || true
+}
+if [[ -n "$TIMELINE" && -z "${DBGTK_TIMELINE:-}" ]]; then
+  python3 "$ERRORS_DBG/phase_timeline.py" start "$TIMELINE" \
+    --meta script=gen_daedalus.sh --meta workers="$WORKERS" --meta timeout="$TIMEOUT" --meta repeat="$REPEAT"
+  export DBGTK_TIMELINE="$TIMELINE"
+  trap 'python3 "$ERRORS_DBG/phase_timeline.py" stop "$DBGTK_TIMELINE" || true' EXIT
+fi
 
 # Clean step
 if [[ "$CLEAN" == true ]]; then
   echo "Cleaning build directories..."
-  rm -rf "$LLVM_TEST_SUITE/build"/* && echo "- Cleared $LLVM_TEST_SUITE/build"
-  rm -rf "$DAEDALUS/build"/*        && echo "- Cleared $DAEDALUS/build"
+  if [[ "$ONLY_DAEDALUS" != true && "$INCREMENTAL" != true ]]; then
+    rm -rf "$BUILD_DIR"/* && echo "- Cleared $BUILD_DIR"
+  fi
+  if [[ "$DAEDALUS_BUILD" == true ]]; then
+    rm -rf "$DAEDALUS/build"/*        && echo "- Cleared $DAEDALUS/build"
+  fi
 fi
 
 # Upgrade step
@@ -115,15 +170,51 @@ if [[ "$UPGRADE" == true ]]; then
 fi
 
 script_start_time=$(date +%s)
-echo "$script_start_time" > "$ERRORS_DBG/experiment-start-time.log"
+echo "$script_start_time" > "$WORK_DIR/experiment-start-time.log"
 
 # Build Daedalus
-echo "Building libdaedalus.so..."
-cmake -G Ninja -DLLVM_DIR="$LLVM_PROJECT" -S "$DAEDALUS" -B "$DAEDALUS/build"
-cmake --build "$DAEDALUS/build"
+if [[ "$DAEDALUS_BUILD" == true ]]; then
+  echo "Building libdaedalus.so..."
+  phase begin "daedalus: build libdaedalus.so"
+  cmake -G Ninja -DLLVM_DIR="$LLVM_PROJECT" -S "$DAEDALUS" -B "$DAEDALUS/build"
+  cmake --build "$DAEDALUS/build"
+  phase end "daedalus: build libdaedalus.so"
+elif [[ ! -f "$DAEDALUS/build/lib/libdaedalus.so" ]]; then
+  echo "Error: --skip-daedalus-build given but $DAEDALUS/build/lib/libdaedalus.so is missing." >&2
+  exit 1
+fi
+if [[ "$ONLY_DAEDALUS" == true ]]; then
+  exit 0
+fi
+
+# Plugin loaded by the test-suite pass steps. With --incremental it is a copy named after
+# its content hash: ninja reruns every edge whose command line changed, so a new
+# libdaedalus.so (or new -max-slice-* args) reruns exactly the pass and link steps
+# while the frontend .o/bitcode outputs are reused.
+PLUGIN="$DAEDALUS/build/lib/libdaedalus.so"
+if [[ "$INCREMENTAL" == true ]]; then
+  PLUGIN_DIR="$BUILD_DIR/.daedalus-plugin"
+  PLUGIN_HASH=$(sha256sum "$PLUGIN" | cut -c1-16)
+  PASS_ARGS_FINGERPRINT="$PLUGIN_HASH params=$MAX_SLICE_PARAMS size=$MAX_SLICE_SIZE users=$MAX_SLICE_USERS"
+  PREVIOUS_FINGERPRINT=$(cat "$PLUGIN_DIR/fingerprint" 2>/dev/null || true)
+  if [[ "$PASS_ARGS_FINGERPRINT" == "$PREVIOUS_FINGERPRINT" ]]; then
+    echo "Incremental build: plugin and pass arguments unchanged"
+  elif [[ -n "$PREVIOUS_FINGERPRINT" ]]; then
+    echo "Incremental build: plugin or pass arguments changed ($PREVIOUS_FINGERPRINT -> $PASS_ARGS_FINGERPRINT)"
+  fi
+  mkdir -p "$PLUGIN_DIR"
+  if [[ ! -f "$PLUGIN_DIR/libdaedalus.$PLUGIN_HASH.so" ]]; then
+    cp "$PLUGIN" "$PLUGIN_DIR/libdaedalus.$PLUGIN_HASH.so.tmp"
+    mv "$PLUGIN_DIR/libdaedalus.$PLUGIN_HASH.so.tmp" "$PLUGIN_DIR/libdaedalus.$PLUGIN_HASH.so"
+  fi
+  find "$PLUGIN_DIR" -name 'libdaedalus.*.so' ! -name "libdaedalus.$PLUGIN_HASH.so" -delete
+  echo "$PASS_ARGS_FINGERPRINT" > "$PLUGIN_DIR/fingerprint"
+  PLUGIN="$PLUGIN_DIR/libdaedalus.$PLUGIN_HASH.so"
+fi
 
 # Build LLVM test suite
 echo "Building LLVM test suite with Daedalus plugin..."
+phase begin "daedalus: cmake configure"
 # Only add max-slice-* args if any were explicitly set by the user
 MAX_ARGS_SET=false
 if [[ ${MAX_SLICE_PARAMS} != 0 ]] || [[ ${MAX_SLICE_SIZE} != 0 ]] || [[ ${MAX_SLICE_USERS} != 0 ]]; then
@@ -142,10 +233,10 @@ if [[ $MAX_ARGS_SET == true ]]; then
     -DCMAKE_EXE_LINKER_FLAGS="-flto -fuse-ld=lld -Wl,--plugin-opt=-lto-embed-bitcode=post-merge-pre-opt" \
     -DTEST_SUITE_COLLECT_INSTCOUNT=ON \
     -DTEST_SUITE_SELECTED_PASSES=daedalus \
-    -DTEST_SUITE_PASSES_ARGS=-load-pass-plugin=$DAEDALUS/build/lib/libdaedalus.so\;-max-slice-params=$MAX_SLICE_PARAMS\;-max-slice-size=$MAX_SLICE_SIZE\;-max-slice-users=$MAX_SLICE_USERS \
+    -DTEST_SUITE_PASSES_ARGS=-load-pass-plugin=$PLUGIN\;-max-slice-params=$MAX_SLICE_PARAMS\;-max-slice-size=$MAX_SLICE_SIZE\;-max-slice-users=$MAX_SLICE_USERS \
     "-DTEST_SUITE_SUBDIRS=SingleSource;MultiSource" \
     -C "$LLVM_TEST_SUITE/cmake/caches/Os.cmake" \
-    -S "$LLVM_TEST_SUITE" -B "$LLVM_TEST_SUITE/build"
+    -S "$LLVM_TEST_SUITE" -B "$BUILD_DIR"
 
   # SPEC2017 configuration
   # cmake -G Ninja \
@@ -172,11 +263,11 @@ else
     -DCMAKE_EXE_LINKER_FLAGS="-flto -fuse-ld=lld -Wl,--plugin-opt=-lto-embed-bitcode=post-merge-pre-opt" \
     -DTEST_SUITE_COLLECT_INSTCOUNT=ON \
     -DTEST_SUITE_SELECTED_PASSES=daedalus \
-    -DTEST_SUITE_PASSES_ARGS=-load-pass-plugin=$DAEDALUS/build/lib/libdaedalus.so \
+    -DTEST_SUITE_PASSES_ARGS=-load-pass-plugin=$PLUGIN \
     "-DTEST_SUITE_SUBDIRS=SingleSource;MultiSource" \
     -C "$LLVM_TEST_SUITE/cmake/caches/Os.cmake" \
     -S "$LLVM_TEST_SUITE" \
-    -B "$LLVM_TEST_SUITE/build"
+    -B "$BUILD_DIR"
 
   # func-merging configuration
   #   cmake -G Ninja \
@@ -210,33 +301,130 @@ else
   #   -S "$LLVM_TEST_SUITE" \
   #   -B "$LLVM_TEST_SUITE/build"
 fi
+phase end "daedalus: cmake configure"
 
 # Allow build errors but continue
-if ! cmake --build "$LLVM_TEST_SUITE/build" -- -k 0 -j "$WORKERS"; then
+phase begin "daedalus: ninja build"
+if ! cmake --build "$BUILD_DIR" -- -k 0 -j "$WORKERS"; then
   echo "Warning: Build errors detected in test suite; proceeding to LIT tests." >&2
 fi
+phase end "daedalus: ninja build"
+
+# Select tests: with --selective and a previous run on record, only tests Daedalus
+# transformed, tests that failed and tests whose bitcode changed are rerun
+SELECTION_STATE="$LIT_RESULTS/test-selection.json"
+SELECTED_TESTS="$WORK_DIR/selected-tests.txt"
+LIT_TESTS=("$BUILD_DIR")
+LIT_OUTPUT="$LIT_RESULTS/daedalus.json"
+SELECTION_USED=false
+if [[ "$SELECTIVE" == true && -f "$SELECTION_STATE" && -f "$LIT_RESULTS/daedalus.json" ]]; then
+  cp "$LIT_RESULTS/daedalus.json" "$LIT_RESULTS/daedalus.cached.json"
+  python3 "$ERRORS_DBG/test_selection.py" --state "$SELECTION_STATE" select \
+    --build-dir "$BUILD_DIR" \
+    --lit-json "$LIT_RESULTS/daedalus.cached.json" \
+    -o "$SELECTED_TESTS"
+  mapfile -t LIT_TESTS < "$SELECTED_TESTS"
+  LIT_OUTPUT="$LIT_RESULTS/daedalus.partial.json"
+  SELECTION_USED=true
+fi
 
 # Run LIT tests
 echo "Running LIT tests..."
-if ! python3 $(which llvm-lit) \
+phase begin "daedalus: llvm-lit"
+if [[ ${#LIT_TESTS[@]} -eq 0 ]]; then
+  echo "No tests selected; reusing the previous results."
+  echo '{"tests": []}' > "$LIT_OUTPUT"
+elif ! python3 $(which llvm-lit) \
      --time-tests \
      --ignore-fail \
      --verbose \
      --timeout $TIMEOUT \
      -j "$WORKERS" \
      -s \
-     -o "$LIT_RESULTS/daedalus.json" \
-     "$LLVM_TEST_SUITE/build" \
-     | tee -a "$ERRORS_DBG/lit-output.log"; then
-  echo "Error: LIT tests failed. Log saved to $ERRORS_DBG/lit-output.log" >&2
+     -o "$LIT_OUTPUT" \
+     "${LIT_TESTS[@]}" \
+     | python3 "$ERRORS_DBG/lit_log_filter.py" --tee "$WORK_DIR/lit-output.log" -o "$WORK_DIR/lit-filtered"; then
+  echo "Error: LIT tests failed. Log saved to $WORK_DIR/lit-output.log" >&2
+fi
+if [[ "$SELECTION_USED" == true ]]; then
+  python3 "$ERRORS_DBG/test_selection.py" merge \
+    "$LIT_RESULTS/daedalus.cached.json" "$LIT_OUTPUT" \
+    -o "$LIT_RESULTS/daedalus.json"
+fi
+phase end "daedalus: llvm-lit"
+
+# Repeat the run for noise-aware comparisons: every run is kept as a sample
+# (daedalus.run<n>.json, stored by results_store.py build) and daedalus.json
+# becomes the per-test median
+rm -f "$LIT_RESULTS"/daedalus.run*.json
+if [[ $REPEAT -gt 1 && ${#LIT_TESTS[@]} -gt 0 ]]; then
+  cp "$LIT_RESULTS/daedalus.json" "$LIT_RESULTS/daedalus.run1.json"
+  RUNS=("$LIT_RESULTS/daedalus.run1.json")
+  if [[ "$REPEAT_MIN_TIME" != 0 ]]; then
+    # Only long-running tests are noisy enough to be worth repeating
+    mapfile -t LIT_TESTS < <(python3 "$ERRORS_DBG/results_store.py" slow "$LIT_OUTPUT" \
+      --min-time "$REPEAT_MIN_TIME" --build-dir "$BUILD_DIR")
+    echo "Repeating ${#LIT_TESTS[@]} tests with exec_time >= ${REPEAT_MIN_TIME}s"
+  fi
+  phase begin "daedalus: llvm-lit repeats"
+  for ((run = 2; run <= REPEAT && ${#LIT_TESTS[@]} > 0; run++)); do
+    echo "LIT run $run of $REPEAT..."
+    python3 $(which llvm-lit) \
+      --time-tests \
+      --ignore-fail \
+      --timeout $TIMEOUT \
+      -j "$WORKERS" \
+      -s \
+      -o "$LIT_RESULTS/daedalus.run$run.json" \
+      "${LIT_TESTS[@]}" > "$WORK_DIR/lit-output.run$run.log" 2>&1 || \
+      echo "Warning: LIT run $run failed. Log saved to $WORK_DIR/lit-output.run$run.log" >&2
+    [[ -f "$LIT_RESULTS/daedalus.run$run.json" ]] && RUNS+=("$LIT_RESULTS/daedalus.run$run.json")
+  done
+  python3 "$ERRORS_DBG/results_store.py" average --median \
+    -o "$LIT_RESULTS/daedalus.json" "${RUNS[@]}"
+  phase end "daedalus: llvm-lit repeats"
 fi
 
 # Post-process errors
 echo "Extracting errors..."
+phase begin "daedalus: list-errors"
 "$ERRORS_DBG/list-errors.sh" \
-  --build-dir "$LLVM_TEST_SUITE/build" \
+  --build-dir "$BUILD_DIR" \
+  --work-dir "$WORK_DIR" \
   --plugin-dir "$DAEDALUS/build/lib" \
   --results-dir "$LIT_RESULTS" \
+  --workers "$WORKERS" \
   --clear
+phase end "daedalus: list-errors"
+
+# Remember which tests Daedalus transforms, for the next --selective run
+if [[ "$SELECTIVE" == true ]]; then
+  SELECTION_ARGS=(
+    --state "$SELECTION_STATE" record
+    --build-dir "$BUILD_DIR"
+    --plugin "$DAEDALUS/build/lib/libdaedalus.so"
+    --lit-json "$LIT_RESULTS/daedalus.json"
+    -j "$WORKERS"
+  )
+  [[ "$SELECTION_USED" == true ]] && SELECTION_ARGS+=(--only "$SELECTED_TESTS")
+  python3 "$ERRORS_DBG/test_selection.py" "${SELECTION_ARGS[@]}" || \
+    echo "Warning: could not update $SELECTION_STATE" >&2
+fi
+
+# Keep this run's statuses, crash buckets and metrics across runs
+# (list-errors.sh --clear wipes output/ every time)
+echo "Recording run in $FAILURE_DB..."
+RECORD_ARGS=(
+  --db "$FAILURE_DB" record
+  --lit-json "$LIT_RESULTS/daedalus.json"
+  --repo "$DAEDALUS"
+  --output-dir "$WORK_DIR/output"
+)
+[[ ${MAX_SLICE_PARAMS} != 0 ]] && RECORD_ARGS+=(--params "$MAX_SLICE_PARAMS")
+[[ ${MAX_SLICE_SIZE} != 0 ]] && RECORD_ARGS+=(--size "$MAX_SLICE_SIZE")
+[[ ${MAX_SLICE_USERS} != 0 ]] && RECORD_ARGS+=(--users "$MAX_SLICE_USERS")
+if ! python3 "$ERRORS_DBG/failure_db.py" "${RECORD_ARGS[@]}"; then
+  echo "Warning: could not record the run in $FAILURE_DB" >&2
+fi
 
 exit 0
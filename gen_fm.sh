@@ -116,7 +116,7 @@ if ! python3 $(which llvm-lit) \
      -s \
      -o "$LIT_RESULTS/func-merging.json" \
      "$LLVM_TEST_SUITE/build" \
-     | tee -a "$ERRORS_DBG/lit-output.log"; then
+     | python3 "$ERRORS_DBG/lit_log_filter.py" --tee "$ERRORS_DBG/lit-output.log" -o "$ERRORS_DBG/lit-filtered"; then
   echo "Error: LIT tests failed. Log saved to $ERRORS_DBG/lit-output.log" >&2
 fi
 
@@ -5,7 +5,8 @@
 # Brief: Processes LIT test outputs and comparison results to extract failing tests,
 #        generate LLVM IR sources, and collate error logs for analysis.
 #        Supports configurable build, plugin, results, and output directories.
-#
+#        Pass-agnostic: --pass/--results post-process the IROutliner or func-merging
+#        configurations the same way (list-errors-iro.sh / list-errors-fm.sh).
 #
 set -euo pipefail
 IFS=$'\n\t'
@@ -15,7 +16,18 @@ SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
 BUILD_DIR=""
 PLUGIN_DIR=""
 RESULTS_DIR=""
-OUTPUT_DIR="$SCRIPT_DIR/output"
+PASS="daedalus"
+RESULTS_JSON=""
+WORK_DIR="$SCRIPT_DIR"
+OUTPUT_DIR=""
+WORKERS="$(nproc 2>/dev/null || echo 1)"
+OPT_TIMEOUT=600
+
+# Phase markers for phase_timeline.py; no-ops unless $DBGTK_TIMELINE is being recorded
+phase() {
+  [[ -n "${DBGTK_TIMELINE:-}" ]] || return 0
+  python3 "$SCRIPT_DIR/phase_timeline.py" mark "$@" || true
+}
 
 # Derived paths (initialized later)
 LOG_FILE=""
@@ -25,13 +37,6 @@ SCRIPT_LOGS_DIR=""
 FILES_LIST=""
 COMPARISON_RESULTS=""
 
-# Record the start time of the script
-if [[ -f "$SCRIPT_DIR/experiment-start-time.log" ]]; then
-  script_start_time=$(cat "$SCRIPT_DIR/experiment-start-time.log")
-else
-  script_start_time=$(date +%s)
-fi
-
 usage() {
   cat <<EOF
 Usage: $(basename "$0") [options]
@@ -39,12 +44,19 @@ Usage: $(basename "$0") [options]
 Options:
   -h, --help                Show this help message and exit
   --build-dir <path>        LLVM Test Suite build folder (required)
-  --plugin-dir <path>       Folder containing libdaedalus.so (required)
+  --plugin-dir <path>       Folder containing libdaedalus.so (required for the daedalus pass)
   --results-dir <path>      LIT results folder with JSON files (required)
-  --output-dir <path>       Output base directory (default: $OUTPUT_DIR)
+  --pass <name>             opt -passes pipeline the configuration was built with (default: $PASS)
+  --results <file>          LIT JSON of the configuration (default: <results-dir>/<pass>.json)
+  --work-dir <path>         Directory holding lit-output.log and the reports (default: $WORK_DIR)
+  --output-dir <path>       Output base directory (default: <work-dir>/output)
   --print-dots              Print dots after processing (default: no)
   --clear                   Clear output directories before processing (default: no)
   --full-logs               Print full debug logs when calling opt (default: no)
+  -w, --workers <n>         Number of concurrent opt processes (default: $WORKERS)
+  -t, --timeout <n>         Per-file timeout in seconds for opt, 0 disables it (default: $OPT_TIMEOUT)
+  --no-cache                Always rerun opt instead of reusing cached results (default: no)
+  --profile                 Profile the pass per function over every .e.bc with profile_pass.py (default: no)
 EOF
 }
 
@@ -52,7 +64,9 @@ EOF
 PRINT_DOTS=false
 CLEAR_OUTPUT=false
 FULL_LOGS=false
-PARSED=$(getopt -o h --long help,build-dir:,plugin-dir:,results-dir:,output-dir:,print-dots,clear,full-logs -n "$(basename "$0")" -- "$@")
+NO_CACHE=false
+PROFILE=false
+PARSED=$(getopt -o hw:t: --long help,build-dir:,plugin-dir:,results-dir:,pass:,results:,work-dir:,output-dir:,print-dots,clear,full-logs,workers:,timeout:,no-cache,profile -n "$(basename "$0")" -- "$@")
 eval set -- "$PARSED"
 while true; do
   case "$1" in
@@ -64,6 +78,12 @@ while true; do
       PLUGIN_DIR="$2"; shift 2;;
     --results-dir)
       RESULTS_DIR="$2"; shift 2;;
+    --pass)
+      PASS="$2"; shift 2;;
+    --results)
+      RESULTS_JSON="$2"; shift 2;;
+    --work-dir)
+      WORK_DIR="$2"; shift 2;;
     --output-dir)
       OUTPUT_DIR="$2"; shift 2;;
     --print-dots)
@@ -72,6 +92,14 @@ while true; do
       CLEAR_OUTPUT=true; shift;;
     --full-logs)
       FULL_LOGS=true; shift;;
+    -w|--workers)
+      WORKERS="$2"; shift 2;;
+    -t|--timeout)
+      OPT_TIMEOUT="$2"; shift 2;;
+    --no-cache)
+      NO_CACHE=true; shift;;
+    --profile)
+      PROFILE=true; shift;;
     --)
       shift; break;;
     *)
@@ -80,27 +108,43 @@ while true; do
 done
 
 # Ensure required arguments are provided
-if [[ -z "$BUILD_DIR" || -z "$PLUGIN_DIR" || -z "$RESULTS_DIR" ]]; then
-  echo "ERROR: --build-dir, --plugin-dir, and --results-dir are required." >&2
+if [[ -z "$BUILD_DIR" || -z "$RESULTS_DIR" ]]; then
+  echo "ERROR: --build-dir and --results-dir are required." >&2
   usage; exit 1
 fi
+if [[ "$PASS" == "daedalus" && -z "$PLUGIN_DIR" ]]; then
+  echo "ERROR: --plugin-dir is required for the daedalus pass." >&2
+  usage; exit 1
+fi
+RESULTS_JSON="${RESULTS_JSON:-$RESULTS_DIR/$PASS.json}"
+
+# Record the start time of the script
+if [[ -f "$WORK_DIR/experiment-start-time.log" ]]; then
+  script_start_time=$(cat "$WORK_DIR/experiment-start-time.log")
+else
+  script_start_time=$(date +%s)
+fi
 
 # Compute script and derived paths
-LOG_FILE="$SCRIPT_DIR/list-errors.log"
+OUTPUT_DIR="${OUTPUT_DIR:-$WORK_DIR/output}"
+LOG_FILE="$WORK_DIR/list-errors.log"
 SOURCES_DIR="$OUTPUT_DIR/sources"
 BC_LOGS_DIR="$OUTPUT_DIR/bc_logs"
 SCRIPT_LOGS_DIR="$OUTPUT_DIR/script_logs"
 FILES_LIST="$SCRIPT_LOGS_DIR/files-list.txt"
-COMPARISON_RESULTS="$SCRIPT_DIR/comparison_results.txt"
+COMPARISON_RESULTS="$WORK_DIR/comparison_results.txt"
+RESULTS_STORE="$SCRIPT_LOGS_DIR/results.parquet"
 SOURCES_SUCC_DIR="$OUTPUT_DIR/sources_comparison_failed"
 ERRORS_SUMMARY_DIR="$OUTPUT_DIR/errors_summary"
 
 # Preconditions
 [[ -d "$BUILD_DIR" ]] || { echo "ERROR: Build directory '$BUILD_DIR' not found." >&2; exit 1; }
-[[ -d "$PLUGIN_DIR" ]] || { echo "ERROR: Plugin directory '$PLUGIN_DIR' not found." >&2; exit 1; }
-[[ -f "$PLUGIN_DIR/libdaedalus.so" ]] || { echo "ERROR: libdaedalus.so missing in '$PLUGIN_DIR'." >&2; exit 1; }
+if [[ -n "$PLUGIN_DIR" ]]; then
+  [[ -d "$PLUGIN_DIR" ]] || { echo "ERROR: Plugin directory '$PLUGIN_DIR' not found." >&2; exit 1; }
+  [[ -f "$PLUGIN_DIR/libdaedalus.so" ]] || { echo "ERROR: libdaedalus.so missing in '$PLUGIN_DIR'." >&2; exit 1; }
+fi
 [[ -d "$RESULTS_DIR" ]] || { echo "ERROR: Results directory '$RESULTS_DIR' not found." >&2; exit 1; }
-[[ -f "$RESULTS_DIR/baseline.json" && -f "$RESULTS_DIR/daedalus.json" ]] || \
+[[ -f "$RESULTS_DIR/baseline.json" && -f "$RESULTS_JSON" ]] || \
   { echo "ERROR: Expected JSON files in '$RESULTS_DIR'." >&2; exit 1; }
 
 
@@ -116,38 +160,36 @@ touch "$LOG_FILE"
 mkdir -p "$OUTPUT_DIR" "$SOURCES_DIR" "$BC_LOGS_DIR" "$SCRIPT_LOGS_DIR" "$SOURCES_SUCC_DIR"
 
 # Move existing lit-output.log if present
-if [[ -f "$SCRIPT_DIR/lit-output.log" ]]; then
-  mv "$SCRIPT_DIR/lit-output.log" "$SCRIPT_LOGS_DIR/"
+if [[ -f "$WORK_DIR/lit-output.log" ]]; then
+  mv "$WORK_DIR/lit-output.log" "$SCRIPT_LOGS_DIR/"
 fi
 
 # Log configuration
 cat <<EOF | tee -a "$LOG_FILE"
 Build directory  : $BUILD_DIR
-Plugin directory : $PLUGIN_DIR
+Pass             : $PASS
+Plugin directory : ${PLUGIN_DIR:-none}
 Results directory: $RESULTS_DIR
 Output directory : $OUTPUT_DIR
 EOF
 
 # Step 1: Filter lit-output logs
+phase begin "list-errors step 1: filter logs"
 echo -e "\nFiltering LIT logs..." | tee -a "$LOG_FILE"
-grep --text -B2 ": Compar\(ison failed,\|ed:\)" \
-     "$SCRIPT_LOGS_DIR/lit-output.log" \
-     | awk '/\s*.reference_output/{print $NF}' \
-     | sed 's/.*build\///g' \
-     > "$SCRIPT_LOGS_DIR/comparison_failed.log" || true
-grep --text -oE ": error: (unable to open|child terminated)(.*)" \
-     "$SCRIPT_LOGS_DIR/lit-output.log" \
-     | awk '{print $6}' \
-     | sed "s/.*build\/\(.*\)'/\1/g" \
-     > "$SCRIPT_LOGS_DIR/build_failed.log" || true
-grep -A1000 "Slowest Tests:" "$SCRIPT_LOGS_DIR/lit-output.log" \
-     | grep -B1000 "Tests Times:" \
-     | sed '$d' \
-     > "$SCRIPT_LOGS_DIR/slowest_tests.log" || true
+# One streaming pass: comparison failures, build failures and the slowest tests.
+# When the generator piped LIT through lit_log_filter.py --tee, its results are reused.
+python3 "$SCRIPT_DIR/lit_log_filter.py" "$SCRIPT_LOGS_DIR/lit-output.log" \
+     --output-dir "$SCRIPT_LOGS_DIR" \
+     --from-live "$WORK_DIR/lit-filtered" \
+     | tee -a "$LOG_FILE" \
+  || echo "Warning: filtering LIT logs failed; comparison_failed, build_failed and slowest_tests may be missing" \
+     | tee -a "$LOG_FILE" >&2
 
 echo "Filtered logs written to $SCRIPT_LOGS_DIR" | tee -a "$LOG_FILE"
+phase end "list-errors step 1: filter logs"
 
 # Step 2: Generate comparison report
+phase begin "list-errors step 2: compare.py"
 echo -e "\nGenerating comparison report..." | tee -a "$LOG_FILE"
 python3 "$BUILD_DIR/../utils/compare.py" \
         --full \
@@ -157,17 +199,25 @@ python3 "$BUILD_DIR/../utils/compare.py" \
         -m exec_time \
         -m compile_time \
         "$RESULTS_DIR/baseline.json" \
-        "$RESULTS_DIR/daedalus.json" \
+        "$RESULTS_JSON" \
         > "$COMPARISON_RESULTS"
 echo "Comparison results: $COMPARISON_RESULTS" | tee -a "$LOG_FILE"
 
-# Step 3: List failing test files
-grep -oP "(?<=:: ).*?(?=' has no metrics)" "$COMPARISON_RESULTS" \
-     | sed 's/\.test$/\.e.bc/' \
-     > "$FILES_LIST" || true
+# Load the raw LIT results into a columnar store; later steps query it instead of the text report
+python3 "$SCRIPT_DIR/results_store.py" build -o "$RESULTS_STORE" \
+        "$RESULTS_DIR/baseline.json" \
+        "$RESULTS_JSON" \
+        | tee -a "$LOG_FILE"
+phase end "list-errors step 2: compare.py"
+
+# Step 3: List failing test files (no metrics in either run)
+phase begin "list-errors step 3: list failing tests"
+python3 "$SCRIPT_DIR/results_store.py" missing "$RESULTS_STORE" > "$FILES_LIST" || true
 echo "Files list: $FILES_LIST" | tee -a "$LOG_FILE"
+phase end "list-errors step 3: list failing tests"
 
 # Step 4: Extract source .ll files
+phase begin "list-errors step 4: extract IR"
 echo -e "\nExtracting IR to $SOURCES_DIR..." | tee -a "$LOG_FILE"
 
 while IFS= read -r file; do
@@ -185,65 +235,70 @@ FILES_LIST_SORTED="$SCRIPT_LOGS_DIR/files-list-sorted.txt"
 awk '{print $0}' "$FILES_LIST" | while read -r file; do
   echo "$(basename "$file"):$file"
 done | sort | cut -d: -f2 > "$FILES_LIST_SORTED"
+phase end "list-errors step 4: extract IR"
 
-# Step 5: Apply Daedalus pass and log results
-echo -e "\nRunning Daedalus pass..." | tee -a "$LOG_FILE"
-TOTAL=0; FAILED_BUILD=0; FAILED_COMP=0
-while IFS= read -r file; do
-  TOTAL=$((TOTAL + 1))
-  src="$BUILD_DIR/$file"
-  base=$(basename "$file")
-  echo -e "\nRunning opt over: ${file/.e.bc/.ll}" | tee -a "$LOG_FILE"
-  if [[ "${FULL_LOGS:-false}" == "true" ]]; then
-    if opt -debug-only=daedalus,ProgramSlice,PHIGateAnalyzer -stats -passes=daedalus \
-      -load-pass-plugin="$PLUGIN_DIR/libdaedalus.so" \
-      -S "$src" -disable-output > /dev/null 2> "$BC_LOGS_DIR/$base.log"; then
-      echo -e "\tFailed comparison..." | tee -a "$LOG_FILE"
-      FAILED_COMP=$((FAILED_COMP + 1))
-      mv "$SCRIPT_DIR"/*_slices_report.log "$BC_LOGS_DIR/" || true
-    else
-      echo -e "\tFailed build..." | tee -a "$LOG_FILE"
-      FAILED_BUILD=$((FAILED_BUILD + 1))
-    fi
-    mv "$SCRIPT_DIR"/*.parent_module.ll "$SOURCES_SUCC_DIR/" || true
-  else
-    if opt -passes=daedalus \
-      -load-pass-plugin="$PLUGIN_DIR/libdaedalus.so" \
-      -S "$src" -o "$SOURCES_SUCC_DIR/${base/.e.bc/.d.ll}" 2> "$BC_LOGS_DIR/$base.log"; then
-      echo -e "\tFailed comparison..." | tee -a "$LOG_FILE"
-      FAILED_COMP=$((FAILED_COMP + 1))
-    else
-      echo -e "\tFailed build..." | tee -a "$LOG_FILE"
-      FAILED_BUILD=$((FAILED_BUILD + 1))
-    fi
-  fi
-done < "$FILES_LIST_SORTED"
-
-# Summary
-cat <<EOF | tee -a "$LOG_FILE"
-
-Processed: $TOTAL
-Build failures    : $FAILED_BUILD
-Comparison failures: $FAILED_COMP
-EOF
-
-# Step 6: Collate error logs
-grep -B10 -A50 "PLEASE submit a bug report to" "$BC_LOGS_DIR"/*.log \
-  > "$SCRIPT_LOGS_DIR/errors.txt" || true
+# Step 5: Apply the pass and log results
+phase begin "list-errors step 5: opt pool"
+echo -e "\nRunning $PASS pass (workers: $WORKERS)..." | tee -a "$LOG_FILE"
+OPT_POOL_ARGS=(
+  "$FILES_LIST_SORTED"
+  --build-dir "$BUILD_DIR"
+  --pass "$PASS"
+  --output-dir "$OUTPUT_DIR"
+  --workers "$WORKERS"
+  --timeout "$OPT_TIMEOUT"
+  --summary "$SCRIPT_LOGS_DIR/opt-summary.json"
+)
+if [[ -n "$PLUGIN_DIR" ]]; then
+  OPT_POOL_ARGS+=(--plugin-dir "$PLUGIN_DIR")
+fi
+if [[ "${FULL_LOGS:-false}" == "true" ]]; then
+  OPT_POOL_ARGS+=(--full-logs)
+fi
+if [[ "${NO_CACHE:-false}" == "true" ]]; then
+  OPT_POOL_ARGS+=(--no-cache)
+fi
+python3 "$SCRIPT_DIR/opt_pool.py" "${OPT_POOL_ARGS[@]}" | tee -a "$LOG_FILE"
+phase end "list-errors step 5: opt pool"
 
-# Generate grouped summary
-python3 "$SCRIPT_DIR/errors-summary-grouped.py" "$SCRIPT_LOGS_DIR/errors.txt"
+# Step 6: Summarize crashes straight from the bc logs (no errors.txt concatenation)
+# and filter faulty functions' names into a file
+phase begin "list-errors step 6: crash summary"
+python3 "$SCRIPT_DIR/errors-summary-grouped.py" "$BC_LOGS_DIR" \
+  --jobs "$WORKERS" \
+  --output-dir "$WORK_DIR/errors_summary" \
+  --faulty-functions "$SCRIPT_LOGS_DIR/faulty_functions.txt"
 
-# Filter faulty functions' names into a file
-grep '.*.log-Original' output/script_logs/errors.txt \
-| sed 's/\(.*\).e.bc.log-Original function name/\1/g' \
-| sed 's/\(.*\)\/bc_logs\/\(.*\):/\1\/sources\/\2.ll/g' \
-> "$SCRIPT_LOGS_DIR/faulty_functions.txt" || true
+# Bucket crashes by normalized stack signature; reduce-programs.sh and
+# extract-faulty-functions.sh then work on one representative per bucket
+python3 "$SCRIPT_DIR/crash_signatures.py" bucket "$BC_LOGS_DIR" \
+  --jobs "$WORKERS" --quiet \
+  --output "$SCRIPT_LOGS_DIR/crash_buckets.json" | tee -a "$LOG_FILE"
+phase end "list-errors step 6: crash summary"
 
 # Analyze comparison results
-python3 analyze_comparison_results.py > "$SCRIPT_LOGS_DIR/comparison_analysis.txt"
+phase begin "list-errors: analysis"
+python3 "$SCRIPT_DIR/analyze_comparison_results.py" --store "$RESULTS_STORE" \
+        --summary-json "$SCRIPT_LOGS_DIR/comparison_summary.json" \
+        "$WORK_DIR/comparison_results.tsv" > "$SCRIPT_LOGS_DIR/comparison_analysis.txt"
 tee -a "$LOG_FILE" < "$SCRIPT_LOGS_DIR/comparison_analysis.txt"
 echo -e "--> Comparison analysis written to: $SCRIPT_LOGS_DIR/comparison_analysis.txt"
+phase end "list-errors: analysis"
+
+# Per-function compile time and memory of the pass over the whole suite, if requested
+if [[ "${PROFILE:-false}" == "true" ]]; then
+  echo -e "\nProfiling the $PASS pass..." | tee -a "$LOG_FILE"
+  phase begin "list-errors: profile"
+  python3 "$SCRIPT_DIR/profile_pass.py" \
+    --build-dir "$BUILD_DIR" \
+    --passes "$PASS" \
+    --plugin "${PLUGIN_DIR:+$PLUGIN_DIR/libdaedalus.so}" \
+    --timeout "$OPT_TIMEOUT" \
+    --output-dir "$OUTPUT_DIR/profile" \
+    > "$SCRIPT_LOGS_DIR/profile.log" || echo "Warning: profiling failed, see $SCRIPT_LOGS_DIR/profile.log" >&2
+  phase end "list-errors: profile"
+  echo -e "--> Hottest functions written to: $OUTPUT_DIR/profile/hottest_functions.txt" | tee -a "$LOG_FILE"
+fi
 
 # Print dots if requested
 if [[ "${PRINT_DOTS:-false}" == "true" ]]; then
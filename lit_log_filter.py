@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Single-pass filter of lit-output.log (list-errors.sh Step 1).
+- One streaming read extracts, with constant memory:
+  - comparison_failed.log: reference outputs of failed comparisons ('grep -B2 ": Compar..."')
+  - build_failed.log: executables that couldn't run ('grep -o ": error: (unable to open|child terminated)..."')
+  - slowest_tests.log: the 'Slowest Tests:' table of --time-tests
+- Reads a log file, or LIT's stdout live with --tee, which appends every line to
+  lit-output.log and echoes it, as `tee -a` did. Extraction then overlaps with the
+  test run, and list-errors.sh reuses the result instead of re-reading the log.
+
+Usage:
+    python3 lit_log_filter.py output/script_logs/lit-output.log -o output/script_logs
+    llvm-lit ... | python3 lit_log_filter.py --tee lit-output.log -o lit-filtered
+    python3 lit_log_filter.py output/script_logs/lit-output.log -o output/script_logs --from-live lit-filtered
+"""
+import argparse
+import json
+import os
+import re
+import shutil
+import sys
+from collections import deque
+
+COMPARISON_FAILED = "comparison_failed.log"
+BUILD_FAILED = "build_failed.log"
+SLOWEST_TESTS = "slowest_tests.log"
+STAMP = "lit-filter.json"
+
+COMPARE_RE = re.compile(rb": Compar(?:ison failed,|ed:)")
+REFERENCE_RE = re.compile(rb".reference_output")
+BUILD_ERROR_RE = re.compile(rb": error: (?:unable to open|child terminated).*")
+FIELD_SEP_RE = re.compile(rb"[ \t]+")
+BUILD_PREFIX_RE = re.compile(rb".*build/")
+QUOTED_BUILD_PATH_RE = re.compile(rb".*build/(.*)'")
+SLOWEST_START = b"Slowest Tests:"
+SLOWEST_END = b"Tests Times:"
+# Lines grep -A1000 / -B1000 kept around the slowest-tests table
+SLOWEST_MAX_LINES = 1000
+CONTEXT_BEFORE = 2
+
+
+def _fields(line):
+    stripped = line.strip(b" \t\r\n")
+    return FIELD_SEP_RE.split(stripped) if stripped else []
+
+
+def reference_output(line):
+    """
+    'fpcmp ... /x/build/SingleSource/foo.reference_output' -> b'SingleSource/foo.reference_output'
+    """
+    fields = _fields(line)
+    return BUILD_PREFIX_RE.sub(b"", fields[-1], count=1) if fields else b""
+
+
+def build_failure(match):
+    """
+    6th field of the ': error: ...' match, build-relative: "'/x/build/foo/bar'" -> b'foo/bar'
+    """
+    fields = _fields(match)
+    field = fields[5] if len(fields) > 5 else b""
+    return QUOTED_BUILD_PATH_RE.sub(rb"\1", field, count=1)
+
+
+class LitLogFilter:
+    """
+    Streaming classifier: feed() every line of the log once, then finish().
+    Comparison and build failures are written as they are found; the slowest-tests
+    table is buffered until its end marker (at most SLOWEST_MAX_LINES lines).
+    """
+
+    def __init__(self, output_dir):
+        self.output_dir = output_dir
+        os.makedirs(output_dir, exist_ok=True)
+        self.comparison = open(self._tmp(COMPARISON_FAILED), "wb")
+        self.build = open(self._tmp(BUILD_FAILED), "wb")
+        self.slowest = open(self._tmp(SLOWEST_TESTS), "wb")
+        self.before = deque(maxlen=CONTEXT_BEFORE)
+        self.last_printed = -1
+        self.lineno = 0
+        self.table = None
+        self.counts = {"lines": 0, "comparison_failed": 0, "build_failed": 0, "slowest_tests": 0}
+
+    def _tmp(self, name):
+        return os.path.join(self.output_dir, f"{name}.tmp{os.getpid()}")
+
+    def feed(self, line):
+        n = self.lineno
+        self.lineno += 1
+        if b": Compar" in line and COMPARE_RE.search(line):
+            # grep -B2 prints every line of the context once, even where windows overlap
+            for k, ctx in list(self.before) + [(n, line)]:
+                if k > self.last_printed and REFERENCE_RE.search(ctx):
+                    self.comparison.write(reference_output(ctx) + b"\n")
+                    self.counts["comparison_failed"] += 1
+            self.last_printed = n
+        if b": error: " in line:
+            m = BUILD_ERROR_RE.search(line.rstrip(b"\r\n"))
+            if m:
+                self.build.write(build_failure(m.group(0)) + b"\n")
+                self.counts["build_failed"] += 1
+        self._feed_table(line)
+        self.before.append((n, line))
+
+    def _feed_table(self, line):
+        if self.table is None:
+            if SLOWEST_START in line:
+                self.table = [line]
+            return
+        if SLOWEST_END in line:
+            self.slowest.writelines(self.table)
+            self.counts["slowest_tests"] += len(self.table)
+            self.table = None
+        elif len(self.table) > SLOWEST_MAX_LINES:
+            # No end marker within reach: grep -A1000 | grep -B1000 drops the section too
+            self.table = None
+            self._feed_table(line)
+        else:
+            self.table.append(line)
+
+    def finish(self, log_path=None, start=0):
+        """
+        Move the outputs into place and stamp them with the byte range of the log they
+        cover: from `start` (where a --tee run began appending) to its current size.
+        """
+        self.counts["lines"] = self.lineno
+        for handle, name in ((self.comparison, COMPARISON_FAILED), (self.build, BUILD_FAILED), (self.slowest, SLOWEST_TESTS)):
+            handle.close()
+            os.replace(handle.name, os.path.join(self.output_dir, name))
+        stamp = {"log": os.path.abspath(log_path) if log_path else None, "start": start, **self.counts}
+        if log_path and os.path.exists(log_path):
+            stamp["size"] = os.path.getsize(log_path)
+        with open(os.path.join(self.output_dir, STAMP), "w") as f:
+            json.dump(stamp, f, indent=1)
+        return self.counts
+
+
+def filter_stream(stream, output_dir, tee=None, echo=None, log_path=None):
+    """
+    Filter a binary line stream. With `tee`, every line is also appended to that
+    file (and written to `echo`); the stamp then refers to the tee file.
+    """
+    flt = LitLogFilter(output_dir)
+    start = tee.tell() if tee is not None else 0
+    try:
+        for line in stream:
+            if tee is not None:
+                tee.write(line)
+                if echo is not None:
+                    echo.write(line)
+                    echo.flush()
+            flt.feed(line)
+    finally:
+        if tee is not None:
+            tee.flush()
+    return flt.finish(log_path, start)
+
+
+def reuse_live(live_dir, log_path, output_dir):
+    """
+    Copy the outputs of a live (--tee) run if they cover exactly `log_path`: the log
+    was empty when the run started and wasn't appended to after the filter finished.
+    Returns True if reused.
+    """
+    if not os.path.isfile(log_path):
+        return False
+    try:
+        with open(os.path.join(live_dir, STAMP), "r") as f:
+            stamp = json.load(f)
+    except (OSError, ValueError):
+        return False
+    if stamp.get("start") != 0 or stamp.get("size") != os.path.getsize(log_path):
+        return False
+    os.makedirs(output_dir, exist_ok=True)
+    for name in (COMPARISON_FAILED, BUILD_FAILED, SLOWEST_TESTS, STAMP):
+        src = os.path.join(live_dir, name)
+        if not os.path.isfile(src):
+            return False
+        if os.path.abspath(src) != os.path.abspath(os.path.join(output_dir, name)):
+            shutil.copyfile(src, os.path.join(output_dir, name))
+    return True
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Extract failures and slowest tests from lit-output.log in one pass.")
+    p.add_argument("log", nargs="?", help="lit-output.log to read (default: stdin)")
+    p.add_argument("-o", "--output-dir", required=True, help="Where to write the filtered logs")
+    p.add_argument("--tee", help="Append stdin to this log and echo it to stdout, like `tee -a`")
+    p.add_argument("--from-live", help="Output dir of a --tee run; reused if it covers the whole log")
+    args = p.parse_args(argv)
+
+    if args.log and args.from_live and reuse_live(args.from_live, args.log, args.output_dir):
+        print(f"Reusing live-filtered LIT logs from {args.from_live}")
+        return 0
+    if args.tee:
+        with open(args.tee, "ab") as tee:
+            filter_stream(sys.stdin.buffer, args.output_dir, tee, sys.stdout.buffer, args.tee)
+        return 0
+    if args.log and not os.path.isfile(args.log):
+        print(f"Warning: {args.log} not found; writing empty filtered logs", file=sys.stderr)
+        counts = filter_stream([], args.output_dir)
+    elif args.log:
+        with open(args.log, "rb") as f:
+            counts = filter_stream(f, args.output_dir, log_path=args.log)
+    else:
+        counts = filter_stream(sys.stdin.buffer, args.output_dir)
+    print(
+        f"{counts['lines']} lines: {counts['comparison_failed']} comparison failures, "
+        f"{counts['build_failed']} build failures, {counts['slowest_tests']} slowest-tests lines"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+"""
+Content-addressed result cache for opt / llvm-extract / llvm-reduce invocations.
+- The cache key hashes the input file bytes, the tool binary, every file named on
+  the command line (e.g. libdaedalus.so, interestingness tests) and the full
+  argument vector, including the -max-slice-* options.
+- Each entry stores stdout, stderr, the exit code and the files the command produced.
+- The cache is size bounded; least recently used entries are evicted first.
+
+As a command wrapper:
+    python3 opt_cache.py -i in.ll -o out.ll -- llvm-extract -S -func=f in.ll -o out.ll
+
+Set DBGTK_NO_CACHE=1 (or pass --no-cache) to bypass the cache entirely.
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+DEFAULT_CACHE_DIR = os.environ.get(
+    "DBGTK_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "daedalus-dbg-toolkit", "results"),
+)
+DEFAULT_MAX_BYTES = int(os.environ.get("DBGTK_CACHE_MAX_BYTES", 4 * 1024**3))
+# Bump when the entry layout changes, so stale entries are never reused
+CACHE_VERSION = "1"
+
+_digest_memo = {}
+
+
+def cache_disabled_by_env():
+    return os.environ.get("DBGTK_NO_CACHE", "").lower() in ("1", "true", "yes")
+
+
+def file_digest(path):
+    """
+    SHA-256 of a file's contents, memoized on (path, size, mtime).
+    """
+    st = os.stat(path)
+    memo_key = (os.path.realpath(path), st.st_size, st.st_mtime_ns)
+    digest = _digest_memo.get(memo_key)
+    if digest is None:
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+        digest = h.hexdigest()
+        _digest_memo[memo_key] = digest
+    return digest
+
+
+def tool_fingerprint(tool):
+    """
+    Identify a tool binary by its resolved path, size and modification time.
+    Hashing a multi-hundred-MB opt on every call would cost more than most hits save.
+    """
+    path = shutil.which(tool) or tool
+    try:
+        real = os.path.realpath(path)
+        st = os.stat(real)
+    except OSError:
+        return tool
+    return f"{real}:{st.st_size}:{st.st_mtime_ns}"
+
+
+def _split_flag(token):
+    """
+    '-load-pass-plugin=/x/lib.so' -> ('-load-pass-plugin=', '/x/lib.so'); 'a.ll' -> ('', 'a.ll')
+    """
+    if token.startswith("-") and "=" in token:
+        flag, value = token.split("=", 1)
+        return flag + "=", value
+    return "", token
+
+
+class CacheEntry:
+    def __init__(self, returncode, stdout, stderr, meta, hit, timed_out=False):
+        self.returncode = returncode
+        self.stdout = stdout
+        self.stderr = stderr
+        self.meta = meta
+        self.hit = hit
+        self.timed_out = timed_out
+
+
+class ResultCache:
+    """
+    On-disk cache of command results, laid out as <root>/<key[:2]>/<key>/.
+    """
+
+    def __init__(self, root=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES, enabled=True):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.enabled = enabled and not cache_disabled_by_env()
+        # Approximate size of the cache, scanned lazily on the first store
+        self._size = None
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------
+    # Keys
+    # ------------------------------------------------------------
+    def key(self, argv, inputs=(), outputs=()):
+        """
+        Hash (tool, argv, input contents). Input paths stay in the key because opt
+        records them in the ModuleID and names CWD artifacts after them; declared
+        outputs are replaced by placeholders, and any other existing file on the
+        command line (plugins, interestingness tests) is folded in by content.
+        """
+        inputs = [os.path.abspath(path) for path in inputs]
+        placeholders = {os.path.abspath(path): f"<out{n}>" for n, path in enumerate(outputs)}
+
+        h = hashlib.sha256()
+        h.update(f"v{CACHE_VERSION}\0{tool_fingerprint(argv[0])}\0".encode())
+        for token in argv[1:]:
+            flag, value = _split_flag(token)
+            resolved = os.path.abspath(value) if value else value
+            if resolved in placeholders:
+                token = flag + placeholders[resolved]
+            elif resolved not in inputs and value and os.path.isfile(value):
+                token = f"{flag}<file:{file_digest(value)}>"
+            h.update(token.encode() + b"\0")
+        for path in inputs:
+            h.update(f"{path}:{file_digest(path)}\0".encode())
+        return h.hexdigest()
+
+    def _entry_dir(self, key):
+        return self.root / key[:2] / key
+
+    # ------------------------------------------------------------
+    # Lookup / store
+    # ------------------------------------------------------------
+    def fetch(self, key, outputs=(), artifacts_dir=None):
+        """
+        Restore a cached result: copy stored outputs (and CWD artifacts) into place.
+        Returns a CacheEntry or None on a miss.
+        """
+        if not self.enabled:
+            return None
+        entry = self._entry_dir(key)
+        meta_path = entry / "meta.json"
+        try:
+            with open(meta_path, "r") as f:
+                meta = json.load(f)
+            for n in meta.get("outputs", []):
+                shutil.copyfile(entry / "outputs" / str(n), outputs[n])
+            if artifacts_dir is not None:
+                Path(artifacts_dir).mkdir(parents=True, exist_ok=True)
+                for name in meta.get("artifacts", []):
+                    shutil.copyfile(entry / "artifacts" / name, Path(artifacts_dir, name))
+            stdout = (entry / "stdout").read_bytes()
+            stderr = (entry / "stderr").read_bytes()
+        except (OSError, ValueError):
+            return None
+        # Touch the entry so LRU eviction keeps it around
+        os.utime(meta_path)
+        return CacheEntry(meta["returncode"], stdout, stderr, meta, hit=True)
+
+    def store(self, key, returncode, stdout, stderr, outputs=(), artifacts=(), extra=None, timed_out=False):
+        """
+        Persist a result. Timed-out runs are not cached; crashes (assertion failures,
+        segfaults: negative return codes) are, as they are just as deterministic.
+        """
+        if not self.enabled or timed_out:
+            return
+        entry = self._entry_dir(key)
+        if entry.exists():
+            return
+        entry.parent.mkdir(parents=True, exist_ok=True)
+        tmp = Path(tempfile.mkdtemp(prefix=f".{key}.", dir=entry.parent))
+        try:
+            (tmp / "stdout").write_bytes(stdout or b"")
+            (tmp / "stderr").write_bytes(stderr or b"")
+            produced = [n for n, path in enumerate(outputs) if os.path.isfile(path)]
+            if produced:
+                (tmp / "outputs").mkdir()
+                for n in produced:
+                    shutil.copyfile(outputs[n], tmp / "outputs" / str(n))
+            names = []
+            if artifacts:
+                (tmp / "artifacts").mkdir()
+                for path in artifacts:
+                    names.append(os.path.basename(path))
+                    shutil.copyfile(path, tmp / "artifacts" / names[-1])
+            size = sum(p.stat().st_size for p in tmp.rglob("*") if p.is_file())
+            meta = {
+                "returncode": returncode,
+                "outputs": produced,
+                "artifacts": names,
+                "size": size,
+                "created": time.time(),
+            }
+            meta.update(extra or {})
+            with open(tmp / "meta.json", "w") as f:
+                json.dump(meta, f)
+            os.rename(tmp, entry)
+        except OSError:
+            shutil.rmtree(tmp, ignore_errors=True)
+            return
+        with self._lock:
+            if self._size is None:
+                self._size = self._scan()[1]
+            else:
+                self._size += size
+            if self._size > self.max_bytes:
+                self._size = self.evict()
+
+    def _scan(self):
+        """
+        Returns ([(last_used, size, entry_dir), ...], total_size).
+        """
+        entries = []
+        total = 0
+        for meta_path in self.root.glob("*/*/meta.json"):
+            try:
+                st = meta_path.stat()
+                with open(meta_path, "r") as f:
+                    size = json.load(f).get("size", 0)
+            except (OSError, ValueError):
+                continue
+            entries.append((st.st_mtime, size, meta_path.parent))
+            total += size
+        return entries, total
+
+    def evict(self):
+        """
+        Drop least recently used entries until the cache fits in max_bytes.
+        Returns the resulting cache size.
+        """
+        entries, total = self._scan()
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+        return total
+
+    def clear(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    # ------------------------------------------------------------
+    # Convenience wrapper
+    # ------------------------------------------------------------
+    def run(self, argv, inputs=(), outputs=(), artifacts_dir=None, timeout=None):
+        """
+        Run `argv` through the cache. When `artifacts_dir` is given, the command runs in
+        a private scratch directory and every file it creates there is moved into it.
+        """
+        key = self.key(argv, inputs, outputs) if self.enabled else None
+        if key:
+            cached = self.fetch(key, outputs, artifacts_dir)
+            if cached:
+                return cached
+
+        scratch = Path(tempfile.mkdtemp(prefix=".dbgtk-run.")) if artifacts_dir else None
+        try:
+            timed_out = False
+            try:
+                proc = subprocess.run(argv, cwd=scratch, capture_output=True, timeout=timeout)
+                returncode, stdout, stderr = proc.returncode, proc.stdout, proc.stderr
+            except subprocess.TimeoutExpired as e:
+                returncode, stdout, stderr = -9, e.stdout or b"", e.stderr or b""
+                timed_out = True
+            artifacts = sorted(p for p in scratch.iterdir() if p.is_file()) if scratch else []
+            if key:
+                self.store(key, returncode, stdout, stderr, outputs, artifacts, timed_out=timed_out)
+            if artifacts_dir is not None:
+                Path(artifacts_dir).mkdir(parents=True, exist_ok=True)
+                for path in artifacts:
+                    shutil.move(str(path), Path(artifacts_dir, path.name))
+        finally:
+            if scratch:
+                shutil.rmtree(scratch, ignore_errors=True)
+        return CacheEntry(returncode, stdout, stderr, {}, hit=False, timed_out=timed_out)
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(
+        description="Run a command through the on-disk result cache.",
+        usage="%(prog)s [options] -- command [args...]",
+    )
+    p.add_argument("-i", "--input", action="append", default=[], help="Input file read by the command")
+    p.add_argument("-o", "--output", action="append", default=[], help="Output file written by the command")
+    p.add_argument(
+        "--artifacts-dir",
+        help="Run in a scratch directory and move files created in the CWD here",
+    )
+    p.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help=f"Cache location (default: {DEFAULT_CACHE_DIR})")
+    p.add_argument("--max-size", type=int, default=DEFAULT_MAX_BYTES, help="Cache size bound in bytes")
+    p.add_argument("--no-cache", action="store_true", help="Bypass the cache")
+    p.add_argument("--clear", action="store_true", help="Remove every cache entry and exit")
+    p.add_argument("command", nargs=argparse.REMAINDER, help="Command to run, after --")
+    args = p.parse_args(argv)
+    if args.command and args.command[0] == "--":
+        args.command = args.command[1:]
+    if not args.command and not args.clear:
+        p.error("missing command")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    cache = ResultCache(args.cache_dir, args.max_size, enabled=not args.no_cache)
+    if args.clear:
+        cache.clear()
+        return 0
+
+    # The command may run in a scratch CWD, so make every declared path absolute
+    declared = {p: os.path.abspath(p) for p in args.input + args.output}
+    command = [args.command[0]]
+    for token in args.command[1:]:
+        flag, value = _split_flag(token)
+        command.append(flag + declared[value] if value in declared else token)
+
+    result = cache.run(
+        command,
+        inputs=[declared[p] for p in args.input],
+        outputs=[declared[p] for p in args.output],
+        artifacts_dir=args.artifacts_dir,
+    )
+    sys.stdout.buffer.write(result.stdout)
+    sys.stderr.buffer.write(result.stderr)
+    return result.returncode if result.returncode >= 0 else 128 - result.returncode
+
+
+if __name__ == "__main__":
+    sys.exit(main())
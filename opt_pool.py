@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Run the Daedalus pass (or any other --pass) over the failing test bitcode files in parallel.
+- Reads the sorted files list written by list-errors.sh (files-list-sorted.txt).
+- Runs each `opt` invocation in its own scratch directory, so the
+  *_slices_report.log and *.parent_module.ll files the pass drops in its CWD
+  never collide between concurrent workers.
+- Writes one result record per file (<base>.result.json in bc_logs/) and prints
+  the same Processed / Build failures / Comparison failures summary as before.
+- Reuses results from the opt_cache.py result cache when neither the input bitcode,
+  libdaedalus.so nor the pass arguments changed (disable with --no-cache).
+- --pass / --plugin run another pipeline (e.g. iroutliner, func-merging) the same
+  way, which is what list-errors.sh --pass uses.
+"""
+import argparse
+import json
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+from opt_cache import DEFAULT_CACHE_DIR, ResultCache
+
+DEBUG_ONLY = "daedalus,ProgramSlice,PHIGateAnalyzer"
+
+
+def parse_args():
+    p = argparse.ArgumentParser(
+        description="Run opt -passes=daedalus (or --pass) over failing tests across a worker pool."
+    )
+    p.add_argument("files_list", help="Sorted files list (paths relative to the build dir)")
+    p.add_argument("--build-dir", required=True, help="LLVM Test Suite build folder")
+    p.add_argument("--plugin-dir", help="Folder containing libdaedalus.so")
+    p.add_argument("--plugin", help="Pass plugin to load (default: <plugin-dir>/libdaedalus.so)")
+    p.add_argument("--pass", dest="pass_name", default="daedalus", help="opt -passes pipeline (default: daedalus)")
+    p.add_argument("--output-dir", required=True, help="Output base directory")
+    p.add_argument(
+        "--workers",
+        "-w",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Number of concurrent opt processes (default: all cores)",
+    )
+    p.add_argument(
+        "--timeout",
+        "-t",
+        type=float,
+        default=600,
+        help="Per-file timeout in seconds, 0 disables it (default: 600)",
+    )
+    p.add_argument(
+        "--full-logs",
+        action="store_true",
+        help="Print full debug logs and statistics when calling opt",
+    )
+    p.add_argument("--summary", help="Optional: write the run summary as JSON to this file")
+    p.add_argument("--no-cache", action="store_true", help="Always rerun opt, bypassing the result cache")
+    p.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help=f"Result cache location (default: {DEFAULT_CACHE_DIR})")
+    args = p.parse_args()
+    if not args.plugin and args.plugin_dir:
+        args.plugin = os.path.join(args.plugin_dir, "libdaedalus.so")
+    if args.pass_name == "daedalus" and not args.plugin:
+        p.error("the daedalus pass needs --plugin-dir or --plugin")
+    return args
+
+
+def write_json_atomic(path, data):
+    """
+    Write `data` as JSON to `path` so that readers never observe a partial file.
+    """
+    path = Path(path)
+    fd, tmp = tempfile.mkstemp(prefix=f".{path.name}.", dir=path.parent)
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+def run_process(cmd, cwd, stdout, stderr, timeout):
+    """
+    Run `cmd` and reap it with wait4() so we get its resource usage.
+    Returns (returncode, signal, timed_out, duration, peak_rss_kb).
+    """
+    start = time.monotonic()
+    proc = subprocess.Popen(cmd, cwd=cwd, stdout=stdout, stderr=stderr)
+    timed_out = threading.Event()
+
+    def kill():
+        timed_out.set()
+        proc.kill()
+
+    timer = threading.Timer(timeout, kill) if timeout and timeout > 0 else None
+    if timer:
+        timer.start()
+    try:
+        _, status, rusage = os.wait4(proc.pid, 0)
+        proc.returncode = os.waitstatus_to_exitcode(status)
+    finally:
+        if timer:
+            timer.cancel()
+    duration = time.monotonic() - start
+    sig = -proc.returncode if proc.returncode < 0 else None
+    # ru_maxrss is reported in KiB on Linux
+    return proc.returncode, sig, timed_out.is_set(), duration, rusage.ru_maxrss
+
+
+def run_one(file, args, layout, cache):
+    """
+    Apply the pass to a single failing test and record the outcome.
+    """
+    src = Path(args.build_dir, file).resolve()
+    base = os.path.basename(file)
+    record = {"file": file, "source": str(src)}
+    if not src.is_file():
+        record["status"] = "missing"
+        write_json_atomic(layout["bc_logs"] / f"{base}.result.json", record)
+        return record
+
+    log_path = layout["bc_logs"] / f"{base}.log"
+    plugin = [f"-load-pass-plugin={Path(args.plugin).resolve()}"] if args.plugin else []
+    passes = f"-passes={args.pass_name}"
+    outputs = []
+    if args.full_logs:
+        debug = [f"-debug-only={DEBUG_ONLY}"] if args.pass_name == "daedalus" else []
+        cmd = ["opt", *debug, "-stats", passes, *plugin, "-S", str(src), "-disable-output"]
+    else:
+        out_ll = layout["sources_failed"] / base.replace(".e.bc", ".d.ll")
+        cmd = ["opt", passes, *plugin, "-S", str(src), "-o", str(out_ll)]
+        outputs.append(str(out_ll))
+
+    key = cache.key(cmd, inputs=[str(src)], outputs=outputs) if cache.enabled else None
+    scratch = Path(tempfile.mkdtemp(prefix=f"{base}.", dir=layout["scratch"]))
+    try:
+        cached = cache.fetch(key, outputs, artifacts_dir=scratch) if key else None
+        if cached:
+            log_path.write_bytes(cached.stderr)
+            rc, timed_out = cached.returncode, False
+            sig = -rc if rc < 0 else None
+            duration = cached.meta.get("duration", 0.0)
+            peak_rss = cached.meta.get("peak_rss_kb", 0)
+        else:
+            with open(log_path, "wb") as log:
+                rc, sig, timed_out, duration, peak_rss = run_process(
+                    cmd, scratch, subprocess.DEVNULL, log, args.timeout
+                )
+            if key:
+                cache.store(
+                    key, rc, b"", log_path.read_bytes(), outputs,
+                    artifacts=sorted(p for p in scratch.iterdir() if p.is_file()),
+                    extra={"duration": round(duration, 3), "peak_rss_kb": peak_rss},
+                    timed_out=timed_out,
+                )
+        # The pass succeeding means the test only failed at comparison time
+        failed_comp = rc == 0
+        if args.full_logs and failed_comp:
+            for report in scratch.glob("*_slices_report.log"):
+                shutil.move(str(report), layout["bc_logs"] / report.name)
+        for module in scratch.glob("*.parent_module.ll"):
+            shutil.move(str(module), layout["sources_failed"] / module.name)
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    record.update(
+        {
+            "status": "comp" if failed_comp else "build",
+            "exit_code": rc,
+            "signal": signal.Signals(sig).name if sig else None,
+            "timed_out": timed_out,
+            "duration": round(duration, 3),
+            "peak_rss_kb": peak_rss,
+            "cached": cached is not None,
+            "command": cmd,
+        }
+    )
+    write_json_atomic(layout["bc_logs"] / f"{base}.result.json", record)
+    return record
+
+
+def describe(record):
+    lines = [f"\nRunning opt over: {record['file'].replace('.e.bc', '.ll')}"]
+    if record["status"] == "missing":
+        lines.append(f"Missing: {record['source']}")
+    elif record["status"] == "comp":
+        lines.append("\tFailed comparison...")
+    else:
+        reason = " (timeout)" if record["timed_out"] else ""
+        lines.append(f"\tFailed build...{reason}")
+    return "\n".join(lines)
+
+
+def main():
+    args = parse_args()
+
+    output_dir = Path(args.output_dir)
+    layout = {
+        "bc_logs": output_dir / "bc_logs",
+        "sources_failed": output_dir / "sources_comparison_failed",
+        "scratch": output_dir / ".opt-scratch",
+    }
+    for path in layout.values():
+        path.mkdir(parents=True, exist_ok=True)
+
+    with open(args.files_list, "r") as f:
+        files = [line.strip() for line in f if line.strip()]
+
+    cache = ResultCache(args.cache_dir, enabled=not args.no_cache)
+
+    total = failed_build = failed_comp = 0
+    with ThreadPoolExecutor(max_workers=max(1, args.workers)) as pool:
+        futures = [pool.submit(run_one, file, args, layout, cache) for file in files]
+        for future in as_completed(futures):
+            record = future.result()
+            total += 1
+            if record["status"] == "comp":
+                failed_comp += 1
+            else:
+                failed_build += 1
+            print(describe(record), flush=True)
+
+    shutil.rmtree(layout["scratch"], ignore_errors=True)
+
+    print(f"\nProcessed: {total}")
+    print(f"Build failures    : {failed_build}")
+    print(f"Comparison failures: {failed_comp}")
+
+    if args.summary:
+        write_json_atomic(
+            args.summary,
+            {"total": total, "failed_build": failed_build, "failed_comp": failed_comp},
+        )
+
+
+if __name__ == "__main__":
+    sys.exit(main())
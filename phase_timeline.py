@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""
+Phase-level resource timeline of gen_baseline.sh / gen_daedalus.sh / list-errors.sh /
+run-experiment.sh.
+- `start` launches a detached sampler that appends machine-wide CPU utilisation,
+  memory, disk I/O and per-tool process counts (clang, opt, ld.lld, ninja, ...) to a
+  JSON-lines timeline at a fixed interval. The first record holds the hardware
+  context: print-hardware-info.sh output, core counts and memory, plus the --meta
+  settings of the run (workers, timeout, ...).
+- `mark begin|end <phase>` appends phase markers. The scripts call it around cmake,
+  ninja, llvm-lit, the list-errors.sh steps, compare.py and the analysis whenever
+  $DBGTK_TIMELINE names a timeline being recorded, so nested scripts share one file.
+- `stop` ends the sampler and writes the summary; `summary` recomputes it. Phases
+  that ran long with cores sitting idle are flagged.
+
+Usage:
+    python3 phase_timeline.py start timeline.jsonl --meta workers=10 --meta timeout=120
+    DBGTK_TIMELINE=timeline.jsonl python3 phase_timeline.py mark begin "ninja build"
+    python3 phase_timeline.py stop timeline.jsonl
+    python3 phase_timeline.py summary timeline.jsonl
+"""
+import argparse
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+import psutil
+from tabulate import tabulate
+
+DEFAULT_INTERVAL = 1.0
+# A phase is flagged when it ran at least this long below this mean CPU utilisation
+IDLE_MIN_SECONDS = 30.0
+IDLE_CPU_PERCENT = 50.0
+STOP_WAIT = 10.0
+
+# Processes counted per sample; everything else only shows up in 'total'
+TOOLS = {
+    "clang": "clang", "clang++": "clang", "clang-14": "clang", "cc1": "clang",
+    "opt": "opt", "ld.lld": "lld", "lld": "lld", "ld": "ld", "ninja": "ninja",
+    "cmake": "cmake", "llvm-lit": "lit", "lit": "lit", "timeit": "timeit", "timeit-target": "timeit",
+    "fpcmp": "fpcmp", "fpcmp-target": "fpcmp", "llvm-extract": "llvm-extract",
+    "llvm-reduce": "llvm-reduce", "llvm-dis": "llvm-dis", "dot": "dot",
+    "python3": "python", "python": "python",
+}
+
+
+def _append(path, record):
+    """
+    One JSON line per write() on an O_APPEND descriptor, so concurrent writers
+    (sampler and markers) never interleave within a line.
+    """
+    line = (json.dumps(record, separators=(",", ":")) + "\n").encode()
+    fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, line)
+    finally:
+        os.close(fd)
+
+
+def mark(event, phase, timeline=None):
+    """
+    Append a begin/end marker to `timeline` (default: $DBGTK_TIMELINE); a no-op when
+    nothing is being recorded.
+    """
+    timeline = timeline or os.environ.get("DBGTK_TIMELINE")
+    if timeline:
+        _append(timeline, {"type": "mark", "t": time.time(), "event": event, "phase": phase})
+
+
+def hardware_record(meta):
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "print-hardware-info.sh")
+    try:
+        info = subprocess.run(["bash", script], capture_output=True, text=True, timeout=30).stdout
+    except (OSError, subprocess.SubprocessError):
+        info = ""
+    vm = psutil.virtual_memory()
+    return {
+        "type": "hardware",
+        "t": time.time(),
+        "hostname": socket.gethostname(),
+        "logical_cores": psutil.cpu_count(logical=True),
+        "physical_cores": psutil.cpu_count(logical=False),
+        "memory_total": vm.total,
+        "swap_total": psutil.swap_memory().total,
+        "meta": meta,
+        "print_hardware_info": info,
+    }
+
+
+def take_sample():
+    per_cpu = psutil.cpu_percent(percpu=True)
+    vm = psutil.virtual_memory()
+    disk = psutil.disk_io_counters()
+    procs = {}
+    total = 0
+    for proc in psutil.process_iter(["name"]):
+        total += 1
+        tool = TOOLS.get(proc.info["name"] or "")
+        if tool:
+            procs[tool] = procs.get(tool, 0) + 1
+    return {
+        "type": "sample",
+        "t": time.time(),
+        "cpu": round(sum(per_cpu) / max(1, len(per_cpu)), 1),
+        "busy_cores": round(sum(per_cpu) / 100.0, 2),
+        "mem_used": vm.total - vm.available,
+        "swap_used": psutil.swap_memory().used,
+        "disk_read": disk.read_bytes if disk else 0,
+        "disk_write": disk.write_bytes if disk else 0,
+        "load1": round(os.getloadavg()[0], 2),
+        "procs": procs,
+        "procs_total": total,
+    }
+
+
+def sample_loop(timeline, interval):
+    stop = []
+    signal.signal(signal.SIGTERM, lambda *_: stop.append(True))
+    psutil.cpu_percent(percpu=True)  # the first call only sets the reference point
+    while not stop:
+        time.sleep(interval)
+        _append(timeline, take_sample())
+
+
+def pid_file(timeline):
+    return f"{timeline}.pid"
+
+
+def start(timeline, interval, meta):
+    if os.path.exists(pid_file(timeline)):
+        stop_sampler(timeline)
+    _append(timeline, hardware_record(meta))
+    proc = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), "sample", timeline, "--interval", str(interval)],
+        stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+    with open(pid_file(timeline), "w") as f:
+        f.write(str(proc.pid))
+    return proc.pid
+
+
+def stop_sampler(timeline):
+    try:
+        with open(pid_file(timeline), "r") as f:
+            pid = int(f.read().strip())
+    except (OSError, ValueError):
+        return False
+    try:
+        os.kill(pid, signal.SIGTERM)
+        deadline = time.monotonic() + STOP_WAIT
+        while psutil.pid_exists(pid) and time.monotonic() < deadline:
+            # Reap it if we happen to be its parent
+            try:
+                os.waitpid(pid, os.WNOHANG)
+            except ChildProcessError:
+                pass
+            time.sleep(0.05)
+    except ProcessLookupError:
+        pass
+    os.remove(pid_file(timeline))
+    return True
+
+
+# ------------------------------------------------------------
+# Summary
+# ------------------------------------------------------------
+def load_timeline(path):
+    hardware, samples, marks = None, [], []
+    with open(path, "r") as f:
+        for line in f:
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                continue  # a line cut short by a crash
+            kind = rec.get("type")
+            if kind == "hardware" and hardware is None:
+                hardware = rec
+            elif kind == "sample":
+                samples.append(rec)
+            elif kind == "mark":
+                marks.append(rec)
+    return hardware, samples, marks
+
+
+def phases_of(marks, end_time):
+    """
+    [(name, begin, end)] in order of beginning; a phase never ended runs until end_time.
+    """
+    open_phases = {}
+    out = []
+    for mark in marks:
+        if mark["event"] == "begin":
+            open_phases.setdefault(mark["phase"], []).append(len(out))
+            out.append([mark["phase"], mark["t"], None])
+        elif open_phases.get(mark["phase"]):
+            out[open_phases[mark["phase"]].pop()][2] = mark["t"]
+    return [(name, begin, end if end is not None else max(end_time, begin)) for name, begin, end in out]
+
+
+def phase_stats(name, begin, end, samples, cores):
+    window = [s for s in samples if begin <= s["t"] <= end]
+    row = {"phase": name, "begin": begin, "seconds": round(end - begin, 1), "samples": len(window)}
+    if not window:
+        return row
+    cpu = sorted(s["cpu"] for s in window)
+    busy = sum(s["busy_cores"] for s in window) / len(window)
+    procs = {}
+    for s in window:
+        for tool, n in s["procs"].items():
+            procs[tool] = procs.get(tool, 0) + n
+    top = sorted(procs.items(), key=lambda kv: -kv[1])[:3]
+    row.update(
+        {
+            "cpu_mean": round(sum(cpu) / len(cpu), 1),
+            "cpu_p95": cpu[min(len(cpu) - 1, int(len(cpu) * 0.95))],
+            "busy_cores": round(busy, 1),
+            "idle_cores": round(max(0.0, cores - busy), 1),
+            "mem_peak_gb": round(max(s["mem_used"] for s in window) / 2**30, 2),
+            "swap_peak_gb": round(max(s["swap_used"] for s in window) / 2**30, 2),
+            "disk_read_mb": round((window[-1]["disk_read"] - window[0]["disk_read"]) / 2**20, 1),
+            "disk_write_mb": round((window[-1]["disk_write"] - window[0]["disk_write"]) / 2**20, 1),
+            "procs": {tool: round(n / len(window), 1) for tool, n in top},
+        }
+    )
+    return row
+
+
+def summarize(path, idle_cpu=IDLE_CPU_PERCENT, idle_seconds=IDLE_MIN_SECONDS):
+    hardware, samples, marks = load_timeline(path)
+    cores = (hardware or {}).get("logical_cores") or psutil.cpu_count() or 1
+    end_time = samples[-1]["t"] if samples else (marks[-1]["t"] if marks else 0.0)
+    rows = [phase_stats(name, b, e, samples, cores) for name, b, e in phases_of(marks, end_time)]
+    for row in rows:
+        row["idle"] = bool(
+            row["seconds"] >= idle_seconds and row.get("cpu_mean") is not None and row["cpu_mean"] < idle_cpu
+        )
+    return {
+        "timeline": os.path.abspath(path),
+        "hardware": {k: v for k, v in (hardware or {}).items() if k != "type"},
+        "interval_samples": len(samples),
+        "idle_threshold": {"cpu_percent": idle_cpu, "min_seconds": idle_seconds},
+        "phases": rows,
+    }
+
+
+def print_summary(summary):
+    hw = summary["hardware"]
+    meta = ", ".join(f"{k}={v}" for k, v in (hw.get("meta") or {}).items())
+    print(f"Host {hw.get('hostname', '?')}: {hw.get('logical_cores', '?')} logical / "
+          f"{hw.get('physical_cores', '?')} physical cores, "
+          f"{(hw.get('memory_total') or 0) / 2**30:.1f} GiB memory" + (f" ({meta})" if meta else ""))
+    table = [
+        [
+            ("! " if r["idle"] else "") + r["phase"], r["seconds"], r.get("cpu_mean", ""), r.get("busy_cores", ""),
+            r.get("idle_cores", ""), r.get("mem_peak_gb", ""), r.get("disk_read_mb", ""), r.get("disk_write_mb", ""),
+            " ".join(f"{t}:{n}" for t, n in (r.get("procs") or {}).items()),
+        ]
+        for r in summary["phases"]
+    ]
+    print(tabulate(
+        table,
+        headers=["Phase", "Seconds", "CPU %", "Busy cores", "Idle cores", "Peak mem GB", "Read MB", "Write MB", "Processes"],
+        tablefmt="psql",
+    ))
+    idle = [r for r in summary["phases"] if r["idle"]]
+    th = summary["idle_threshold"]
+    if idle:
+        print(f"\nPhases with idle cores (>= {th['min_seconds']:.0f}s below {th['cpu_percent']:.0f}% CPU):")
+        for r in idle:
+            print(f"  {r['phase']}: {r['idle_cores']} of {hw.get('logical_cores', '?')} cores idle on average "
+                  f"over {r['seconds']}s")
+
+
+def write_summary(path, summary):
+    out = f"{os.path.splitext(path)[0]}.summary.json"
+    tmp = f"{out}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(summary, f, indent=1)
+    os.replace(tmp, out)
+    return out
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Record a phase-level CPU/memory/disk timeline.")
+    sub = p.add_subparsers(dest="command", required=True)
+
+    s = sub.add_parser("start", help="Record hardware context and start the sampler")
+    s.add_argument("timeline", help="JSON-lines timeline to append to")
+    s.add_argument("-i", "--interval", type=float, default=DEFAULT_INTERVAL, help="Seconds between samples")
+    s.add_argument("--meta", action="append", default=[], help="KEY=VALUE stored with the hardware record")
+
+    m = sub.add_parser("mark", help="Mark the beginning or end of a phase")
+    m.add_argument("event", choices=["begin", "end"])
+    m.add_argument("phase", help="Phase name, e.g. 'ninja build'")
+    m.add_argument("--timeline", default=os.environ.get("DBGTK_TIMELINE"), help="Default: $DBGTK_TIMELINE")
+
+    t = sub.add_parser("stop", help="Stop the sampler, then write and print the summary")
+    t.add_argument("timeline")
+
+    y = sub.add_parser("summary", help="Summarize a timeline per phase")
+    y.add_argument("timeline")
+    y.add_argument("--idle-cpu", type=float, default=IDLE_CPU_PERCENT, help="Flag phases below this mean CPU %%")
+    y.add_argument("--idle-seconds", type=float, default=IDLE_MIN_SECONDS, help="...that ran at least this long")
+    y.add_argument("--json", action="store_true", help="Print the summary as JSON")
+
+    w = sub.add_parser("sample", help=argparse.SUPPRESS)
+    w.add_argument("timeline")
+    w.add_argument("--interval", type=float, default=DEFAULT_INTERVAL)
+    args = p.parse_args(argv)
+
+    if args.command == "start":
+        meta = dict(item.split("=", 1) if "=" in item else (item, "") for item in args.meta)
+        pid = start(args.timeline, args.interval, meta)
+        print(f"Recording timeline {args.timeline} (sampler pid {pid}, every {args.interval}s)")
+    elif args.command == "mark":
+        mark(args.event, args.phase, args.timeline)
+    elif args.command == "sample":
+        sample_loop(args.timeline, args.interval)
+    elif args.command == "stop":
+        stop_sampler(args.timeline)
+        summary = summarize(args.timeline)
+        out = write_summary(args.timeline, summary)
+        print_summary(summary)
+        print(f"--> Timeline summary written to: {out}")
+    else:
+        summary = summarize(args.timeline, args.idle_cpu, args.idle_seconds)
+        if args.json:
+            json.dump(summary, sys.stdout, indent=1)
+            print()
+        else:
+            print_summary(summary)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
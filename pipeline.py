@@ -0,0 +1,423 @@
+#!/usr/bin/env python3
+"""
+Concurrent multi-configuration pipeline (what run-experiment.sh runs).
+- CONFIGS defines every configuration once: name, opt -passes pipeline, pass
+  arguments, whether it loads libdaedalus.so, its LIT results file and the tool
+  directory it needs on PATH. Baseline (Os), IROutliner, func-merging and Daedalus.
+- Each configuration builds in its own tree (<llvm-test-suite>/build-<name>), so the
+  configure, ninja and LIT stages of different configurations run at the same time.
+- A shared core budget (--cores) bounds them: every build, LIT and post-processing
+  stage takes --stage-cores cores (its ninja/lit/opt -j) and waits until they are free.
+- As soon as a configuration's LIT run is done (and the baseline's), the
+  pass-agnostic list-errors.sh --pass post-processes it in its own work dir, while
+  the other configurations are still building.
+- The four-way compare.py report, the results_store.py store and its analysis come
+  out at the end.
+
+The baseline goes through gen_baseline.sh, so its cache and --repeat still apply;
+with --exclusive-lit it holds the whole budget for its build as well as its LIT runs.
+
+Usage:
+    python3 pipeline.py --cores 32 --max-slice-params 1 --max-slice-size 20 --max-slice-users 10
+    python3 pipeline.py --only baseline,daedalus --stage-cores 8 --repeat 5
+"""
+import argparse
+import glob
+import json
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import phase_timeline
+import results_store
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+HOME = os.path.expanduser("~")
+DEFAULT_LLVM_PROJECT = os.path.join(HOME, "src", "github", "llvm-project")
+DEFAULT_LLVM_TEST_SUITE = os.path.join(HOME, "src", "github", "llvm-test-suite")
+DEFAULT_DAEDALUS = os.path.join(HOME, "src", "github", "Daedalus")
+DEFAULT_CODE_SIZE = os.path.join(HOME, "src", "github", "code-size")
+DEFAULT_LIT_RESULTS = os.path.join(HOME, "lit-results")
+
+# In compare.py column order: the baseline first
+CONFIGS = [
+    {"name": "baseline", "passes": "", "plugin": False, "results": "baseline.json", "path": None},
+    {"name": "iroutliner", "passes": "iroutliner", "plugin": False, "results": "iroutliner.json", "path": None},
+    {"name": "func-merging", "passes": "func-merging", "plugin": False, "results": "func-merging.json",
+     "path": "code-size"},
+    {"name": "daedalus", "passes": "daedalus", "plugin": True, "results": "daedalus.json", "path": None},
+]
+COMPARE_METRICS = ["instcount", "size..text", "exec_time", "compile_time"]
+CMAKE_FLAGS = [
+    "-DCMAKE_C_COMPILER=clang",
+    "-DCMAKE_CXX_COMPILER=clang++",
+    "-DCMAKE_C_FLAGS=-flto",
+    "-DCMAKE_CXX_FLAGS=-flto",
+    "-DCMAKE_EXE_LINKER_FLAGS=-flto -fuse-ld=lld -Wl,--plugin-opt=-lto-embed-bitcode=post-merge-pre-opt",
+    "-DTEST_SUITE_COLLECT_INSTCOUNT=ON",
+    "-DTEST_SUITE_SUBDIRS=SingleSource;MultiSource",
+]
+
+
+class CoreBudget:
+    """
+    Counting semaphore over cores: a stage asks for n cores and blocks until that
+    many are free. Requests above the budget are capped at the budget.
+    """
+
+    def __init__(self, cores):
+        self.total = max(1, cores)
+        self.free = self.total
+        self.cond = threading.Condition()
+
+    @contextmanager
+    def cores(self, n):
+        n = max(1, min(n, self.total))
+        with self.cond:
+            self.cond.wait_for(lambda: self.free >= n)
+            self.free -= n
+        try:
+            yield n
+        finally:
+            with self.cond:
+                self.free += n
+                self.cond.notify_all()
+
+
+def log(config, message):
+    print(f"[{config}] {message}", flush=True)
+
+
+def run_stage(config, stage, cmd, log_path, env=None, check=False):
+    """
+    Run one stage command, its output appended to log_path, with phase markers for
+    phase_timeline.py. Returns (exit code, seconds).
+    """
+    phase = f"{config}: {stage}"
+    phase_timeline.mark("begin", phase)
+    log(config, f"{stage} started")
+    start = time.monotonic()
+    with open(log_path, "ab") as out:
+        rc = subprocess.run(cmd, stdout=out, stderr=out, env=env).returncode
+    seconds = time.monotonic() - start
+    phase_timeline.mark("end", phase)
+    log(config, f"{stage} finished in {seconds:.0f}s" + (f" (exit code {rc})" if rc else ""))
+    if check and rc:
+        raise RuntimeError(f"{stage} failed with exit code {rc}, see {log_path}")
+    return rc, seconds
+
+
+def config_env(config, args):
+    env = dict(os.environ)
+    if config["path"] == "code-size":
+        env["PATH"] = os.path.join(args.code_size, "build", "bin") + os.pathsep + env.get("PATH", "")
+    return env
+
+
+def pass_args(config, args):
+    if not config["plugin"]:
+        return []
+    out = [f"-load-pass-plugin={plugin_path(args)}"]
+    for flag, value in (("params", args.max_slice_params), ("size", args.max_slice_size), ("users", args.max_slice_users)):
+        if value:
+            out.append(f"-max-slice-{flag}={value}")
+    return out
+
+
+def plugin_path(args):
+    return os.path.join(args.daedalus, "build", "lib", "libdaedalus.so")
+
+
+def build_dir(config, args):
+    return os.path.join(args.llvm_test_suite, f"build-{config['name']}")
+
+
+def work_dir(config, args):
+    return os.path.join(args.work_root, config["name"])
+
+
+def lit_command(args, lit_json, tests, jobs, verbose=True):
+    cmd = [sys.executable, shutil.which("llvm-lit") or "llvm-lit", "--time-tests", "--ignore-fail"]
+    if verbose:
+        cmd.append("--verbose")
+    return cmd + ["--timeout", str(args.timeout), "-j", str(jobs), "-s", "-o", lit_json, *tests]
+
+
+def run_lit(config, args, jobs, env, logs):
+    """
+    LIT run 1 streams through lit_log_filter.py --tee into <work>/lit-output.log, as
+    gen_daedalus.sh does. --repeat runs (on the same cores) log separately, and the
+    results file becomes the per-test medians.
+    """
+    build, work = build_dir(config, args), work_dir(config, args)
+    lit_json = os.path.join(args.lit_results, config["results"])
+    stem = lit_json[: -len(".json")]
+    # Samples and logs of an earlier run must not end up next to this one
+    for stale in glob.glob(f"{stem}.run*.json") + [os.path.join(work, "lit-output.log")]:
+        if os.path.exists(stale):
+            os.remove(stale)
+    phase = f"{config['name']}: llvm-lit"
+    phase_timeline.mark("begin", phase)
+    log(config["name"], f"llvm-lit started (-j {jobs})")
+    start = time.monotonic()
+    with open(os.path.join(logs, "llvm-lit.err"), "ab") as err:
+        lit = subprocess.Popen(lit_command(args, lit_json, [build], jobs), stdout=subprocess.PIPE, stderr=err, env=env)
+        flt = subprocess.run(
+            [sys.executable, os.path.join(SCRIPT_DIR, "lit_log_filter.py"),
+             "--tee", os.path.join(work, "lit-output.log"), "-o", os.path.join(work, "lit-filtered")],
+            stdin=lit.stdout, stdout=subprocess.DEVNULL, stderr=err,
+        )
+        lit.stdout.close()
+        rc = lit.wait() or flt.returncode
+    phase_timeline.mark("end", phase)
+    log(config["name"], f"llvm-lit finished in {time.monotonic() - start:.0f}s" + (f" (exit code {rc})" if rc else ""))
+    if args.repeat < 2 or not os.path.isfile(lit_json):
+        return
+    shutil.copyfile(lit_json, f"{stem}.run1.json")
+    runs = [f"{stem}.run1.json"]
+    tests = [build]
+    if args.repeat_min_time:
+        tests = [os.path.join(build, p) for p in results_store.slow_programs(lit_json, args.repeat_min_time)]
+        log(config["name"], f"repeating {len(tests)} tests with exec_time >= {args.repeat_min_time}s")
+    for n in range(2, args.repeat + 1):
+        if not tests:
+            break
+        run_json = f"{stem}.run{n}.json"
+        run_stage(config["name"], f"llvm-lit run {n}", lit_command(args, run_json, tests, jobs, verbose=False),
+                  os.path.join(work, f"lit-output.run{n}.log"), env=env)
+        if os.path.isfile(run_json):
+            runs.append(run_json)
+    subprocess.run([sys.executable, os.path.join(SCRIPT_DIR, "results_store.py"), "average", "--median",
+                    "-o", lit_json, *runs], check=True)
+
+
+def run_baseline(config, args, budget, jobs):
+    """
+    gen_baseline.sh builds and runs LIT in one go, so with --exclusive-lit the
+    baseline holds the whole budget for both: its build no longer overlaps the other
+    configurations, but its LIT runs are not measured under their load either.
+    """
+    logs = os.path.join(work_dir(config, args), "logs")
+    cmd = [
+        os.path.join(SCRIPT_DIR, "gen_baseline.sh"),
+        "-t", str(args.timeout),
+        "--llvm-test-suite", args.llvm_test_suite,
+        "--build-dir", build_dir(config, args),
+        "--lit-results", args.lit_results,
+        "--repeat", str(args.baseline_repeat or args.repeat),
+        "--repeat-min-time", str(args.repeat_min_time),
+    ]
+    if args.clean:
+        cmd.append("--clean")
+    with budget.cores(args.cores if args.exclusive_lit else jobs) as got:
+        rc, _ = run_stage(config["name"], "gen_baseline.sh", cmd + ["-w", str(got)],
+                          os.path.join(logs, "gen_baseline.log"))
+    return rc == 0
+
+
+def run_config(config, args, budget, baseline_done):
+    """
+    configure -> build -> LIT -> (once the baseline is there) list-errors.sh.
+    Returns {stage: seconds} and whether results were produced.
+    """
+    name = config["name"]
+    build, work = build_dir(config, args), work_dir(config, args)
+    logs = os.path.join(work, "logs")
+    os.makedirs(logs, exist_ok=True)
+    with open(os.path.join(work, "experiment-start-time.log"), "w") as f:
+        f.write(f"{int(time.time())}\n")
+    jobs = args.stage_cores
+    if name == "baseline":
+        try:
+            return {"config": name, "ok": run_baseline(config, args, budget, jobs)}
+        finally:
+            baseline_done.set()
+
+    env = config_env(config, args)
+    if args.clean and os.path.isdir(build):
+        shutil.rmtree(build)
+    os.makedirs(build, exist_ok=True)
+    configure = [
+        "cmake", "-G", "Ninja", *CMAKE_FLAGS,
+        f"-DTEST_SUITE_SELECTED_PASSES={config['passes']}",
+        f"-DTEST_SUITE_PASSES_ARGS={';'.join(pass_args(config, args))}",
+        "-C", os.path.join(args.llvm_test_suite, "cmake", "caches", "Os.cmake"),
+        "-S", args.llvm_test_suite, "-B", build,
+    ]
+    with budget.cores(1):
+        run_stage(name, "cmake configure", configure, os.path.join(logs, "cmake.log"), env=env, check=True)
+    with budget.cores(jobs) as got:
+        rc, _ = run_stage(name, "ninja build", ["cmake", "--build", build, "--", "-k", "0", "-j", str(got)],
+                          os.path.join(logs, "ninja.log"), env=env)
+    if rc:
+        log(name, "build errors detected; proceeding to LIT tests")
+    with budget.cores(args.cores if args.exclusive_lit else jobs) as got:
+        run_lit(config, args, got, env, logs)
+    lit_json = os.path.join(args.lit_results, config["results"])
+    if not os.path.isfile(lit_json):
+        log(name, f"no LIT results in {lit_json}; skipping post-processing")
+        return {"config": name, "ok": False}
+
+    baseline_done.wait()
+    if not os.path.isfile(os.path.join(args.lit_results, "baseline.json")):
+        log(name, "no baseline.json; skipping post-processing")
+        return {"config": name, "ok": True}
+    post = [
+        os.path.join(SCRIPT_DIR, "list-errors.sh"),
+        "--pass", config["passes"],
+        "--build-dir", build,
+        "--work-dir", work,
+        "--results-dir", args.lit_results,
+        "--results", lit_json,
+        "--clear",
+    ]
+    if config["plugin"]:
+        post += ["--plugin-dir", os.path.dirname(plugin_path(args))]
+    with budget.cores(jobs) as got:
+        run_stage(name, "list-errors.sh", post + ["--workers", str(got)], os.path.join(logs, "list-errors.log"), env=env)
+    return {"config": name, "ok": True}
+
+
+def build_daedalus(args):
+    """
+    libdaedalus.so has to exist before the daedalus configuration is configured.
+    """
+    logs = os.path.join(args.work_root, "daedalus", "logs")
+    os.makedirs(logs, exist_ok=True)
+    log_path = os.path.join(logs, "libdaedalus.log")
+    if args.upgrade:
+        if subprocess.run(["git", "-C", args.daedalus, "status", "--porcelain"], capture_output=True, text=True).stdout:
+            raise RuntimeError(f"Uncommitted changes in {args.daedalus}. Please commit or stash them.")
+        for git in (["fetch"], ["checkout", args.branch], ["pull"]):
+            run_stage("daedalus", f"git {git[0]}", ["git", "-C", args.daedalus, *git], log_path, check=True)
+    if args.clean and os.path.isdir(os.path.join(args.daedalus, "build")):
+        shutil.rmtree(os.path.join(args.daedalus, "build"))
+    run_stage("daedalus", "build libdaedalus.so",
+              ["cmake", "-G", "Ninja", f"-DLLVM_DIR={args.llvm_project}", "-S", args.daedalus,
+               "-B", os.path.join(args.daedalus, "build")], log_path, check=True)
+    run_stage("daedalus", "build libdaedalus.so", ["cmake", "--build", os.path.join(args.daedalus, "build")],
+              log_path, check=True)
+
+
+def compare(configs, args):
+    """
+    Four-way compare.py report, the results store and its analysis.
+    """
+    results = [os.path.join(args.lit_results, c["results"]) for c in configs]
+    results = [r for r in results if os.path.isfile(r)]
+    report = args.report
+    root = os.path.splitext(report)[0]
+    phase_timeline.mark("begin", "compare.py")
+    with open(report, "w") as out:
+        subprocess.run(
+            [sys.executable, os.path.join(args.llvm_test_suite, "utils", "compare.py"), "--full", "--nodiff",
+             *[a for m in COMPARE_METRICS for a in ("-m", m)], *results],
+            stdout=out, check=True,
+        )
+    phase_timeline.mark("end", "compare.py")
+    print(f"Comparison report generated: {os.path.abspath(report)}")
+
+    phase_timeline.mark("begin", "analysis")
+    store = os.path.join(args.lit_results, "results.parquet")
+    subprocess.run([sys.executable, os.path.join(SCRIPT_DIR, "results_store.py"), "build", "-o", store, *results],
+                   check=True)
+    with open(f"{root}-summary.txt", "w") as out:
+        subprocess.run([sys.executable, os.path.join(SCRIPT_DIR, "analyze_comparison_results.py"),
+                        "--store", store, f"{root}.tsv"], stdout=out, check=True)
+    phase_timeline.mark("end", "analysis")
+    print(f"Comparison analysis written to: {os.path.abspath(root + '-summary.txt')}")
+
+
+def parse_args(argv=None):
+    cores = os.cpu_count() or 1
+    p = argparse.ArgumentParser(description="Build, test and post-process every configuration concurrently.")
+    p.add_argument("--only", help=f"Comma-separated configurations (default: {','.join(c['name'] for c in CONFIGS)})")
+    p.add_argument("--cores", type=int, default=cores, help=f"Core budget shared by all stages (default: {cores})")
+    p.add_argument("--stage-cores", type=int, help="Cores (-j) of each build/LIT/post stage (default: cores / configurations)")
+    p.add_argument("--exclusive-lit", action="store_true",
+                   help="LIT runs take the whole budget, so exec_time is not measured under another stage's load")
+    p.add_argument("-t", "--timeout", type=int, default=120, help="Timeout to set for LIT (default: 120)")
+    p.add_argument("-c", "--clean", action="store_true", help="Clean the build directories before building")
+    p.add_argument("--llvm-project", default=DEFAULT_LLVM_PROJECT, help=f"Path to LLVM project (default: {DEFAULT_LLVM_PROJECT})")
+    p.add_argument("--llvm-test-suite", default=DEFAULT_LLVM_TEST_SUITE, help=f"Path to LLVM test suite (default: {DEFAULT_LLVM_TEST_SUITE})")
+    p.add_argument("--daedalus", default=DEFAULT_DAEDALUS, help=f"Path to Daedalus project (default: {DEFAULT_DAEDALUS})")
+    p.add_argument("--code-size", default=DEFAULT_CODE_SIZE, help=f"code-size llvm-project with func-merging (default: {DEFAULT_CODE_SIZE})")
+    p.add_argument("--lit-results", default=DEFAULT_LIT_RESULTS, help=f"Directory for LIT results JSON (default: {DEFAULT_LIT_RESULTS})")
+    p.add_argument("--work-root", default=os.path.join(SCRIPT_DIR, "pipeline"),
+                   help="Per-configuration LIT logs and list-errors.sh reports (default: <script dir>/pipeline)")
+    p.add_argument("--report", default="comp-Os-fm-iro-daedalus.txt", help="Four-way compare.py report")
+    p.add_argument("-u", "--upgrade", action="store_true", help="Fetch and pull latest Daedalus commits")
+    p.add_argument("-b", "--branch", default="main", help="Daedalus branch for --upgrade (default: main)")
+    p.add_argument("--skip-daedalus-build", action="store_true", help="Reuse the existing libdaedalus.so")
+    p.add_argument("--max-slice-params", type=int, default=0, help="Set -max-slice-params for Daedalus pass")
+    p.add_argument("--max-slice-size", type=int, default=0, help="Set -max-slice-size for Daedalus pass")
+    p.add_argument("--max-slice-users", type=int, default=0, help="Set -max-slice-users for Daedalus pass")
+    p.add_argument("--repeat", type=int, default=1, help="LIT runs per configuration; results hold the per-test medians")
+    p.add_argument("--repeat-min-time", type=float, default=0, help="Only repeat tests whose exec_time reached this many seconds")
+    p.add_argument("--baseline-repeat", type=int, help="LIT runs of the baseline alone (default: --repeat)")
+    args = p.parse_args(argv)
+    names = [c["name"] for c in CONFIGS]
+    if args.only:
+        unknown = set(args.only.split(",")) - set(names)
+        if unknown:
+            p.error(f"unknown configurations: {', '.join(sorted(unknown))} (known: {', '.join(names)})")
+    args.configs = [c for c in CONFIGS if not args.only or c["name"] in args.only.split(",")]
+    args.stage_cores = args.stage_cores or max(1, args.cores // len(args.configs))
+    for attr in ("llvm_project", "llvm_test_suite", "daedalus", "code_size", "lit_results", "work_root"):
+        setattr(args, attr, os.path.abspath(getattr(args, attr)))
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    for path in (args.llvm_test_suite, args.lit_results):
+        if not os.path.isdir(path):
+            print(f"Error: Directory '{path}' does not exist.", file=sys.stderr)
+            return 1
+    os.makedirs(args.work_root, exist_ok=True)
+    names = [c["name"] for c in args.configs]
+    print(f"Configurations: {', '.join(names)}; {args.cores} cores, {args.stage_cores} per stage")
+
+    if any(c["plugin"] for c in args.configs):
+        if not args.skip_daedalus_build:
+            build_daedalus(args)
+        elif not os.path.isfile(plugin_path(args)):
+            print(f"Error: --skip-daedalus-build given but {plugin_path(args)} is missing.", file=sys.stderr)
+            return 1
+
+    budget = CoreBudget(args.cores)
+    baseline_done = threading.Event()
+    if "baseline" not in names:
+        baseline_done.set()  # compare against whatever baseline.json is already there
+    start = time.monotonic()
+    outcomes = []
+    with ThreadPoolExecutor(max_workers=len(args.configs)) as pool:
+        futures = {pool.submit(run_config, c, args, budget, baseline_done): c["name"] for c in args.configs}
+        for future, name in futures.items():
+            try:
+                outcomes.append(future.result())
+            except Exception as e:  # one configuration failing must not stop the others
+                log(name, f"Error: {e}")
+                outcomes.append({"config": name, "ok": False, "error": str(e)})
+    summary = {"seconds": round(time.monotonic() - start, 1), "cores": args.cores,
+               "stage_cores": args.stage_cores, "configs": outcomes}
+    with open(os.path.join(args.work_root, "pipeline-summary.json"), "w") as f:
+        json.dump(summary, f, indent=1)
+
+    if not os.path.isfile(os.path.join(args.lit_results, "baseline.json")):
+        print("Error: no baseline.json; skipping the comparison report", file=sys.stderr)
+        return 1
+    compare([c for c in CONFIGS if c in args.configs or c["name"] == "baseline"], args)
+    failed = [o["config"] for o in outcomes if not o["ok"]]
+    if failed:
+        print(f"Warning: no results for {', '.join(failed)}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
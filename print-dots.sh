@@ -7,20 +7,23 @@ set -euo pipefail
 # Default values
 OUTPUT_DIR="output"
 LOG_FILE="/dev/null"
+JOBS="$(nproc)"
 LL_FILES=()
 
 usage() {
-  echo "Usage: $0 [-o output_dir] [-l log_file] -f file_or_dir"
+  echo "Usage: $0 [-o output_dir] [-l log_file] [-j jobs] -f file_or_dir"
   echo "  -o output_dir   Output base directory (default: output)"
   echo "  -l log_file     Log file (default: /dev/null)"
+  echo "  -j jobs         Concurrent opt/dot processes (default: nproc)"
   echo "  -f file_or_dir  A single .ll file or a directory containing .ll files (required)"
 }
 
 # Parse options
-while getopts "o:l:f:h" opt; do
+while getopts "o:l:j:f:h" opt; do
   case $opt in
     o) OUTPUT_DIR="$OPTARG";;
     l) LOG_FILE="$OPTARG";;
+    j) JOBS="$OPTARG";;
     f)
       ARG="$OPTARG"
       if [[ -d "$ARG" ]]; then
@@ -49,12 +52,6 @@ fi
 {
   echo -e "Generating .dot files...\n"
   SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
-  for ll_file in "${LL_FILES[@]}"; do
-    [[ -f "$ll_file" ]] || { echo "Missing: $ll_file"; continue; }
-    name=$(basename "$ll_file" .ll)
-    dot_dir="$OUTPUT_DIR/dots/${name}"
-    mkdir -p "$dot_dir"
-    cp "$ll_file" "$dot_dir/"
-    bash "$SCRIPT_DIR/ll2dot.sh" "$dot_dir/"
-  done
-} | tee -a "$LOG_FILE"
+  # Every module at once: PDFs go to $OUTPUT_DIR/dots/<name>/, sources are read in place
+  python3 "$SCRIPT_DIR/render_graphs.py" -j "$JOBS" -o "$OUTPUT_DIR/dots" --per-module-dirs "${LL_FILES[@]}"
+} 2>&1 | tee -a "$LOG_FILE"
@@ -0,0 +1,541 @@
+#!/usr/bin/env python3
+"""
+Per-function compile-time and memory attribution of the Daedalus pass.
+- Reruns `opt -passes=daedalus` over test bitcode with -time-passes (per pass and
+  analysis wall time, written via -info-output-file) and -time-trace (Chrome-trace
+  JSON, one event per pass/analysis run on each function).
+- A psutil sampler records the RSS of every opt process; each trace event gets the
+  peak RSS sampled while it ran, once the trace clock (which starts inside opt) is
+  aligned with the sampler's via the trace's beginningOfTime.
+- Trace events are reduced to self time (nested events subtracted), so a pass and
+  the analyses it runs are not counted twice.
+- -debug-pass-manager lines are timestamped as opt prints them. They place every
+  analysis run (and the function it ran on) on the sampler's clock, which gives
+  module passes like Daedalus per-function time and analyses their peak RSS even
+  when the trace has no events for them (LLVM < 17 traces no analyses).
+- Joins the per-function rows with the *_slices_report.log files the pass writes:
+  'slice mentions' counts the report tokens naming the function.
+- Writes functions.tsv, analyses.tsv and a ranked hottest_functions.txt across all
+  modules; the raw traces and timer reports are kept per module under traces/.
+
+Usage:
+    python3 profile_pass.py --build-dir ~/llvm-test-suite/build -o profile
+    python3 profile_pass.py --files-list output/script_logs/files-list.txt --build-dir <build> -o profile
+    python3 profile_pass.py output/sources/foo.ll -o profile --passes 'function(instcombine)' --plugin ''
+"""
+import argparse
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import pandas as pd
+import psutil
+from tabulate import tabulate
+
+DEFAULT_LIBDAEDALUS = os.environ.get(
+    "LIBDAEDALUS",
+    os.path.join(os.path.expanduser("~"), "src", "github", "Daedalus", "build", "lib", "libdaedalus.so"),
+)
+# The Daedalus analyses called out in analyses.tsv
+DAEDALUS_ANALYSES = ("ProgramSlice", "PHIGateAnalyzer")
+SAMPLE_INTERVAL = 0.01
+TOP = 30
+
+# Pass-manager wrappers; their time is the sum of what runs inside them
+WRAPPER_RE = re.compile(r"^(PassManager<|ModuleToFunctionPassAdaptor|ModuleToPostOrderCGSCCPassAdaptor|"
+                        r"CGSCCToFunctionPassAdaptor|FunctionToLoopPassAdaptor|DevirtSCCRepeatedPass|Total )")
+# '   0.0002 ( 62.6%)   0.0000 ( 36.7%)   0.0002 ( 57.1%)   0.0003 ( 57.4%)  InstCombinePass'
+TIMER_ROW_RE = re.compile(r"^\s*((?:[\d.]+\s+\(\s*[\d.]+%\)\s+)+)(\S.*?)\s*$")
+TIMER_VALUE_RE = re.compile(r"([\d.]+)\s+\(")
+TOKEN_RE = re.compile(r"[A-Za-z_.$][\w.$]*")
+SLICES_REPORT_SUFFIX = "_slices_report.log"
+# 'Running analysis: DominatorTreeAnalysis on foo' (-debug-pass-manager)
+PM_LINE_RE = re.compile(r"^Running (pass|analysis): (.+) on (\S+)$")
+MODULE_TARGET = "[module]"
+
+
+def module_name(path):
+    base = os.path.basename(path)
+    for suffix in (".e.bc", ".bc", ".ll"):
+        if base.endswith(suffix):
+            return base[: -len(suffix)]
+    return base
+
+
+def collect_inputs(paths, files_list=None, build_dir=None):
+    """
+    Bitcode/IR to profile: explicit files and directories, the build-relative files of
+    a list-errors.sh files list, or every .e.bc of the build dir.
+    """
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(
+                os.path.join(path, name) for name in sorted(os.listdir(path)) if name.endswith((".bc", ".ll"))
+            )
+        else:
+            files.append(path)
+    if files_list:
+        with open(files_list, "r") as f:
+            files.extend(os.path.join(build_dir or "", line.strip()) for line in f if line.strip())
+    elif build_dir and not paths:
+        for root, _, names in os.walk(build_dir):
+            files.extend(os.path.join(root, n) for n in sorted(names) if n.endswith(".e.bc"))
+    return files
+
+
+# ------------------------------------------------------------
+# Running opt
+# ------------------------------------------------------------
+class RssSampler(threading.Thread):
+    """
+    Samples the RSS (KiB) of one process every `interval` seconds until it exits.
+    Sample times are seconds since `start`.
+    """
+
+    def __init__(self, pid, start, interval=SAMPLE_INTERVAL):
+        super().__init__(daemon=True)
+        self.pid, self.start_time, self.interval = pid, start, interval
+        self.samples = []
+        self.done = threading.Event()
+
+    def run(self):
+        try:
+            proc = psutil.Process(self.pid)
+            while not self.done.is_set():
+                self.samples.append((time.monotonic() - self.start_time, proc.memory_info().rss // 1024))
+                self.done.wait(self.interval)
+        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+            pass
+
+
+def run_profiled(cmd, cwd, timeout):
+    """
+    Run opt under the RSS sampler; -debug-pass-manager lines are timestamped on the
+    sampler's clock as they arrive (opt's stderr is unbuffered). Returns (returncode,
+    other stderr, duration, peak_rss_kb, samples, [(t, kind, name, target)], wall
+    clock time of sample time 0).
+    """
+    start = time.monotonic()
+    wall_start = time.time()
+    pm_lines, other = [], []
+    with open(os.path.join(cwd, "stderr.log"), "wb") as err:
+        proc = subprocess.Popen(cmd, cwd=cwd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        sampler = RssSampler(proc.pid, start)
+        sampler.start()
+        timer = threading.Timer(timeout, proc.kill) if timeout else None
+        if timer:
+            timer.start()
+        try:
+            for raw in proc.stderr:
+                now = time.monotonic() - start
+                err.write(raw)
+                line = raw.decode(errors="replace").rstrip("\n")
+                m = PM_LINE_RE.match(line)
+                if m:
+                    pm_lines.append((now, m.group(1), m.group(2), m.group(3)))
+                else:
+                    other.append(line)
+            proc.stderr.close()
+            _, status, rusage = os.wait4(proc.pid, 0)
+            proc.returncode = os.waitstatus_to_exitcode(status)
+        finally:
+            if timer:
+                timer.cancel()
+            sampler.done.set()
+            sampler.join()
+    # ru_maxrss is reported in KiB on Linux
+    return (proc.returncode, "\n".join(other), time.monotonic() - start, rusage.ru_maxrss, sampler.samples,
+            pm_lines, wall_start)
+
+
+# ------------------------------------------------------------
+# Parsing
+# ------------------------------------------------------------
+def parse_time_passes(text):
+    """
+    {pass or analysis: wall seconds} from the 'Pass execution timing report' of -time-passes.
+    """
+    times = {}
+    in_report = False
+    for line in text.splitlines():
+        if "Pass execution timing report" in line:
+            in_report = True
+        elif in_report and line.startswith("===") and times:
+            break
+        elif in_report:
+            m = TIMER_ROW_RE.match(line)
+            if m and m.group(2) != "Total":
+                values = TIMER_VALUE_RE.findall(m.group(1))
+                times[m.group(2)] = times.get(m.group(2), 0.0) + float(values[-1])
+    return times
+
+
+def self_times(events):
+    """
+    Complete ('X') events of the main thread with their self time: duration minus the
+    duration of the events directly nested in them. Wrapper events are dropped.
+    """
+    events = sorted(
+        (e for e in events if e.get("ph") == "X" and not e["name"].startswith("Total ")),
+        key=lambda e: (e["tid"], e["ts"], -e["dur"]),
+    )
+    out = []
+    stack = []
+    for e in events:
+        item = {"name": e["name"], "detail": (e.get("args") or {}).get("detail", ""),
+                "ts": e["ts"], "dur": e["dur"], "self": e["dur"], "tid": e["tid"]}
+        while stack and (stack[-1]["tid"] != e["tid"] or e["ts"] >= stack[-1]["ts"] + stack[-1]["dur"]):
+            stack.pop()
+        if stack:
+            stack[-1]["self"] -= e["dur"]
+        stack.append(item)
+        out.append(item)
+    return [e for e in out if not WRAPPER_RE.match(e["name"])]
+
+
+def peak_between(samples, start_s, end_s):
+    """
+    Peak sampled RSS within [start_s, end_s]; events shorter than the sampling
+    interval get the nearest sample before them (or the first one after).
+    """
+    peak = last = None
+    for t, rss in samples:
+        if t > end_s:
+            return peak if peak is not None else (last if last is not None else rss)
+        if t >= start_s:
+            peak = rss if peak is None else max(peak, rss)
+        last = rss
+    return peak if peak is not None else (last or 0)
+
+
+def trace_offset(trace, events, wall_start, duration):
+    """
+    Seconds to add to a trace timestamp (us since opt started its time-trace
+    profiler, after exec and plugin loading) to get sampler time. beginningOfTime
+    gives the profiler start on the wall clock; traces without it are anchored at
+    the end instead, since opt writes the trace right after its last pass.
+    """
+    if trace.get("beginningOfTime"):
+        return trace["beginningOfTime"] / 1e6 - wall_start
+    ends = [e["ts"] + e.get("dur", 0) for e in events if e.get("ph") == "X"]
+    return duration - max(ends) / 1e6 if ends else 0.0
+
+
+def pm_windows(pm_lines, end):
+    """
+    [(start, end, kind, name, target)]: every -debug-pass-manager line lasts until
+    the next one, or until opt exited. A module pass's work on a function is the
+    time after it requested that function's analyses.
+    """
+    return [
+        (t, pm_lines[n + 1][0] if n + 1 < len(pm_lines) else end, kind, name, target)
+        for n, (t, kind, name, target) in enumerate(pm_lines)
+    ]
+
+
+def is_function(target):
+    # '[module]', '(f, g)' SCCs and 'Loop at depth 1 ...' are not functions
+    return not target.startswith(("[", "(")) and " " not in target
+
+
+def window_parts(windows, span):
+    """
+    {function: [(start, end), ...]} of the -debug-pass-manager windows clipped to
+    `span` (sampler seconds); windows on the module itself go to MODULE_TARGET.
+    """
+    parts = {}
+    for w_start, w_end, _, _, target in windows:
+        lo, hi = max(w_start, span[0]), min(w_end, span[1])
+        if hi > lo:
+            parts.setdefault(target if is_function(target) else MODULE_TARGET, []).append((lo, hi))
+    return parts
+
+
+def is_daedalus(name):
+    return any(a in name for a in DAEDALUS_ANALYSES) or "daedalus" in name.lower()
+
+
+def slice_mentions(report_dir):
+    """
+    {token: count} over every *_slices_report.log the pass wrote in report_dir.
+    """
+    counts = {}
+    for name in os.listdir(report_dir):
+        if not name.endswith(SLICES_REPORT_SUFFIX):
+            continue
+        with open(os.path.join(report_dir, name), "r", errors="replace") as f:
+            for line in f:
+                for token in TOKEN_RE.findall(line):
+                    token = token.lstrip("@")
+                    counts[token] = counts.get(token, 0) + 1
+    return counts
+
+
+# ------------------------------------------------------------
+# Profiling
+# ------------------------------------------------------------
+def profile_module(path, passes, plugin, opt_args, traces_dir, scratch_root, timeout):
+    """
+    Profile one module. Returns (record, function rows, analysis rows).
+    """
+    module = module_name(path)
+    scratch = tempfile.mkdtemp(prefix=f"{module}.", dir=scratch_root)
+    try:
+        trace = os.path.join(scratch, "trace.json")
+        timers = os.path.join(scratch, "time-passes.txt")
+        cmd = ["opt", f"-passes={passes}"]
+        if plugin:
+            cmd.append(f"-load-pass-plugin={plugin}")
+        cmd += list(opt_args) + [
+            "-debug-pass-manager",
+            "-time-passes",
+            f"-info-output-file={timers}",
+            "-time-trace",
+            "-time-trace-granularity=0",
+            f"-time-trace-file={trace}",
+            os.path.abspath(path),
+            "-disable-output",
+        ]
+        rc, stderr, duration, peak_rss, samples, pm_lines, wall_start = run_profiled(cmd, scratch, timeout)
+        record = {"module": module, "source": path, "exit_code": rc,
+                  "duration": round(duration, 3), "peak_rss_kb": peak_rss}
+        if rc != 0:
+            record["error"] = stderr.strip().splitlines()[-1] if stderr.strip() else ""
+
+        events, offset = [], 0.0
+        if os.path.isfile(trace):
+            with open(trace, "r") as f:
+                data = json.load(f)
+            events = data.get("traceEvents", [])
+            offset = trace_offset(data, events, wall_start, duration)
+            shutil.copyfile(trace, os.path.join(traces_dir, f"{module}.trace.json"))
+        analyses = {}
+        if os.path.isfile(timers):
+            with open(timers, "r", errors="replace") as f:
+                analyses = parse_time_passes(f.read())
+            shutil.copyfile(timers, os.path.join(traces_dir, f"{module}.time-passes.txt"))
+        mentions = slice_mentions(scratch)
+
+        windows = pm_windows(pm_lines, duration)
+        functions = {}
+
+        def add(function, event, ms, rss, source):
+            row = functions.setdefault(function, {"module": module, "function": function, "self_ms": 0.0,
+                                                  "events": 0, "peak_rss_kb": 0, "top_event": {}, "sources": set()})
+            row["self_ms"] += ms
+            row["events"] += 1
+            row["top_event"][event] = row["top_event"].get(event, 0.0) + ms
+            row["peak_rss_kb"] = max(row["peak_rss_kb"], rss)
+            row["sources"].add(source)
+
+        # Per pass/analysis: peak RSS and (for trace-only Daedalus scopes) wall time
+        event_rss, event_ms = {}, {}
+        module_events = []
+        for e in self_times(events):
+            span = (e["ts"] / 1e6 + offset, (e["ts"] + e["dur"]) / 1e6 + offset)
+            rss = peak_between(samples, *span)
+            event_rss[e["name"]] = max(event_rss.get(e["name"], 0), rss)
+            event_ms[e["name"]] = event_ms.get(e["name"], 0.0) + e["dur"] / 1000.0
+            detail = e["detail"]
+            # Module-level events name the input file, not a function
+            if not detail or detail == os.path.basename(path) or detail.endswith((".bc", ".ll")):
+                if e["self"] > 0:
+                    module_events.append((e, span))
+                continue
+            add(detail, e["name"], e["self"] / 1000.0, rss, "trace")
+
+        # A module pass's self time (what its nested function-level trace events
+        # don't cover) is split over the functions whose analyses it was running, or
+        # failing that over the functions its slice reports name
+        known = {t for _, _, _, _, t in windows if is_function(t)} | set(functions)
+        for e, span in module_events:
+            parts = window_parts(windows, span)
+            total = sum(hi - lo for spans in parts.values() for lo, hi in spans)
+            if any(t != MODULE_TARGET for t in parts) and total > 0:
+                for target, spans in parts.items():
+                    share = sum(hi - lo for lo, hi in spans) / total
+                    rss = max(peak_between(samples, lo, hi) for lo, hi in spans)
+                    add(target, e["name"], e["self"] / 1000.0 * share, rss, "pass manager log")
+                continue
+            named = {fn: n for fn, n in mentions.items() if fn in known}
+            if is_daedalus(e["name"]) and named:
+                rss = peak_between(samples, *span)
+                for fn, n in named.items():
+                    add(fn, e["name"], e["self"] / 1000.0 * n / sum(named.values()), rss, "slice reports")
+            elif is_daedalus(e["name"]):
+                add(MODULE_TARGET, e["name"], e["self"] / 1000.0, peak_between(samples, *span), "unattributed")
+
+        rows = []
+        for row in functions.values():
+            top = row.pop("top_event")
+            row["hottest_event"] = max(top, key=top.get) if top else ""
+            row["slice_mentions"] = mentions.get(row["function"], 0)
+            row["attribution"] = "+".join(sorted(row.pop("sources")))
+            rows.append(row)
+        record["functions"] = sum(1 for r in rows if r["function"] != MODULE_TARGET)
+        record["slice_reports"] = sum(1 for n in os.listdir(scratch) if n.endswith(SLICES_REPORT_SUFFIX))
+
+        # Analyses the trace has no events for: peak RSS while the pass manager ran them
+        log_rss = {}
+        for w_start, w_end, kind, name, _ in windows:
+            if kind == "analysis":
+                log_rss[name] = max(log_rss.get(name, 0), peak_between(samples, w_start, w_end))
+        # Daedalus analyses the pass opens as a TimeTraceScope are only in the trace
+        for name, ms in event_ms.items():
+            if name not in analyses and is_daedalus(name):
+                analyses[name] = ms / 1000.0
+        analysis_rows = []
+        for name, seconds in analyses.items():
+            rss, source = event_rss.get(name), "trace"
+            if rss is None:
+                rss, source = log_rss.get(name), "pass manager log"
+            if rss is None:
+                source = "missing"
+            analysis_rows.append({"module": module, "name": name, "wall_ms": seconds * 1000.0,
+                                  "peak_rss_kb": rss, "rss_source": source})
+        return record, rows, analysis_rows
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+
+def profile_suite(files, output_dir, passes="daedalus", plugin=None, opt_args=(), jobs=1, timeout=None):
+    """
+    Profile every module; returns (records, functions DataFrame, analyses DataFrame).
+    """
+    # opt runs with its scratch dir as CWD; every path handed to it must be absolute
+    output_dir = os.path.abspath(output_dir)
+    traces_dir = os.path.join(output_dir, "traces")
+    os.makedirs(traces_dir, exist_ok=True)
+    scratch_root = tempfile.mkdtemp(prefix=".profile-scratch.", dir=output_dir)
+    records, functions, analyses = [], [], []
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+            futures = {
+                pool.submit(profile_module, f, passes, plugin, opt_args, traces_dir, scratch_root, timeout): f
+                for f in files
+                if os.path.isfile(f)
+            }
+            for n, future in enumerate(as_completed(futures), 1):
+                record, rows, analysis_rows = future.result()
+                records.append(record)
+                functions.extend(rows)
+                analyses.extend(analysis_rows)
+                status = "ok" if record["exit_code"] == 0 else f"exit {record['exit_code']}"
+                print(f"[{n}/{len(futures)}] {record['module']}: {record['duration']:.2f}s, "
+                      f"{record['peak_rss_kb'] // 1024} MiB, {record['functions']} functions ({status})", flush=True)
+    finally:
+        shutil.rmtree(scratch_root, ignore_errors=True)
+    functions_df = pd.DataFrame(functions, columns=["module", "function", "self_ms", "events", "peak_rss_kb",
+                                                    "hottest_event", "slice_mentions", "attribution"])
+    analyses_df = pd.DataFrame(analyses, columns=["module", "name", "wall_ms", "peak_rss_kb", "rss_source"])
+    return records, functions_df, analyses_df
+
+
+def analysis_table(analyses):
+    """
+    Wall time and peak RSS (the highest sampled while it ran, in any module) per
+    pass/analysis over the suite, the Daedalus analyses first. rss_source says where
+    the RSS came from: the trace, the pass manager log, or 'missing'.
+    """
+    if analyses.empty:
+        return pd.DataFrame(columns=["name", "total_ms", "modules", "max_ms", "peak_rss_kb", "rss_source", "daedalus"])
+    table = analyses.groupby("name").agg(
+        total_ms=("wall_ms", "sum"), modules=("wall_ms", "count"), max_ms=("wall_ms", "max"),
+        peak_rss_kb=("peak_rss_kb", "max"), rss_source=("rss_source", lambda s: "+".join(sorted(set(s)))),
+    ).reset_index()
+    table["daedalus"] = table["name"].apply(is_daedalus)
+    return table.sort_values(["daedalus", "total_ms"], ascending=[False, False]).reset_index(drop=True)
+
+
+def hottest_report(functions, analyses, records, top=TOP):
+    total_ms = functions["self_ms"].sum() if not functions.empty else 0.0
+    unattributed = functions[functions["function"] == MODULE_TARGET] if not functions.empty else functions
+    lines = [
+        f"Profiled {len(records)} modules, {len(functions) - len(unattributed)} functions, "
+        f"{(total_ms - unattributed['self_ms'].sum()) / 1000.0:.2f}s attributed to functions",
+    ]
+    if not unattributed.empty:
+        lines.append(
+            f"{unattributed['self_ms'].sum() / 1000.0:.3f}s of module-pass time in {len(unattributed)} modules "
+            f"stays on {MODULE_TARGET} rows: module-level analyses, or no function source covered it"
+        )
+    lines += [
+        "",
+        f"Hottest functions (self time of every pass/analysis run on the function, top {top}):",
+    ]
+    hot = functions.sort_values("self_ms", ascending=False).head(top).copy()
+    if not hot.empty:
+        hot["share"] = (hot["self_ms"] / total_ms * 100).map(lambda x: f"{x:.2f}%") if total_ms else ""
+        hot["self_ms"] = hot["self_ms"].map(lambda x: f"{x:.2f}")
+        hot["peak_rss_mb"] = (hot["peak_rss_kb"] / 1024).map(lambda x: f"{x:.1f}")
+        cols = ["module", "function", "self_ms", "share", "hottest_event", "peak_rss_mb", "slice_mentions",
+                "attribution"]
+        lines.append(tabulate(hot[cols], headers="keys", tablefmt="psql", showindex=False))
+    table = analysis_table(analyses)
+    if not table.empty:
+        lines += ["", "Passes and analyses (-time-passes wall time over all modules, peak RSS while running):"]
+        shown = table.head(top).copy()
+        for col in ("total_ms", "max_ms"):
+            shown[col] = shown[col].map(lambda x: f"{x:.2f}")
+        shown["peak_rss_kb"] = shown["peak_rss_kb"].map(lambda x: "missing" if pd.isna(x) else f"{x / 1024:.1f}")
+        shown = shown.rename(columns={"peak_rss_kb": "peak_rss_mb"})
+        lines.append(tabulate(shown, headers="keys", tablefmt="psql", showindex=False))
+    heavy = sorted(records, key=lambda r: r["peak_rss_kb"], reverse=True)[:top]
+    if heavy:
+        lines += ["", "Modules by peak RSS:"]
+        lines.append(tabulate(
+            [(r["module"], f"{r['peak_rss_kb'] / 1024:.1f}", f"{r['duration']:.2f}", r["slice_reports"]) for r in heavy],
+            headers=["module", "peak_rss_mb", "seconds", "slice_reports"], tablefmt="psql",
+        ))
+    return "\n".join(lines) + "\n"
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Profile the Daedalus pass per function with -time-passes/-time-trace.")
+    p.add_argument("inputs", nargs="*", help=".bc/.ll files or directories of them")
+    p.add_argument("--build-dir", help="LLVM Test Suite build folder; without inputs, every .e.bc in it is profiled")
+    p.add_argument("--files-list", help="list-errors.sh files list (paths relative to --build-dir)")
+    p.add_argument("-o", "--output-dir", default="profile", help="Where to write the reports (default: profile)")
+    p.add_argument("--plugin", default=DEFAULT_LIBDAEDALUS, help=f"libdaedalus.so, '' for none (default: {DEFAULT_LIBDAEDALUS})")
+    p.add_argument("--passes", default="daedalus", help="opt -passes pipeline (default: daedalus)")
+    p.add_argument("--opt-arg", action="append", default=[], help="Extra opt argument, e.g. -max-slice-size=40")
+    p.add_argument("-j", "--jobs", type=int, default=max(1, (os.cpu_count() or 2) // 2),
+                   help="Concurrent opt processes; fewer give steadier timings (default: half the cores)")
+    p.add_argument("-t", "--timeout", type=float, default=600, help="Per-module timeout in seconds, 0 disables it")
+    p.add_argument("-n", "--top", type=int, default=TOP, help=f"Rows of the ranked report (default: {TOP})")
+    args = p.parse_args(argv)
+
+    files = collect_inputs(args.inputs, args.files_list, args.build_dir)
+    if not files:
+        p.error("nothing to profile: give inputs, --files-list or --build-dir")
+    plugin = os.path.abspath(args.plugin) if args.plugin else None
+    os.makedirs(args.output_dir, exist_ok=True)
+    print(f"Profiling {len(files)} modules with {args.jobs} concurrent opt processes...")
+    records, functions, analyses = profile_suite(
+        files, args.output_dir, args.passes, plugin, args.opt_arg, args.jobs, args.timeout or None
+    )
+
+    functions.sort_values("self_ms", ascending=False).to_csv(
+        os.path.join(args.output_dir, "functions.tsv"), sep="\t", index=False
+    )
+    analysis_table(analyses).to_csv(os.path.join(args.output_dir, "analyses.tsv"), sep="\t", index=False)
+    with open(os.path.join(args.output_dir, "modules.json"), "w") as f:
+        json.dump(sorted(records, key=lambda r: r["module"]), f, indent=1)
+    report = hottest_report(functions, analyses, records, args.top)
+    with open(os.path.join(args.output_dir, "hottest_functions.txt"), "w") as f:
+        f.write(report)
+    print("\n" + report)
+    print(f"--> Profile written to: {args.output_dir}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,28 +1,17 @@
 #!/bin/bash
+#
+# Reduces each faulty program with llvm-reduce, using an interestingness test generated
+# from its error signature (the assertion or verifier message in its bc log).
+# Jobs run concurrently, smallest module first, each in its own working directory.
+# Results are served from the opt_cache.py result cache when neither the module,
+# the test nor libdaedalus.so changed; set DBGTK_NO_CACHE=1 to always rerun.
+#
+# Usage: ./reduce-programs.sh <sources folder | file.ll> [reduce_scheduler.py options]
+#
 
+SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
 SOURCESFOLDER="${1%/}"
+shift || true
+LIBDAEDALUS="${LIBDAEDALUS:-$HOME/src/github/Daedalus/build/lib/libdaedalus.so}"
 
-echo -e "Reducing faulty programs to a minimal faulty program for debugging...\n"
-
-if [ -d "$SOURCESFOLDER" ]; then
-    for llfile in "$SOURCESFOLDER"/*.ll; do
-        echo -e "Reducing $llfile..."
-        if llvm-reduce --verbose -j 10 "--test=script.sh" "$llfile" 2>&1; then
-            NEWNAME="${llfile/.ll/.reduced.ll}"
-            mv reduced.ll "$NEWNAME"
-            echo -e "Successfully reduced $llfile to $NEWNAME\n"
-        else
-            echo -e "Failed to reduce $llfile\n"
-        fi
-    done
-else
-    llfile="$SOURCESFOLDER"
-    echo -e "Reducing $llfile..."
-    if llvm-reduce --verbose -j 10 "--test=script.sh" "$llfile" 2>&1; then
-        NEWNAME="${llfile/.ll/.reduced.ll}"
-        mv reduced.ll "$NEWNAME"
-        echo -e "Successfully reduced $llfile to $NEWNAME\n"
-    else
-        echo -e "Failed to reduce $llfile\n"
-    fi
-fi
+python3 "$SCRIPT_DIR/reduce_scheduler.py" --plugin "$LIBDAEDALUS" "$SOURCESFOLDER" "$@"
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Concurrent llvm-reduce scheduler for faulty modules (reduce-programs.sh).
+- Runs several llvm-reduce jobs at once within a global CPU budget: each job gets
+  --threads reduction threads and at most --cores // --threads jobs run together.
+- Every job runs in its own working directory, so nothing collides in the CWD.
+- Jobs are ordered from the smallest module to the largest, so quick wins land first.
+- The interestingness test is generated per error signature: the exact assertion or
+  verifier message from the module's bc log. The test exits on the first matching
+  line, and reductions cannot drift to a different crash.
+- Results are served from the opt_cache.py result cache when neither the module,
+  the generated test nor libdaedalus.so changed.
+- With a crash_signatures.py index (script_logs/crash_buckets.json, picked up
+  automatically), only the representative module of each crash bucket is reduced.
+
+Modules whose bc log holds no recognizable signature fall back to a test matching
+any assertion, as script.sh does.
+"""
+import argparse
+import hashlib
+import os
+import re
+import shlex
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import crash_signatures
+from opt_cache import DEFAULT_CACHE_DIR, ResultCache
+
+DEFAULT_LIBDAEDALUS = os.environ.get(
+    "LIBDAEDALUS",
+    os.path.join(os.path.expanduser("~"), "src", "github", "Daedalus", "build", "lib", "libdaedalus.so"),
+)
+
+# Failed assertion, without the file:line prefix that moves with every edit
+ASSERTION_RE = re.compile(r"Assertion `.+' failed\.")
+# Verifier messages the pass is known to trigger (see errors-summary-grouped.py)
+VERIFIER_MESSAGES = [
+    "Instruction does not dominate all uses!",
+    "PHINode should have one entry for each predecessor of its parent basic block!",
+    "PHI node has multiple entries for the same basic block with different incoming values!",
+    "Entry block to function must not have predecessors!",
+    "Only PHI nodes may reference their own value!",
+    "Referring to an argument in another function!",
+    "Referring to a basic block in another function!",
+]
+TERMINATOR_RE = re.compile(r"Basic Block in function '.+' does not have terminator!")
+
+TEST_TEMPLATE = """#!/bin/bash
+# Interestingness test generated by reduce_scheduler.py
+# Signature: {signature}
+opt -passes=daedalus -load-pass-plugin={plugin} -disable-output "$1" 2>&1 \\
+    | grep -q -m1 {grep_args}
+"""
+
+
+def reduced_name(ll_file):
+    """
+    Same as reduce-programs.sh: the first '.ll' becomes '.reduced.ll'.
+    """
+    return ll_file.replace(".ll", ".reduced.ll", 1)
+
+
+def bc_log_for(ll_file, bc_logs_dir):
+    """
+    bc log list-errors.sh wrote for output/sources/<name>.ll (bc_logs/<name>.e.bc.log).
+    """
+    if not bc_logs_dir:
+        return None
+    name = os.path.basename(ll_file)
+    name = name[: -len(".ll")] if name.endswith(".ll") else name
+    for candidate in (f"{name}.e.bc.log", f"{name}.log"):
+        path = os.path.join(bc_logs_dir, candidate)
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+def error_signature(log_path):
+    """
+    First assertion or verifier message in a bc log, or None.
+    """
+    if not log_path:
+        return None
+    with open(log_path, "r", errors="replace") as f:
+        for line in f:
+            m = ASSERTION_RE.search(line)
+            if m:
+                return m.group(0)
+            for message in VERIFIER_MESSAGES:
+                if message in line:
+                    return message
+            m = TERMINATOR_RE.search(line)
+            if m:
+                return m.group(0)
+    return None
+
+
+def write_test(tests_dir, signature, plugin):
+    """
+    Interestingness test for one signature; tests are shared by every module with it.
+    """
+    if signature:
+        grep_args = f"-F -- {shlex.quote(signature)}"
+        tag = hashlib.sha256(signature.encode()).hexdigest()[:12]
+    else:
+        grep_args = "-E -- " + shlex.quote(r"Assertion `(.+) failed\.")
+        tag = "any-assertion"
+    path = os.path.join(tests_dir, f"{tag}.sh")
+    text = TEST_TEMPLATE.format(signature=signature or "any assertion", plugin=shlex.quote(plugin), grep_args=grep_args)
+    try:
+        with open(path, "r") as f:
+            if f.read() == text:
+                return path
+    except OSError:
+        pass
+    tmp = f"{path}.tmp{os.getpid()}"
+    with open(tmp, "w") as f:
+        f.write(text)
+    os.chmod(tmp, 0o755)
+    os.replace(tmp, path)
+    return path
+
+
+def expand_inputs(paths):
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(
+                os.path.join(path, name)
+                for name in sorted(os.listdir(path))
+                if name.endswith(".ll") and ".reduced." not in name
+            )
+        else:
+            files.append(path)
+    return files
+
+
+def reduce_one(cache, ll_file, test, plugin, job_dir, threads, timeout):
+    """
+    Run llvm-reduce on one module in a private scratch CWD; leftovers land in job_dir.
+    """
+    ll_file = os.path.abspath(ll_file)
+    out = reduced_name(ll_file)
+    argv = ["llvm-reduce", "--verbose", f"-j={threads}", f"--test={test}", ll_file, "-o", out]
+    # The test only names the plugin; make its contents part of the cache key too
+    inputs = [ll_file] + ([plugin] if os.path.isfile(plugin) else [])
+    return out, cache.run(argv, inputs=inputs, outputs=[out], artifacts_dir=job_dir, timeout=timeout)
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Reduce faulty modules with concurrent llvm-reduce jobs.")
+    p.add_argument("inputs", nargs="+", help=".ll files or folders of .ll files (e.g. output/sources)")
+    p.add_argument(
+        "--bc-logs",
+        help="bc logs to read error signatures from (default: bc_logs next to the sources folder)",
+    )
+    p.add_argument(
+        "--buckets",
+        help="crash_signatures.py index; reduce one module per bucket "
+        "(default: script_logs/crash_buckets.json next to the sources folder, if present)",
+    )
+    p.add_argument("--all", action="store_true", help="Reduce every module, ignoring crash buckets")
+    p.add_argument("--plugin", default=DEFAULT_LIBDAEDALUS, help=f"libdaedalus.so (default: {DEFAULT_LIBDAEDALUS})")
+    p.add_argument("--work-dir", default="reduce-jobs", help="Per-job working directories and generated tests")
+    p.add_argument("--cores", type=int, default=os.cpu_count() or 1, help="Global CPU budget (default: all cores)")
+    p.add_argument("--threads", type=int, default=4, help="llvm-reduce -j per job (default: 4)")
+    p.add_argument("--timeout", type=float, default=0, help="Per-job timeout in seconds, 0 disables it")
+    p.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="Result cache location")
+    p.add_argument("--no-cache", action="store_true", help="Always rerun llvm-reduce")
+    args = p.parse_args(argv)
+
+    first = os.path.abspath(args.inputs[0])
+    out_dir = os.path.dirname(first if os.path.isdir(first) else os.path.dirname(first))
+    bc_logs = args.bc_logs or os.path.join(out_dir, "bc_logs")
+    buckets = args.buckets or os.path.join(out_dir, "script_logs", "crash_buckets.json")
+
+    ll_files = [f for f in expand_inputs(args.inputs) if os.path.isfile(f)]
+    if not args.all and os.path.isfile(buckets):
+        exemplars = crash_signatures.representatives(buckets)
+        total = len(ll_files)
+        ll_files = [f for f in ll_files if os.path.basename(f)[: -len(".ll")] in exemplars]
+        print(f"Crash buckets ({buckets}): reducing {len(ll_files)} representatives of {total} modules")
+    if not ll_files:
+        print("No .ll files to reduce.")
+        return 0
+    # Smallest first: small modules reduce fastest
+    ll_files.sort(key=os.path.getsize)
+    tests_dir = os.path.join(args.work_dir, "tests")
+    os.makedirs(tests_dir, exist_ok=True)
+
+    threads = max(1, min(args.threads, args.cores))
+    jobs = max(1, args.cores // threads)
+    cache = ResultCache(args.cache_dir, enabled=not args.no_cache)
+    print("Reducing faulty programs to a minimal faulty program for debugging...")
+    print(f"{len(ll_files)} modules, {jobs} concurrent jobs x {threads} threads\n")
+
+    failed = 0
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        futures = {}
+        for ll_file in ll_files:
+            signature = error_signature(bc_log_for(ll_file, bc_logs))
+            test = os.path.abspath(write_test(tests_dir, signature, args.plugin))
+            job_dir = os.path.join(args.work_dir, os.path.basename(ll_file)[: -len(".ll")])
+            future = pool.submit(
+                reduce_one, cache, ll_file, test, args.plugin, job_dir, threads, args.timeout or None
+            )
+            futures[future] = (ll_file, signature)
+        for future in as_completed(futures):
+            ll_file, signature = futures[future]
+            out, result = future.result()
+            print(f"Reducing {ll_file}... (signature: {signature or 'any assertion'})")
+            if result.returncode == 0:
+                print(f"Successfully reduced {ll_file} to {out}\n", flush=True)
+            else:
+                failed += 1
+                sys.stdout.write(result.stderr.decode(errors="replace")[-2000:])
+                print(f"Failed to reduce {ll_file}\n", flush=True)
+
+    print(f"Reduced {len(ll_files) - failed} of {len(ll_files)} modules")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Render CFG / dominator / post-dominator / region graphs of LLVM IR modules to PDF.
+- One fused `opt -passes=dot-cfg,dot-dom,dot-post-dom` run per module. The region
+  printer is legacy-PM only and dot-cfg-only writes the same file names as dot-cfg,
+  so those two get their own runs, concurrently with the first.
+- Every opt run writes its .dot files into a private temp directory, never the CWD.
+- `dot -Tpdf` conversions fan out across a worker pool.
+- Functions whose .dot content hash matches the last render are skipped.
+- Keeps ll2dot.sh's naming: <kind>.<module>.<function truncated to 64 chars>.pdf
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+FUNC_NAME_MAX = 64
+MANIFEST = ".render-manifest.json"
+_NODE_ID_RE = re.compile(rb"Node0x[0-9a-fA-F]+")
+
+# (opt arguments, [(dot file prefix, PDF kind), ...]); prefixes are matched in order
+GRAPH_RUNS = [
+    (
+        ["-passes=dot-cfg,dot-dom,dot-post-dom"],
+        [("postdom.", "dot-post-dom"), ("dom.", "dot-dom"), (".", "dot-cfg")],
+    ),
+    (["-dot-regions"], [("reg.", "dot-regions")]),
+    (["-passes=dot-cfg-only"], [(".", "cfg-only")]),
+]
+
+
+def module_base(ll_file):
+    """
+    Same as ll2dot.sh: basename without .ll, then the first remaining '.ll' removed.
+    """
+    base = os.path.basename(ll_file)
+    if base.endswith(".ll"):
+        base = base[: -len(".ll")]
+    return base.replace(".ll", "", 1)
+
+
+def module_dir_name(ll_file):
+    """
+    Same as print-dots.sh: basename without .ll.
+    """
+    base = os.path.basename(ll_file)
+    return base[: -len(".ll")] if base.endswith(".ll") else base
+
+
+def pdf_name(kind, ll_file, dot_name, prefix):
+    func = dot_name[: -len(".dot")]
+    if func.startswith(prefix):
+        func = func[len(prefix):]
+    return f"{kind}.{module_base(ll_file)}.{func[:FUNC_NAME_MAX]}.pdf"
+
+
+def expand_inputs(paths):
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(
+                os.path.join(path, name) for name in sorted(os.listdir(path)) if name.endswith(".ll")
+            )
+        else:
+            files.append(path)
+    return files
+
+
+def _digest(path):
+    """
+    Hash of a .dot file with opt's pointer-derived node names (Node0x55d0...) replaced by
+    their order of appearance, so an unchanged graph hashes the same on every run.
+    """
+    with open(path, "rb") as f:
+        text = f.read()
+    ids = {}
+    text = _NODE_ID_RE.sub(lambda m: b"Node%d" % ids.setdefault(m.group(0), len(ids)), text)
+    return hashlib.sha256(text).hexdigest()
+
+
+class Manifest:
+    """
+    Per-output-directory record of {pdf name: .dot content hash} from previous renders.
+    """
+
+    def __init__(self, directory):
+        self.path = os.path.join(directory, MANIFEST)
+        self.lock = threading.Lock()
+        try:
+            with open(self.path, "r") as f:
+                self.hashes = json.load(f)
+        except (OSError, ValueError):
+            self.hashes = {}
+
+    def unchanged(self, pdf_path, digest):
+        with self.lock:
+            return self.hashes.get(os.path.basename(pdf_path)) == digest and os.path.exists(pdf_path)
+
+    def record(self, pdf_path, digest):
+        with self.lock:
+            self.hashes[os.path.basename(pdf_path)] = digest
+
+    def save(self):
+        with self.lock:
+            tmp = f"{self.path}.tmp"
+            with open(tmp, "w") as f:
+                json.dump(self.hashes, f, indent=1, sort_keys=True)
+            os.replace(tmp, self.path)
+
+
+def _opt(ll_file, opt_args, workdir):
+    return subprocess.run(
+        ["opt"] + opt_args + [os.path.abspath(ll_file), "-disable-output"],
+        cwd=workdir,
+        capture_output=True,
+        text=True,
+    )
+
+
+def run_opt(ll_file, opt_args, workdir):
+    """
+    Run one graph-printing opt invocation with `workdir` as CWD. Returns the .dot files written.
+    If a fused -passes= pipeline is rejected (e.g. an opt without one of the printers),
+    its passes are retried one at a time so the supported graphs still get printed.
+    """
+    proc = _opt(ll_file, opt_args, workdir)
+    if proc.returncode != 0 and len(opt_args) == 1 and opt_args[0].startswith("-passes=") and "," in opt_args[0]:
+        for graph_pass in opt_args[0][len("-passes="):].split(","):
+            single = _opt(ll_file, [f"-passes={graph_pass}"], workdir)
+            if single.returncode != 0:
+                print(f"  Warning: opt -passes={graph_pass} failed on {ll_file}: {single.stderr.strip()}", file=sys.stderr)
+    elif proc.returncode != 0:
+        print(f"  Warning: opt {' '.join(opt_args)} failed on {ll_file}: {proc.stderr.strip()}", file=sys.stderr)
+    # Keep whatever was written before a failure
+    return sorted(name for name in os.listdir(workdir) if name.endswith(".dot"))
+
+
+def render_dot(dotfile, pdf_path, manifest, force):
+    digest = _digest(dotfile)
+    if not force and manifest.unchanged(pdf_path, digest):
+        return "skipped"
+    tmp = f"{pdf_path}.tmp"
+    proc = subprocess.run(["dot", "-Tpdf", dotfile, "-o", tmp], capture_output=True, text=True)
+    if proc.returncode != 0:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        print(f"  Warning: Failed to convert {dotfile} to {os.path.basename(pdf_path)}. Skipping.", file=sys.stderr)
+        return "failed"
+    os.replace(tmp, pdf_path)
+    manifest.record(pdf_path, digest)
+    return "rendered"
+
+
+def render_modules(ll_files, output_dir=None, per_module_dirs=False, jobs=None, force=False):
+    """
+    Render every module's graphs. PDFs go to `output_dir` (default: next to each module),
+    in a <module> subdirectory when per_module_dirs is set.
+    Returns {'rendered': n, 'skipped': n, 'failed': n}.
+    """
+    jobs = jobs or os.cpu_count() or 1
+    counts = {"rendered": 0, "skipped": 0, "failed": 0}
+    manifests = {}
+    scratch_root = tempfile.mkdtemp(prefix="render-graphs.")
+    try:
+        with ThreadPoolExecutor(max_workers=jobs) as opt_pool, ThreadPoolExecutor(max_workers=jobs) as dot_pool:
+            # Every opt run of every module, each in its own temp dir
+            opt_jobs = []
+            for n, ll_file in enumerate(ll_files):
+                if not os.path.isfile(ll_file):
+                    print(f"Missing: {ll_file}")
+                    continue
+                target = output_dir or os.path.dirname(ll_file) or "."
+                if per_module_dirs:
+                    target = os.path.join(target, module_dir_name(ll_file))
+                os.makedirs(target, exist_ok=True)
+                if target not in manifests:
+                    manifests[target] = Manifest(target)
+                for r, (opt_args, kinds) in enumerate(GRAPH_RUNS):
+                    workdir = os.path.join(scratch_root, f"{n}.{r}")
+                    os.mkdir(workdir)
+                    future = opt_pool.submit(run_opt, ll_file, opt_args, workdir)
+                    opt_jobs.append((ll_file, target, workdir, kinds, future))
+
+            dot_jobs = []
+            for ll_file, target, workdir, kinds, future in opt_jobs:
+                for dot_name in future.result():
+                    for prefix, kind in kinds:
+                        if dot_name.startswith(prefix):
+                            break
+                    else:
+                        continue
+                    pdf_path = os.path.join(target, pdf_name(kind, ll_file, dot_name, prefix))
+                    dot_jobs.append(
+                        dot_pool.submit(
+                            render_dot, os.path.join(workdir, dot_name), pdf_path, manifests[target], force
+                        )
+                    )
+            for future in dot_jobs:
+                counts[future.result()] += 1
+    finally:
+        shutil.rmtree(scratch_root, ignore_errors=True)
+        for manifest in manifests.values():
+            manifest.save()
+    return counts
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Render CFG/dominator/region graphs of .ll modules to PDF.")
+    p.add_argument("inputs", nargs="+", help=".ll files or directories of .ll files")
+    p.add_argument("-o", "--output-dir", help="Where to write PDFs (default: next to each module)")
+    p.add_argument(
+        "--per-module-dirs",
+        action="store_true",
+        help="Write each module's PDFs into <output-dir>/<module>/",
+    )
+    p.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1, help="Concurrent opt/dot processes")
+    p.add_argument("--force", action="store_true", help="Re-render even if the .dot content is unchanged")
+    args = p.parse_args(argv)
+
+    ll_files = expand_inputs(args.inputs)
+    print(f"Rendering graphs of {len(ll_files)} modules...")
+    counts = render_modules(ll_files, args.output_dir, args.per_module_dirs, args.jobs, args.force)
+    print(
+        f"All done. Rendered: {counts['rendered']}, unchanged: {counts['skipped']}, failed: {counts['failed']}"
+    )
+    return 1 if counts["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,419 @@
+#!/usr/bin/env python3
+"""
+Regression corpus of reduced reproducers, and a runner that gates a libdaedalus.so
+on it in seconds instead of a full gen_daedalus.sh suite run.
+- collect: copies every X.reduced.ll written by reduce-programs.sh into the corpus
+  as a lit test, headed by its crash bucket and message (crash_signatures.py).
+  Reproducers that still crash are XFAIL.
+- run: runs opt with the pass over every reproducer in parallel and reports, per
+  test, whether it still crashes the same way, crashes differently, got fixed,
+  regressed (crashes again after it was fixed) or no longer matches its expected
+  output. Exits 1 on changed crashes, regressions and mismatches.
+- bless: records the output of fixed reproducers as FileCheck patterns (the
+  txt2filecheckpattern.sh rules) and drops their XFAIL, so the crash cannot come
+  back unnoticed.
+
+The corpus is also a lit suite: llvm-lit <corpus> -Dplugin=<libdaedalus.so> [-Dpass=daedalus]
+
+Usage:
+    python3 repro_corpus.py collect output/sources [--corpus repro-corpus]
+    python3 repro_corpus.py run [--corpus repro-corpus] --plugin build/lib/libdaedalus.so [-j 8]
+    python3 repro_corpus.py bless [--corpus repro-corpus] --plugin build/lib/libdaedalus.so [tests ...]
+"""
+import argparse
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import crash_signatures
+
+DEFAULT_LIBDAEDALUS = os.environ.get(
+    "LIBDAEDALUS",
+    os.path.join(os.path.expanduser("~"), "src", "github", "Daedalus", "build", "lib", "libdaedalus.so"),
+)
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CORPUS = os.path.join(SCRIPT_DIR, "repro-corpus")
+DEFAULT_TIMEOUT = 60
+
+# Test header: '; KEY: value' lines above the IR
+HEADER_RE = re.compile(r"^; (SOURCE|BUCKET|SIGNATURE|XFAIL|RUN): ?(.*)$")
+CHECK_RE = re.compile(r"^; CHECK(?:-NEXT|-EMPTY)?:")
+RUN_CRASH = "%opt -disable-output %s"
+RUN_CHECK = "%opt -S %s | FileCheck %s"
+PATH_LINES = ("; ModuleID = ", "source_filename = ")
+# Numbered clones of a function (name__N) get a new N whenever the pass changes
+CLONE_ID_RE = re.compile(r"__[0-9]+\(")
+
+LIT_CONFIG = '''# lit configuration of the reproducer corpus, written by repro_corpus.py
+import os
+
+import lit.formats
+
+config.name = "daedalus-repro"
+config.suffixes = [".ll"]
+config.excludes = ["lit.cfg.py"]
+config.test_format = lit.formats.ShTest()
+config.test_source_root = os.path.dirname(__file__)
+
+plugin = lit_config.params.get("plugin", "")
+pass_name = lit_config.params.get("pass", "daedalus")
+load = f"-load-pass-plugin={plugin} " if plugin else ""
+# Ahead of lit's own %-substitutions
+config.substitutions.insert(0, ("%opt", f"opt {load}-passes={pass_name}"))
+'''
+
+# run statuses; the failing ones make `run` exit 1
+PASS, STILL_CRASHING, FIXED = "pass", "still crashing", "fixed"
+CHANGED, REGRESSED, MISMATCH = "changed crash", "regressed", "mismatch"
+FAILING = (CHANGED, REGRESSED, MISMATCH)
+
+
+# ------------------------------------------------------------
+# FileCheck patterns
+# ------------------------------------------------------------
+def filecheck_patterns(lines):
+    """
+    txt2filecheckpattern.sh in Python: the first line becomes a CHECK, empty lines
+    CHECK-EMPTY, every other line a CHECK-NEXT, and name__N( matches any N.
+    """
+    patterns = []
+    for n, line in enumerate(lines):
+        if n == 0:
+            line = f"; CHECK: {line}"
+        elif line:
+            line = f"; CHECK-NEXT: {line}"
+        else:
+            line = "; CHECK-EMPTY:"
+        patterns.append(CLONE_ID_RE.sub("__[[ID:[0-9]+]](", line))
+    return patterns
+
+
+def output_patterns(ir_text):
+    """
+    Patterns of `opt -S` output, minus the ModuleID and source_filename lines (opt
+    fills them in with the input path, which differs between the runner and lit).
+    """
+    lines = [line for line in ir_text.splitlines() if not line.startswith(PATH_LINES)]
+    while lines and not lines[-1]:
+        lines.pop()
+    while lines and not lines[0]:
+        lines.pop(0)
+    return filecheck_patterns(lines)
+
+
+# ------------------------------------------------------------
+# Tests
+# ------------------------------------------------------------
+def read_test(path):
+    """
+    {path, source, bucket, signature, xfail, checks, ir} of one corpus test.
+    """
+    test = {"path": path, "source": "", "bucket": "", "signature": "", "xfail": False, "checks": []}
+    body = []
+    with open(path, "r") as f:
+        lines = f.read().splitlines()
+    header = True
+    for line in lines:
+        m = HEADER_RE.match(line) if header else None
+        if m:
+            key, value = m.group(1).lower(), m.group(2)
+            if key == "xfail":
+                test["xfail"] = True
+            elif key != "run":
+                test[key] = value
+            continue
+        header = False
+        if CHECK_RE.match(line):
+            test["checks"].append(line)
+        else:
+            body.append(line)
+    while body and not body[-1]:
+        body.pop()
+    while body and not body[0]:
+        body.pop(0)
+    test["ir"] = "\n".join(body) + "\n"
+    return test
+
+
+def write_test(test):
+    """
+    Header, IR, then the CHECK lines (if any); atomically.
+    """
+    lines = [f"; SOURCE: {test['source']}", f"; BUCKET: {test['bucket']}", f"; SIGNATURE: {test['signature']}"]
+    if test["xfail"]:
+        lines.append("; XFAIL: *")
+    lines.append(f"; RUN: {RUN_CHECK if test['checks'] else RUN_CRASH}")
+    text = "\n".join(lines) + "\n\n" + test["ir"]
+    if test["checks"]:
+        text += "\n" + "\n".join(test["checks"]) + "\n"
+    tmp = f"{test['path']}.tmp{os.getpid()}"
+    with open(tmp, "w") as f:
+        f.write(text)
+    os.replace(tmp, test["path"])
+
+
+def corpus_tests(corpus, names=None):
+    paths = sorted(
+        os.path.join(corpus, name) for name in os.listdir(corpus) if name.endswith(".ll")
+    )
+    if names:
+        wanted = {os.path.basename(n) if n.endswith(".ll") else f"{os.path.basename(n)}.ll" for n in names}
+        paths = [p for p in paths if os.path.basename(p) in wanted]
+    return paths
+
+
+# ------------------------------------------------------------
+# collect
+# ------------------------------------------------------------
+def bucket_of(index, module):
+    """
+    (bucket ID, message) of the crash bucket that lists `module`, or None.
+    """
+    for bid, bucket in index.items():
+        if module in bucket["members"]:
+            return bid, bucket["message"]
+    return None
+
+
+def collect(inputs, corpus, bc_logs, buckets):
+    """
+    Add every X.reduced.ll under `inputs` to the corpus as X.ll. Existing tests keep
+    their status unless the reproducer changed. Returns (added, updated, unchanged).
+    """
+    os.makedirs(corpus, exist_ok=True)
+    lit_cfg = os.path.join(corpus, "lit.cfg.py")
+    if not os.path.exists(lit_cfg):
+        with open(lit_cfg, "w") as f:
+            f.write(LIT_CONFIG)
+    index = crash_signatures.load_index(buckets) if buckets and os.path.isfile(buckets) else {}
+
+    reduced = []
+    for path in inputs:
+        if os.path.isdir(path):
+            reduced.extend(os.path.join(path, n) for n in sorted(os.listdir(path)) if n.endswith(".reduced.ll"))
+        elif path.endswith(".reduced.ll"):
+            reduced.append(path)
+    added = updated = unchanged = 0
+    for path in reduced:
+        module = os.path.basename(path)[: -len(".reduced.ll")]
+        with open(path, "r") as f:
+            ir = f.read().strip("\n") + "\n"
+        target = os.path.join(corpus, f"{module}.ll")
+        if os.path.exists(target):
+            if read_test(target)["ir"] == ir:
+                unchanged += 1
+                continue
+            updated += 1
+        else:
+            added += 1
+        bucket = bucket_of(index, module)
+        if bucket is None:
+            log = os.path.join(bc_logs, f"{module}.e.bc.log") if bc_logs else None
+            crash = crash_signatures.parse_log(log) if log and os.path.isfile(log) else None
+            bucket = ("", crash[0] if crash else "")
+        write_test({
+            "path": target, "source": os.path.basename(path), "bucket": bucket[0], "signature": bucket[1],
+            "xfail": True, "checks": [], "ir": ir,
+        })
+    return added, updated, unchanged
+
+
+# ------------------------------------------------------------
+# run
+# ------------------------------------------------------------
+def opt_command(args, path, emit):
+    load = [f"-load-pass-plugin={args.plugin}"] if args.plugin else []
+    output = ["-S", "-o", "-"] if emit else ["-disable-output"]
+    return [args.opt, *load, f"-passes={args.pass_name}", *output, os.path.abspath(path)]
+
+
+def crash_of(stderr):
+    """
+    crash_signatures.py message of opt's stderr; the same normalization as the buckets.
+    """
+    marker = stderr.find(crash_signatures.CRASH_MARKER)
+    text = stderr[:marker] if marker >= 0 else stderr
+    return crash_signatures.crash_message(text.splitlines()[-crash_signatures.MESSAGE_LOOKBACK:])
+
+
+def run_opt(args, path, emit):
+    """
+    (crashed, message, stdout, seconds) of opt over one reproducer, in a scratch CWD
+    (the pass writes its reports there).
+    """
+    start = time.monotonic()
+    with tempfile.TemporaryDirectory(prefix="repro-") as scratch:
+        try:
+            proc = subprocess.run(
+                opt_command(args, path, emit), cwd=scratch, capture_output=True, text=True,
+                errors="replace", timeout=args.timeout or None,
+            )
+        except subprocess.TimeoutExpired:
+            return True, f"timeout after {args.timeout}s", "", time.monotonic() - start
+    seconds = time.monotonic() - start
+    if proc.returncode != 0:
+        return True, crash_of(proc.stderr) or f"exit code {proc.returncode}", "", seconds
+    return False, "", proc.stdout, seconds
+
+
+def filecheck(args, path, output):
+    """
+    None if `output` matches the CHECK lines of `path`, else FileCheck's complaint.
+    """
+    proc = subprocess.run([args.filecheck, path], input=output, capture_output=True, text=True)
+    if proc.returncode == 0:
+        return None
+    return (proc.stderr.strip().splitlines() or [f"FileCheck exit code {proc.returncode}"])[0]
+
+
+def run_test(args, path):
+    test = read_test(path)
+    crashed, message, output, seconds = run_opt(args, path, emit=bool(test["checks"]))
+    record = {"test": os.path.basename(path), "bucket": test["bucket"], "expected": test["signature"],
+              "message": message, "seconds": round(seconds, 3), "detail": ""}
+    if test["xfail"]:
+        if not crashed:
+            record["status"] = FIXED
+        elif test["signature"] and message != test["signature"]:
+            record["status"] = CHANGED
+        else:
+            record["status"] = STILL_CRASHING
+    elif crashed:
+        record["status"] = REGRESSED
+    else:
+        mismatch = filecheck(args, path, output) if test["checks"] else None
+        record["status"] = MISMATCH if mismatch else PASS
+        record["detail"] = mismatch or ""
+    return record
+
+
+def run_corpus(args, paths):
+    with ThreadPoolExecutor(max_workers=args.jobs) as pool:
+        return list(pool.map(lambda p: run_test(args, p), paths))
+
+
+def print_results(records, seconds):
+    counts = {}
+    for r in records:
+        counts[r["status"]] = counts.get(r["status"], 0) + 1
+    for r in records:
+        if r["status"] in FAILING or r["status"] == FIXED:
+            print(f"{r['status'].upper():>15}: {r['test']}")
+            if r["status"] == CHANGED:
+                print(f"{'':>17}expected: {r['expected']}\n{'':>17}got:      {r['message']}")
+            elif r["status"] == REGRESSED:
+                print(f"{'':>17}{r['message']}")
+            elif r["detail"]:
+                print(f"{'':>17}{r['detail']}")
+    order = (PASS, STILL_CRASHING, FIXED, CHANGED, REGRESSED, MISMATCH)
+    summary = ", ".join(f"{counts[s]} {s}" for s in order if counts.get(s))
+    print(f"\n{len(records)} reproducers in {seconds:.1f}s: {summary or 'none'}")
+    if counts.get(FIXED):
+        print("Fixed reproducers keep failing lit as XPASS until blessed: repro_corpus.py bless")
+
+
+# ------------------------------------------------------------
+# bless
+# ------------------------------------------------------------
+def bless(args, paths):
+    """
+    Record the output of every non-crashing reproducer as its expected output.
+    Returns (blessed, still crashing).
+    """
+    blessed, crashing = [], []
+
+    def one(path):
+        crashed, message, output, _ = run_opt(args, path, emit=True)
+        if crashed:
+            return path, message
+        test = read_test(path)
+        test["xfail"] = False
+        test["checks"] = output_patterns(output)
+        write_test(test)
+        return path, None
+
+    with ThreadPoolExecutor(max_workers=args.jobs) as pool:
+        for path, message in pool.map(one, paths):
+            (crashing if message else blessed).append((os.path.basename(path), message))
+    return blessed, crashing
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Reduced-reproducer regression corpus and its parallel runner.")
+    sub = p.add_subparsers(dest="command", required=True)
+
+    c = sub.add_parser("collect", help="Add reduced reproducers (X.reduced.ll) to the corpus")
+    c.add_argument("inputs", nargs="+", help="Folders holding *.reduced.ll (e.g. output/sources) or files")
+    c.add_argument("--bc-logs", help="bc logs to read crash messages from (default: bc_logs next to the sources folder)")
+    c.add_argument(
+        "--buckets",
+        help="crash_signatures.py index (default: script_logs/crash_buckets.json next to the sources folder)",
+    )
+
+    for name, help_text in (("run", "Run the corpus against a pass plugin"),
+                            ("bless", "Record the output of fixed reproducers as their expected output")):
+        r = sub.add_parser(name, help=help_text)
+        r.add_argument("tests", nargs="*", help="Test names to run (default: the whole corpus)")
+        r.add_argument("--plugin", default=DEFAULT_LIBDAEDALUS, help=f"Pass plugin, empty for none (default: {DEFAULT_LIBDAEDALUS})")
+        r.add_argument("--pass", dest="pass_name", default="daedalus", help="opt -passes pipeline (default: daedalus)")
+        r.add_argument("--opt", default="opt", help="opt binary (default: opt)")
+        r.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1, help="Concurrent opt processes (default: all cores)")
+        r.add_argument("-t", "--timeout", type=float, default=DEFAULT_TIMEOUT,
+                       help=f"Per-reproducer timeout in seconds, 0 disables it (default: {DEFAULT_TIMEOUT})")
+        if name == "run":
+            r.add_argument("--filecheck", default=shutil.which("FileCheck") or "FileCheck", help="FileCheck binary")
+            r.add_argument("--json", help="Also write the per-test results here")
+
+    for sp in sub.choices.values():
+        sp.add_argument("--corpus", default=DEFAULT_CORPUS, help=f"Corpus directory (default: {DEFAULT_CORPUS})")
+    args = p.parse_args(argv)
+
+    if args.command == "collect":
+        first = os.path.abspath(args.inputs[0])
+        out_dir = os.path.dirname(first if os.path.isdir(first) else os.path.dirname(first))
+        bc_logs = args.bc_logs or os.path.join(out_dir, "bc_logs")
+        buckets = args.buckets or os.path.join(out_dir, "script_logs", "crash_buckets.json")
+        added, updated, unchanged = collect(args.inputs, args.corpus, bc_logs, buckets)
+        print(f"Corpus {args.corpus}: {added} added, {updated} updated, {unchanged} unchanged")
+        return 0
+
+    if not os.path.isdir(args.corpus):
+        p.error(f"no corpus at {args.corpus}; create it with 'collect'")
+    if args.plugin and not os.path.isfile(args.plugin):
+        p.error(f"plugin not found: {args.plugin}")
+    if args.command == "run" and not shutil.which(args.filecheck):
+        p.error(f"FileCheck not found: {args.filecheck} (use --filecheck)")
+    paths = corpus_tests(args.corpus, args.tests)
+    if not paths:
+        print("No reproducers to run.")
+        return 0
+
+    start = time.monotonic()
+    if args.command == "bless":
+        if not args.tests:
+            # Without names, only reproducers still marked as crashing are blessed
+            paths = [path for path in paths if read_test(path)["xfail"]]
+        blessed, crashing = bless(args, paths)
+        for name, _ in blessed:
+            print(f"Blessed {name}")
+        for name, message in crashing:
+            print(f"Still crashing, not blessed: {name} ({message})")
+        print(f"\n{len(blessed)} blessed, {len(crashing)} still crashing in {time.monotonic() - start:.1f}s")
+        return 0
+
+    records = run_corpus(args, paths)
+    print_results(records, time.monotonic() - start)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(records, f, indent=2)
+    return 1 if any(r["status"] in FAILING for r in records) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
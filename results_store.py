@@ -0,0 +1,379 @@
+#!/usr/bin/env python3
+"""
+Columnar store of LIT results, built straight from the lit JSON files.
+- Joins baseline.json, daedalus.json (and iroutliner.json, func-merging.json, ...) by test name.
+- Keeps raw values: missing metrics stay NaN and 'inf' stays inf.
+- Persists one wide table ('Program', '<config> (code)', '<config> (<metric>)') as
+  Parquet when pyarrow is available, else as a NumPy .npz archive.
+- Repeated runs next to a config's JSON (daedalus.run1.json, daedalus.run2.json, ...)
+  are kept sample by sample in a long side table, <store>.samples.parquet
+  ('Program', 'config', 'run', 'metric', 'value'), for noise-aware comparisons.
+
+    python3 results_store.py build -o results.parquet baseline.json daedalus.json
+    python3 results_store.py missing results.parquet > files-list.txt
+    python3 results_store.py average --median -o baseline.json baseline.run1.json baseline.run2.json ...
+    python3 results_store.py slow --min-time 1.0 --build-dir build daedalus.json > long-tests.txt
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401
+
+    HAVE_ARROW = True
+except ImportError:
+    HAVE_ARROW = False
+
+# Metrics analyze_comparison_results.py summarizes (compare.py's default -m set)
+DEFAULT_METRICS = ["instcount", "size..text", "exec_time", "compile_time"]
+
+SAMPLE_COLUMNS = ["Program", "config", "run", "metric", "value"]
+
+# lit prefixes every test name with the suite name, e.g. 'test-suite :: MultiSource/.../foo.test'
+_SUITE_SEP = " :: "
+
+
+def config_name(json_path: str) -> str:
+    """
+    'lit-results/func-merging.json' -> 'func-merging'
+    """
+    return os.path.splitext(os.path.basename(json_path))[0]
+
+
+def program_name(test_name: str) -> str:
+    return test_name.split(_SUITE_SEP, 1)[-1]
+
+
+def load_lit_json(path: str) -> pd.DataFrame:
+    """
+    One row per test: 'Program', 'code' and one float column per metric.
+    """
+    with open(path, "r") as f:
+        data = json.load(f)
+    records = []
+    for test in data.get("tests", []):
+        rec = {"Program": program_name(test["name"]), "code": test.get("code", "")}
+        for metric, value in (test.get("metrics") or {}).items():
+            if isinstance(value, (int, float)):
+                rec[metric] = float(value)
+        records.append(rec)
+    df = pd.DataFrame.from_records(records)
+    if df.empty:
+        return pd.DataFrame(columns=["Program", "code"])
+    return df.drop_duplicates("Program", keep="last").set_index("Program")
+
+
+def run_files(json_path: str) -> List[str]:
+    """
+    'lit-results/daedalus.json' -> the repeated runs written next to it
+    ('daedalus.run1.json', 'daedalus.run2.json', ...), in run order.
+    """
+    root, ext = os.path.splitext(json_path)
+    runs = []
+    for path in glob.glob(f"{glob.escape(root)}.run*{ext}"):
+        n = path[len(root) + len(".run") : len(path) - len(ext)]
+        if n.isdigit():
+            runs.append((int(n), path))
+    return [path for _, path in sorted(runs)]
+
+
+def build_store(json_paths: Sequence[str], configs: Optional[Sequence[str]] = None) -> pd.DataFrame:
+    """
+    Outer-join lit results by program. Config order follows json_paths, so the
+    first file is the reference the others are diffed against.
+    """
+    configs = list(configs or [config_name(p) for p in json_paths])
+    frames = []
+    for config, path in zip(configs, json_paths):
+        df = load_lit_json(path)
+        df.columns = [f"{config} ({col})" for col in df.columns]
+        frames.append(df)
+    table = pd.concat(frames, axis=1, join="outer", sort=True)
+    table.index.name = "Program"
+    table = table.reset_index()
+    table.attrs["configs"] = configs
+    return table
+
+
+def build_samples(json_paths: Sequence[str], configs: Optional[Sequence[str]] = None) -> pd.DataFrame:
+    """
+    Every sample of every config, one row per (program, config, run, metric).
+    A config's samples come from its repeated runs, or from its JSON alone (run 1)
+    when it was run once.
+    """
+    configs = list(configs or [config_name(p) for p in json_paths])
+    frames = []
+    for config, path in zip(configs, json_paths):
+        for run, run_path in enumerate(run_files(path) or [path], start=1):
+            df = load_lit_json(run_path).drop(columns="code")
+            long = df.reset_index().melt(id_vars="Program", var_name="metric", value_name="value").dropna()
+            long.insert(1, "config", config)
+            long.insert(2, "run", run)
+            frames.append(long)
+    if not frames:
+        return pd.DataFrame(columns=SAMPLE_COLUMNS)
+    samples = pd.concat(frames, ignore_index=True)[SAMPLE_COLUMNS]
+    samples["run"] = samples["run"].astype(float)
+    samples.attrs["configs"] = configs
+    return samples
+
+
+def average_lit_runs(json_paths: Sequence[str], statistic: str = "mean") -> dict:
+    """
+    Combine repeated LIT runs of the same build into one LIT JSON: every numeric
+    metric is the mean (or median) over the runs that reported it, and a test keeps
+    the first non-PASS code of any run.
+    """
+    reduce = {"mean": np.mean, "median": np.median}[statistic]
+    runs = []
+    for path in json_paths:
+        with open(path, "r") as f:
+            runs.append(json.load(f))
+    tests: Dict[str, dict] = {}
+    samples: Dict[str, Dict[str, List[float]]] = {}
+    for run in runs:
+        for test in run.get("tests", []):
+            merged = tests.setdefault(test["name"], {**test, "metrics": {}})
+            if merged.get("code") == "PASS" and test.get("code") != "PASS":
+                merged["code"] = test.get("code")
+            for metric, value in (test.get("metrics") or {}).items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    samples.setdefault(test["name"], {}).setdefault(metric, []).append(float(value))
+                else:
+                    merged["metrics"].setdefault(metric, value)
+    for name, metrics in samples.items():
+        for metric, values in metrics.items():
+            tests[name]["metrics"][metric] = float(reduce(values))
+    combined = dict(runs[0]) if runs else {}
+    combined["tests"] = list(tests.values())
+    return combined
+
+
+def slow_programs(json_path: str, min_time: float, metric: str = "exec_time") -> List[str]:
+    """
+    Programs whose `metric` reached min_time seconds in a LIT JSON: the long-running
+    tests worth repeating, where run-to-run noise is measurable at all.
+    """
+    df = load_lit_json(json_path)
+    if metric not in df.columns:
+        return []
+    return sorted(df.index[df[metric].to_numpy(dtype=float) >= min_time])
+
+
+# ------------------------------------------------------------
+# Persistence
+# ------------------------------------------------------------
+def store_path(path: str) -> str:
+    """
+    Parquet needs pyarrow; fall back to .npz next to the requested path otherwise.
+    """
+    root, ext = os.path.splitext(path)
+    if ext == ".parquet" and not HAVE_ARROW:
+        return root + ".npz"
+    if not ext:
+        return root + (".parquet" if HAVE_ARROW else ".npz")
+    return path
+
+
+def write_store(table: pd.DataFrame, path: str) -> str:
+    path = store_path(path)
+    configs = table.attrs.get("configs") or configs_of(table)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = f"{path}.tmp{os.getpid()}"
+    if path.endswith(".parquet"):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        arrow = pa.Table.from_pandas(table, preserve_index=False)
+        arrow = arrow.replace_schema_metadata(
+            {**(arrow.schema.metadata or {}), b"dbgtk.configs": json.dumps(configs).encode()}
+        )
+        pq.write_table(arrow, tmp)
+    else:
+        arrays = {f"col{n}": _to_array(table[col]) for n, col in enumerate(table.columns)}
+        with open(tmp, "wb") as f:
+            np.savez_compressed(
+                f,
+                __columns__=np.array(list(table.columns)),
+                __configs__=np.array(configs),
+                **arrays,
+            )
+    os.replace(tmp, path)
+    return path
+
+
+def samples_path(path: str) -> str:
+    """
+    Side table of the store at `path`: results.parquet -> results.samples.parquet
+    """
+    root, ext = os.path.splitext(store_path(path))
+    return f"{root}.samples{ext}"
+
+
+def read_samples(path: str) -> Optional[pd.DataFrame]:
+    """
+    Samples stored next to the store at `path`, or None if it was built from single runs.
+    """
+    side = samples_path(path)
+    if not os.path.exists(side):
+        return None
+    return read_store(side)
+
+
+def _to_array(col: pd.Series) -> np.ndarray:
+    if pd.api.types.is_numeric_dtype(col):
+        return col.to_numpy(dtype=float)
+    return col.fillna("").astype(str).to_numpy(dtype=str)
+
+
+def read_store(path: str) -> pd.DataFrame:
+    if not os.path.exists(path):
+        path = store_path(path)
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+
+        arrow = pq.read_table(path)
+        table = arrow.to_pandas()
+        meta = (arrow.schema.metadata or {}).get(b"dbgtk.configs")
+        configs = json.loads(meta) if meta else configs_of(table)
+    else:
+        with np.load(path, allow_pickle=False) as data:
+            columns = [str(c) for c in data["__columns__"]]
+            table = pd.DataFrame({col: data[f"col{n}"] for n, col in enumerate(columns)})
+            configs = [str(c) for c in data["__configs__"]]
+    table.attrs["configs"] = configs
+    return table
+
+
+# ------------------------------------------------------------
+# Queries
+# ------------------------------------------------------------
+def configs_of(table: pd.DataFrame) -> List[str]:
+    configs = table.attrs.get("configs")
+    if configs:
+        return list(configs)
+    seen: Dict[str, None] = {}
+    for col in table.columns:
+        if col.endswith(" (code)"):
+            seen[col[: -len(" (code)")]] = None
+    return list(seen)
+
+
+def metrics_of(table: pd.DataFrame) -> List[str]:
+    configs = configs_of(table)
+    seen: Dict[str, None] = {}
+    for col in table.columns:
+        for config in configs:
+            prefix = f"{config} ("
+            if col.startswith(prefix) and col != f"{config} (code)":
+                seen[col[len(prefix) : -1]] = None
+    return list(seen)
+
+
+def metric_matrix(table: pd.DataFrame, metric: str, configs: Optional[Sequence[str]] = None) -> np.ndarray:
+    """
+    (programs x configs) float matrix for one metric; NaN where a config has no value.
+    """
+    configs = list(configs or configs_of(table))
+    out = np.full((len(table), len(configs)), np.nan)
+    for n, config in enumerate(configs):
+        col = f"{config} ({metric})"
+        if col in table.columns:
+            out[:, n] = table[col].to_numpy(dtype=float)
+    return out
+
+
+def missing_programs(table: pd.DataFrame, metrics: Optional[Sequence[str]] = None) -> List[str]:
+    """
+    Programs with no metrics in at least one config, i.e. the tests compare.py
+    reports as "has no metrics" (crashed, failed to build or mismatched output).
+    """
+    metrics = list(metrics or metrics_of(table))
+    missing = np.zeros(len(table), dtype=bool)
+    for config in configs_of(table):
+        cols = [f"{config} ({m})" for m in metrics if f"{config} ({m})" in table.columns]
+        if not cols:
+            missing[:] = True
+            continue
+        missing |= table[cols].isna().all(axis=1).to_numpy()
+    return table.loc[missing, "Program"].tolist()
+
+
+# ------------------------------------------------------------
+# CLI
+# ------------------------------------------------------------
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description="Build and query the columnar LIT results store.")
+    sub = p.add_subparsers(dest="command", required=True)
+
+    b = sub.add_parser("build", help="Join lit JSON results into a store")
+    b.add_argument("json_files", nargs="+", help="lit -o JSON files; the first one is the reference")
+    b.add_argument("-o", "--output", required=True, help="Store path (.parquet, or .npz without pyarrow)")
+    b.add_argument("--config", action="append", help="Config name per JSON file (default: file stem)")
+    b.add_argument(
+        "--no-samples",
+        action="store_true",
+        help="Don't store the samples of repeated runs (<config>.run<n>.json) next to the store",
+    )
+
+    m = sub.add_parser("missing", help="Print the build-relative .e.bc path of tests without metrics")
+    m.add_argument("store", help="Store built by 'build'")
+
+    s = sub.add_parser("show", help="Print the store as TSV")
+    s.add_argument("store", help="Store built by 'build'")
+
+    a = sub.add_parser("average", help="Average repeated LIT runs into one lit JSON")
+    a.add_argument("json_files", nargs="+", help="lit -o JSON files of repeated runs")
+    a.add_argument("-o", "--output", required=True, help="Combined lit JSON")
+    a.add_argument("--median", action="store_true", help="Take the median of every metric instead of the mean")
+
+    w = sub.add_parser("slow", help="Print the LIT path of every test whose exec_time reached --min-time")
+    w.add_argument("json_file", help="lit -o JSON file of a previous run")
+    w.add_argument("--min-time", type=float, required=True, help="Seconds of exec_time")
+    w.add_argument("--build-dir", default="", help="Prefix for the printed test paths")
+    return p.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.command == "build":
+        if args.config and len(args.config) != len(args.json_files):
+            sys.exit("ERROR: --config must be given once per JSON file")
+        table = build_store(args.json_files, args.config)
+        path = write_store(table, args.output)
+        print(f"{len(table)} programs x {len(configs_of(table))} configs written to {path}")
+        side = samples_path(path)
+        repeated = [config_name(p) for p in args.json_files if run_files(p)]
+        if repeated and not args.no_samples:
+            samples = build_samples(args.json_files, args.config)
+            write_store(samples, side)
+            print(f"{len(samples)} samples of repeated runs ({', '.join(repeated)}) written to {side}")
+        elif os.path.exists(side):
+            os.remove(side)
+    elif args.command == "missing":
+        for name in missing_programs(read_store(args.store)):
+            print(name[: -len(".test")] + ".e.bc" if name.endswith(".test") else name)
+    elif args.command == "show":
+        read_store(args.store).to_csv(sys.stdout, sep="\t", index=False)
+    elif args.command == "average":
+        combined = average_lit_runs(args.json_files, "median" if args.median else "mean")
+        tmp = f"{args.output}.tmp{os.getpid()}"
+        with open(tmp, "w") as f:
+            json.dump(combined, f, indent=2)
+        os.replace(tmp, args.output)
+        print(f"{len(combined['tests'])} tests averaged over {len(args.json_files)} runs into {args.output}")
+    elif args.command == "slow":
+        for name in slow_programs(args.json_file, args.min_time):
+            print(os.path.join(args.build_dir, name) if args.build_dir else name)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,11 +2,18 @@
 #
 # Run the experiment for -Os with Daedalus, IROutliner, and func-merging
 #
+# The four configurations are built, tested and post-processed concurrently by
+# pipeline.py, each in its own build directory, within a shared core budget.
+#
 # Usage: ./run-experiment.sh
 #
 
 # Default values
-WORKERS=10
+CORES="$(nproc 2>/dev/null || echo 1)"
+WORKERS=""
+# LIT stages run alone on the whole budget, so exec_time of every configuration is
+# measured without another stage's load (what the significance tests assume)
+EXCLUSIVE_LIT=true
 TIMEOUT=120
 VENV="$HOME/src/github/daedalus-dbg-toolkit/venv"
 LLVM_PROJECT="$HOME/src/github/llvm-project"
@@ -15,11 +22,18 @@ LLVM_TEST_SUITE="$HOME/src/github/llvm-test-suite"
 DAEDALUS="$HOME/src/github/Daedalus"
 ERRORS_DBG="$HOME/src/github/daedalus-dbg-toolkit"
 LIT_RESULTS="$HOME/lit-results"
+REPEAT=1
+REPEAT_MIN_TIME=0
+BASELINE_REPEAT=""
+TIMELINE=""
 
 # Argument parsing
 print_usage() {
     echo "Usage: $0 [options]"
-    echo "  -w, --workers <n>        Number of parallel workers (default: 10)"
+    echo "      --cores <n>          Core budget shared by all configurations (default: $CORES)"
+    echo "  -w, --workers <n>        Parallel workers (ninja/lit/opt -j) of each stage (default: cores / 4)"
+    echo "      --exclusive-lit      Run LIT stages alone on the whole budget, for steadier exec_time (default)"
+    echo "      --shared-lit         Let LIT stages overlap other configurations' builds: faster, but exec_time is measured under load"
     echo "  -t, --timeout <n>        Timeout to set for LIT (default 120)"
     echo "      --venv <path>        Path to Python virtual environment (default: $VENV)"
     echo "      --llvm-project <path>    Path to LLVM project (default: $LLVM_PROJECT)"
@@ -28,10 +42,14 @@ print_usage() {
     echo "      --daedalus <path>        Path to Daedalus project (default: $DAEDALUS)"
     echo "      --errors-dbg <path>      Directory for LIT log output (default: $ERRORS_DBG)"
     echo "      --lit-results <path>     Directory for LIT results JSON (default: $LIT_RESULTS)"
+    echo "      --repeat <n>             LIT runs of every configuration; changes are tested for significance (default: $REPEAT)"
+    echo "      --repeat-min-time <s>    Only repeat tests whose exec_time reached s seconds (default: all)"
+    echo "      --baseline-repeat <n>    LIT runs of the baseline alone (default: --repeat)"
+    echo "      --timeline <file>        Record a CPU/memory/disk timeline of every phase (see phase_timeline.py)"
     echo "  -h, --help              Show this help message"
 }
 
-ARGS=$(getopt -o w:t:h --long workers:,timeout:,venv:,llvm-project:,code-size:,llvm-test-suite:,daedalus:,errors-dbg:,lit-results:,help -n "$0" -- "$@")
+ARGS=$(getopt -o w:t:h --long cores:,exclusive-lit,shared-lit,workers:,timeout:,venv:,llvm-project:,code-size:,llvm-test-suite:,daedalus:,errors-dbg:,lit-results:,repeat:,repeat-min-time:,baseline-repeat:,timeline:,help -n "$0" -- "$@")
 if [ $? -ne 0 ]; then
     print_usage
     exit 1
@@ -39,6 +57,12 @@ fi
 eval set -- "$ARGS"
 while true; do
     case "$1" in
+        --cores)
+            CORES="$2"; shift 2;;
+        --exclusive-lit)
+            EXCLUSIVE_LIT=true; shift;;
+        --shared-lit)
+            EXCLUSIVE_LIT=false; shift;;
         -w|--workers)
             WORKERS="$2"; shift 2;;
         -t|--timeout)
@@ -57,6 +81,14 @@ while true; do
             ERRORS_DBG="$2"; shift 2;;
         --lit-results)
             LIT_RESULTS="$2"; shift 2;;
+        --repeat)
+            REPEAT="$2"; shift 2;;
+        --repeat-min-time)
+            REPEAT_MIN_TIME="$2"; shift 2;;
+        --baseline-repeat)
+            BASELINE_REPEAT="$2"; shift 2;;
+        --timeline)
+            TIMELINE="$2"; shift 2;;
         -h|--help)
             print_usage; exit 0;;
         --)
@@ -78,47 +110,34 @@ else
     echo "VENV variable not set. Skipping venv activation."
 fi
 
-# Os baseline setup and running
-./gen_baseline.sh -c -w "$WORKERS" -t "$TIMEOUT" \
-    --llvm-test-suite "$LLVM_TEST_SUITE" \
-    --lit-results "$LIT_RESULTS"
-
-# Daedalus setup and running
-./gen_daedalus.sh -b main -u -c --max-slice-params 1 --max-slice-size 20 --max-slice-users 10 \
-    -w "$WORKERS" -t "$TIMEOUT" \
-    --llvm-project "$LLVM_PROJECT" \
-    --llvm-test-suite "$LLVM_TEST_SUITE" \
-    --daedalus "$DAEDALUS" \
-    --errors-dbg "$ERRORS_DBG" \
-    --lit-results "$LIT_RESULTS"
-
-# IROutliner setup and running
-
-./gen_iro.sh -c -w "$WORKERS" -t "$TIMEOUT" \
-    --llvm-project "$LLVM_PROJECT" \
-    --llvm-test-suite "$LLVM_TEST_SUITE" \
-    --errors-dbg "$ERRORS_DBG" \
-    --lit-results "$LIT_RESULTS"
-
-# func-merging setup and running
-export PATH="$CODE_SIZE/build/bin:$PATH"
+# One timeline for the whole experiment: pipeline.py and the scripts it runs mark
+# their phases in $DBGTK_TIMELINE
+if [ -n "$TIMELINE" ]; then
+    python3 "$ERRORS_DBG/phase_timeline.py" start "$TIMELINE" \
+        --meta script=run-experiment.sh --meta cores="$CORES" --meta workers="${WORKERS:-auto}" \
+        --meta timeout="$TIMEOUT" --meta repeat="$REPEAT"
+    export DBGTK_TIMELINE="$TIMELINE"
+    trap 'python3 "$ERRORS_DBG/phase_timeline.py" stop "$DBGTK_TIMELINE"' EXIT
+fi
 
-./gen_fm.sh -c -w "$WORKERS" -t "$TIMEOUT" \
-    --llvm-project "$LLVM_PROJECT" \
-    --llvm-test-suite "$LLVM_TEST_SUITE" \
-    --errors-dbg "$ERRORS_DBG" \
+# Baseline (reused from the baseline cache when nothing it depends on changed),
+# IROutliner, func-merging (with the code-size tools) and Daedalus, then the
+# four-way comparison report and its analysis
+PIPELINE_ARGS=(
+    --clean --upgrade --branch main
+    --max-slice-params 1 --max-slice-size 20 --max-slice-users 10
+    --cores "$CORES"
+    --timeout "$TIMEOUT"
+    --repeat "$REPEAT" --repeat-min-time "$REPEAT_MIN_TIME"
+    --llvm-project "$LLVM_PROJECT"
+    --code-size "$CODE_SIZE"
+    --llvm-test-suite "$LLVM_TEST_SUITE"
+    --daedalus "$DAEDALUS"
+    --work-root "$ERRORS_DBG/pipeline"
     --lit-results "$LIT_RESULTS"
-
-# Comparison report generation
-python "$LLVM_TEST_SUITE/utils/compare.py" \
-    --full --nodiff \
-    -m instcount \
-    -m size..text \
-    -m exec_time \
-    -m compile_time \
-    "$LIT_RESULTS/baseline.json" \
-    "$LIT_RESULTS/iroutliner.json" \
-    "$LIT_RESULTS/func-merging.json" \
-    "$LIT_RESULTS/daedalus.json" > comp-Os-fm-iro-daedalus.txt
-
-printf "Comparison report generated: %s\n" "$(realpath comp-Os-fm-iro-daedalus.txt)"
+    --report comp-Os-fm-iro-daedalus.txt
+)
+[ -n "$WORKERS" ] && PIPELINE_ARGS+=(--stage-cores "$WORKERS")
+[ -n "$BASELINE_REPEAT" ] && PIPELINE_ARGS+=(--baseline-repeat "$BASELINE_REPEAT")
+[ "$EXCLUSIVE_LIT" = true ] && PIPELINE_ARGS+=(--exclusive-lit)
+python3 "$ERRORS_DBG/pipeline.py" "${PIPELINE_ARGS[@]}"
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Selective LIT runs: rerun only the tests a Daedalus change can affect.
+- record: per test, whether Daedalus transformed anything (non-zero daedalus
+  -stats counters or a *_slices_report.log written by the pass), whether it failed
+  in the LIT results, and the digest of its .e.bc bitcode.
+- select: the tests to rerun, i.e. previously transformed, previously failing,
+  bitcode changed, or not recorded yet. Written as LIT test paths, one per line.
+- merge: fresh results of the selected tests over the cached results of the rest,
+  into a complete daedalus.json.
+
+The opt -stats runs go through the opt_cache.py result cache and a thread pool.
+
+    python3 test_selection.py record --build-dir build --plugin libdaedalus.so --lit-json daedalus.json
+    python3 test_selection.py select --build-dir build -o selected-tests.txt
+    python3 test_selection.py merge daedalus.cached.json daedalus.partial.json -o daedalus.json
+"""
+import argparse
+import json
+import os
+import re
+import shutil
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+import results_store
+from opt_cache import DEFAULT_CACHE_DIR, ResultCache, file_digest
+
+DEFAULT_STATE = os.path.join(os.path.expanduser("~"), "lit-results", "test-selection.json")
+# DEBUG_TYPEs of the Daedalus statistics (same set opt_pool.py debugs)
+STAT_GROUPS = {"daedalus", "ProgramSlice", "PHIGateAnalyzer"}
+# '   12 daedalus         - Number of slices created'
+STAT_RE = re.compile(r"^\s*(\d+)\s+(\S+)\s+-\s")
+SLICES_REPORT_SUFFIX = "_slices_report.log"
+
+
+def bitcode_path(build_dir, program):
+    """
+    'MultiSource/.../foo.test' -> '<build>/MultiSource/.../foo.e.bc', as results_store.py missing.
+    """
+    stem = program[: -len(".test")] if program.endswith(".test") else program
+    return os.path.join(build_dir, stem + ".e.bc")
+
+
+def load_state(path):
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_state(state, path):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(state, f, indent=1, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def failed_programs(lit_json):
+    """
+    {program: failed} from a LIT JSON: failing code or no metrics at all.
+    """
+    df = results_store.load_lit_json(lit_json)
+    metric_cols = [c for c in df.columns if c != "code"]
+    has_metrics = df[metric_cols].notna().any(axis=1) if metric_cols else df["code"].isna()
+    return {p: not (code == "PASS" and ok) for p, code, ok in zip(df.index, df["code"], has_metrics)}
+
+
+def transformed(cache, bitcode, plugin):
+    """
+    True if Daedalus bumped any of its statistics or wrote a slices report for this bitcode.
+    """
+    argv = ["opt", "-stats", "-passes=daedalus", f"-load-pass-plugin={plugin}", bitcode, "-disable-output"]
+    artifacts = tempfile.mkdtemp(prefix=".test-selection.")
+    try:
+        result = cache.run(argv, inputs=[bitcode], artifacts_dir=artifacts)
+        if any(name.endswith(SLICES_REPORT_SUFFIX) for name in os.listdir(artifacts)):
+            return True
+    finally:
+        shutil.rmtree(artifacts, ignore_errors=True)
+    for line in result.stderr.decode(errors="replace").splitlines():
+        m = STAT_RE.match(line)
+        if m and m.group(2) in STAT_GROUPS and int(m.group(1)) > 0:
+            return True
+    return False
+
+
+def record(state, build_dir, plugin, lit_json, only=None, jobs=None, cache=None):
+    """
+    Update `state` for every test in lit_json (or just `only`). Returns the number recorded.
+    """
+    cache = cache or ResultCache()
+    failed = failed_programs(lit_json)
+    programs = [p for p in failed if only is None or p in only]
+
+    def one(program):
+        bitcode = bitcode_path(build_dir, program)
+        if not os.path.isfile(bitcode):
+            return program, {"failed": failed[program], "transformed": None, "bitcode": None}
+        return program, {
+            "failed": failed[program],
+            "transformed": transformed(cache, os.path.abspath(bitcode), plugin),
+            "bitcode": file_digest(bitcode),
+        }
+
+    with ThreadPoolExecutor(max_workers=jobs or os.cpu_count() or 1) as pool:
+        for program, entry in pool.map(one, programs):
+            state[program] = entry
+    return len(programs)
+
+
+def select(state, build_dir, programs=None):
+    """
+    (program, reason) for every test that has to rerun. `programs` is the full
+    suite (default: every recorded test).
+    """
+    selected = []
+    for program in sorted(programs if programs is not None else state):
+        entry = state.get(program)
+        bitcode = bitcode_path(build_dir, program)
+        if entry is None:
+            reason = "new"
+        elif entry["failed"]:
+            reason = "failed"
+        elif entry["transformed"] or entry["transformed"] is None:
+            reason = "transformed"
+        elif not os.path.isfile(bitcode) or file_digest(bitcode) != entry["bitcode"]:
+            reason = "bitcode"
+        else:
+            continue
+        selected.append((program, reason))
+    return selected
+
+
+def merge(cached_json, fresh_json, output):
+    """
+    Fresh test results replace cached ones by name; everything else comes from the cache.
+    """
+    with open(cached_json, "r") as f:
+        cached = json.load(f)
+    with open(fresh_json, "r") as f:
+        fresh = json.load(f)
+    tests = {t["name"]: t for t in cached.get("tests", [])}
+    tests.update((t["name"], t) for t in fresh.get("tests", []))
+    merged = dict(fresh)
+    merged["tests"] = sorted(tests.values(), key=lambda t: t["name"])
+    tmp = f"{output}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(merged, f, indent=2)
+    os.replace(tmp, output)
+    return len(fresh.get("tests", [])), len(merged["tests"])
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Select the LIT tests a Daedalus change can affect.")
+    p.add_argument("--state", default=DEFAULT_STATE, help=f"Per-test selection state (default: {DEFAULT_STATE})")
+    sub = p.add_subparsers(dest="command", required=True)
+
+    r = sub.add_parser("record", help="Record transformed / failed / bitcode digest per test")
+    r.add_argument("--build-dir", required=True, help="LLVM Test Suite build folder")
+    r.add_argument("--plugin", required=True, help="libdaedalus.so")
+    r.add_argument("--lit-json", required=True, help="LIT results of the run (daedalus.json)")
+    r.add_argument("--only", help="Only record the tests listed in this file (e.g. the selected tests)")
+    r.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1, help="Concurrent opt processes")
+    r.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="Result cache location")
+    r.add_argument("--no-cache", action="store_true", help="Always rerun opt")
+
+    s = sub.add_parser("select", help="Write the LIT test paths to rerun")
+    s.add_argument("--build-dir", required=True, help="LLVM Test Suite build folder")
+    s.add_argument("--lit-json", help="Full results of the previous run; tests missing from the state are selected")
+    s.add_argument("-o", "--output", required=True, help="Test list, one LIT test path per line")
+
+    m = sub.add_parser("merge", help="Merge fresh results over cached ones")
+    m.add_argument("cached", help="Complete LIT JSON of the previous run")
+    m.add_argument("fresh", help="LIT JSON of the selected tests")
+    m.add_argument("-o", "--output", required=True, help="Merged LIT JSON")
+    args = p.parse_args(argv)
+
+    if args.command == "record":
+        state = load_state(args.state)
+        only = None
+        if args.only:
+            with open(args.only, "r") as f:
+                only = {os.path.relpath(line.strip(), args.build_dir) for line in f if line.strip()}
+        cache = ResultCache(args.cache_dir, enabled=not args.no_cache)
+        n = record(state, args.build_dir, os.path.abspath(args.plugin), args.lit_json, only, args.jobs, cache)
+        save_state(state, args.state)
+        touched = sum(1 for e in state.values() if e["transformed"])
+        print(f"Recorded {n} tests in {args.state} ({touched} of {len(state)} transformed by Daedalus)")
+
+    elif args.command == "select":
+        state = load_state(args.state)
+        programs = list(failed_programs(args.lit_json)) if args.lit_json else None
+        selected = select(state, args.build_dir, programs)
+        with open(args.output, "w") as f:
+            for program, _ in selected:
+                f.write(os.path.join(args.build_dir, program) + "\n")
+        reasons = {}
+        for _, reason in selected:
+            reasons[reason] = reasons.get(reason, 0) + 1
+        detail = ", ".join(f"{k}: {v}" for k, v in sorted(reasons.items()))
+        total = len(programs) if programs is not None else len(state)
+        print(f"Selected {len(selected)} of {total} tests ({detail or 'none'}) -> {args.output}")
+
+    else:
+        fresh, total = merge(args.cached, args.fresh, args.output)
+        print(f"Merged {fresh} fresh results into {total} tests -> {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
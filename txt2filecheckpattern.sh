@@ -32,9 +32,11 @@ if [ -z "$INPUTFILE" ]; then
   usage
 fi
 
-# Apply sed transformations to the input file
-sed -i '1s/^/; CHECK: /' "$INPUTFILE"
-sed -i 's/^/; CHECK-NEXT: /g' "$INPUTFILE"
-sed -i 's/^; CHECK-NEXT: $/; CHECK-EMPTY:/g' "$INPUTFILE"
-sed -i '1s/; CHECK-NEXT: //g' "$INPUTFILE"
-sed -i 's/__[0-9]\+(/_[[ID:[0-9]+]](/g' "$INPUTFILE"
+# One pass over the input file: the first line becomes a CHECK, empty lines
+# CHECK-EMPTY and every other line a CHECK-NEXT; numbered clones (name__N) match
+# any number. repro_corpus.py applies the same rules (filecheck_patterns).
+sed -i \
+  -e '1s/^/; CHECK: /' \
+  -e '1!{/^$/!s/^/; CHECK-NEXT: /;s/^$/; CHECK-EMPTY:/}' \
+  -e 's/__[0-9]\+(/__[[ID:[0-9]+]](/g' \
+  "$INPUTFILE"